@@ -2,11 +2,16 @@ from django.contrib import admin
 from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django import forms
+from django.db import transaction
+from django.utils import timezone
 from .models import (
     Company, Function, WorkEnvironment, AdSlot, SiteSettings, FormLayout,
     HowItWorksSection, HowItWorksStep, RecruiterSection, CompanyRecruiterAccess,
-    CampaignStatistics, StaticPage
+    CampaignStatistics, CampaignStatisticsMonthly, CampaignStatisticsWeekly, StaticPage
 )
+from .services.directory_service import CompanyDirectory
+from .services.reach_service import ReachSketches
+from .services.stats_service import DirectoryStats
 
 
 class CompanyAdminForm(forms.ModelForm):
@@ -151,12 +156,23 @@ class CompanyAdmin(admin.ModelAdmin):
     actions = ['mark_as_active', 'mark_as_inactive']
     
     def mark_as_active(self, request, queryset):
-        updated = queryset.update(status='Active')
+        with transaction.atomic():
+            # Lock the rows so the counter delta matches what the update changes
+            activated = len(queryset.select_for_update().exclude(status='Active').values_list('pk'))
+            updated = queryset.update(status='Active', updated_at=timezone.now())
+            DirectoryStats.adjust({'active': activated})
+        Company.refresh_cards(queryset)
+        CompanyDirectory.invalidate()
         self.message_user(request, f'{updated} companies marked as active.')
     mark_as_active.short_description = 'Mark selected companies as Active'
     
     def mark_as_inactive(self, request, queryset):
-        updated = queryset.update(status='Inactive')
+        with transaction.atomic():
+            deactivated = len(queryset.select_for_update().filter(status='Active').values_list('pk'))
+            updated = queryset.update(status='Inactive', updated_at=timezone.now())
+            DirectoryStats.adjust({'active': -deactivated})
+        Company.refresh_cards(queryset)
+        CompanyDirectory.invalidate()
         self.message_user(request, f'{updated} companies marked as inactive.')
     mark_as_inactive.short_description = 'Mark selected companies as Inactive'
 
@@ -316,7 +332,7 @@ class FormLayoutAdmin(admin.ModelAdmin):
 
 
 # Sponsor Campaign Admin
-from .models import SponsorCampaign, SponsorStatsDaily, SponsorDeliveryLog
+from .models import SponsorCampaign, SponsorStatsDaily, SponsorDeliveryLog, SponsorDeliveryRollup
 
 
 @admin.register(SponsorCampaign)
@@ -425,13 +441,17 @@ class SponsorCampaignAdmin(admin.ModelAdmin):
         total_impressions = sum(s.impressions for s in stats)
         total_clicks = sum(s.clicks for s in stats)
         ctr = (total_clicks / total_impressions * 100) if total_impressions > 0 else 0
+        today = timezone.now().date()
+        reach = ReachSketches.campaign_reach([obj.id], today - timezone.timedelta(days=7), today)
         
         return format_html(
             "<strong>Last 7 days:</strong><br/>"
             "Impressions: {}<br/>"
+            "Unique reach: ~{}<br/>"
             "Clicks: {}<br/>"
             "CTR: {:.2f}%",
             total_impressions,
+            reach,
             total_clicks,
             ctr
         )
@@ -495,6 +515,28 @@ class SponsorDeliveryLogAdmin(admin.ModelAdmin):
     page_key_short.short_description = "Page Context"
 
 
+@admin.register(SponsorDeliveryRollup)
+class SponsorDeliveryRollupAdmin(admin.ModelAdmin):
+    """Admin interface for daily per-page delivery rollups."""
+    
+    list_display = [
+        'campaign',
+        'date',
+        'page_key_short',
+        'impressions',
+        'clicks',
+        'unique_users'
+    ]
+    
+    list_filter = ['date', 'campaign__company']
+    search_fields = ['campaign__name', 'page_key']
+    
+    def page_key_short(self, obj):
+        """Display shortened page key"""
+        return obj.page_key[:30] + "..." if len(obj.page_key) > 30 else obj.page_key
+    page_key_short.short_description = "Page Context"
+
+
 class HowItWorksStepInline(admin.TabularInline):
     """Inline admin for How It Works Steps"""
     model = HowItWorksStep
@@ -677,3 +719,33 @@ class CampaignStatisticsAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         })
     )
+
+
+class CampaignStatisticsRollupAdmin(admin.ModelAdmin):
+    """Read-only view of the statistics rollups; they are rebuilt from the daily rows."""
+    
+    list_display = [
+        'company',
+        'period_start',
+        'days',
+        'page_views',
+        'job_page_clicks',
+        'profile_views',
+        'application_clicks',
+        'contact_clicks',
+        'updated_at'
+    ]
+    
+    list_filter = ['period_start']
+    search_fields = ['company__name']
+    date_hierarchy = 'period_start'
+    
+    def has_add_permission(self, request):
+        return False
+    
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+admin.site.register(CampaignStatisticsWeekly, CampaignStatisticsRollupAdmin)
+admin.site.register(CampaignStatisticsMonthly, CampaignStatisticsRollupAdmin)
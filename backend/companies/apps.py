@@ -5,3 +5,17 @@ class CompaniesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'companies'
     verbose_name = 'Companies'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .models import CampaignStatistics
+        from .services.counter_service import CounterBuffer
+        from .services.reach_service import ReachSketches
+        from .services.rollup_service import StatisticsRollups
+
+        # Buffered page views write their queued visitor sketches and refresh the
+        # day's unique visitor estimate, and every flushed daily row its weekly
+        # and monthly rollups
+        CounterBuffer.register_flush_hook(CampaignStatistics, ReachSketches.flush_company_users)
+        CounterBuffer.register_flush_hook(CampaignStatistics, ReachSketches.sync_company_statistics)
+        CounterBuffer.register_flush_hook(CampaignStatistics, StatisticsRollups.refresh_rows)
@@ -39,6 +39,13 @@ def debug_status(request):
         sections_count = 0
         sections_status = f"ERROR: {str(e)}"
     
+    # Write-behind analytics counters: this worker and all workers
+    from companies.services.counter_service import CounterBuffer
+    try:
+        counter_buffer = {"worker": CounterBuffer.stats(), "cluster": CounterBuffer.cluster_stats()}
+    except Exception as e:
+        counter_buffer = f"ERROR: {str(e)}"
+    
     return JsonResponse({
         "status": "debug_endpoint_working",
         "python_version": sys.version,
@@ -49,6 +56,7 @@ def debug_status(request):
         "model_status": model_status,
         "sections_count": sections_count,
         "sections_status": sections_status,
+        "counter_buffer": counter_buffer,
         "working_directory": os.getcwd(),
         "database_path": os.path.join(settings.BASE_DIR, "db.sqlite3") if hasattr(settings, 'BASE_DIR') else "unknown"
     })
\ No newline at end of file
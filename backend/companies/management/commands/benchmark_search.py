@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from companies.models import Company, Function
+from companies.services.search_service import get_search_backend, search_terms
+
+
+class Command(BaseCommand):
+    help = 'Benchmark company search latency against a synthetic directory (rolled back afterwards)'
+
+    NAME_PARTS = [
+        'Nex', 'Quant', 'Blue', 'Data', 'Cloud', 'Stack', 'Byte', 'Hyper', 'Open', 'Bright',
+        'Vector', 'Pixel', 'Astra', 'Core', 'Flux', 'Signal', 'Lumen', 'Terra', 'Nova', 'Zen',
+    ]
+    NAME_SUFFIXES = ['Labs', 'Systems', 'Software', 'Analytics', 'Robotics', 'Health', 'Pay', 'AI', 'Works', 'Networks']
+    LOCATIONS = [
+        ('USA', 'San Francisco'), ('USA', 'New York'), ('USA', 'Austin'), ('Canada', 'Toronto'),
+        ('Germany', 'Berlin'), ('United Kingdom', 'London'), ('India', 'Bangalore'), ('France', 'Paris'),
+    ]
+    FUNCTIONS = ['Engineering', 'Product', 'Design', 'Data', 'Sales', 'Marketing', 'Finance', 'Support']
+    QUERIES = ['cloud', 'nexquant', 'data berlin', 'soft', 'engineering toronto', 'quantum', 'pixel ai', 'xyzzy']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--companies', type=int, default=100000, help='Synthetic companies to generate')
+        parser.add_argument('--repeat', type=int, default=20, help='Timed runs per query')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        backend = get_search_backend()
+
+        with transaction.atomic():
+            self._seed(options['companies'], rng)
+            self.stdout.write('Indexing...')
+            started = time.perf_counter()
+            indexed = backend.rebuild()
+            self.stdout.write(f'Indexed {indexed} companies in {time.perf_counter() - started:.2f}s\n')
+
+            self.stdout.write(f'{"query":<22}{"hits":>8}{"p50 ms":>10}{"p99 ms":>10}{"orm p50":>10}')
+            for query in self.QUERIES:
+                hits, timings = self._time(lambda: backend.search(query), options['repeat'])
+                _, orm_timings = self._time(lambda: self._orm_search(query), max(1, options['repeat'] // 4))
+                self.stdout.write(
+                    f'{query:<22}{hits:>8}{self._pct(timings, 50):>10.2f}'
+                    f'{self._pct(timings, 99):>10.2f}{self._pct(orm_timings, 50):>10.2f}'
+                )
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark complete (synthetic data rolled back)'))
+
+    def _seed(self, count, rng):
+        self.stdout.write(f'Generating {count} synthetic companies...')
+        functions = [Function.objects.get_or_create(name=name)[0] for name in self.FUNCTIONS]
+        start_id = (Company.objects.order_by('-id').values_list('id', flat=True).first() or 0) + 1
+
+        companies = []
+        for i in range(count):
+            country, city = rng.choice(self.LOCATIONS)
+            name = f'{rng.choice(self.NAME_PARTS)}{rng.choice(self.NAME_PARTS).lower()} {rng.choice(self.NAME_SUFFIXES)} {i}'
+            companies.append(Company(
+                id=start_id + i, name=name, jobs_page_url='https://example.com/jobs',
+                country=country, city=city, work_environment='Remote, Hybrid',
+            ))
+        Company.objects.bulk_create(companies, batch_size=5000)
+
+        Through = Company.functions.through
+        links = [
+            Through(company_id=company.id, function_id=func.id)
+            for company in companies
+            for func in rng.sample(functions, rng.randint(1, 3))
+        ]
+        Through.objects.bulk_create(links, batch_size=5000)
+
+    def _orm_search(self, query):
+        """Equivalent of the previous SearchFilter query, for comparison."""
+        queryset = Company.objects.all()
+        for term in search_terms(query):
+            queryset = queryset.filter(
+                Q(name__icontains=term) | Q(city__icontains=term) |
+                Q(functions__name__icontains=term) | Q(country__icontains=term)
+            )
+        return list(queryset.distinct().values_list('id', flat=True))
+
+    @staticmethod
+    def _time(func, repeat):
+        timings = []
+        result = None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = func()
+            timings.append((time.perf_counter() - started) * 1000)
+        # None means the backend defers to in-memory substring matching
+        return ('substr' if result is None else len(result)), timings
+
+    @staticmethod
+    def _pct(values, percentile):
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method='inclusive')[percentile - 1]
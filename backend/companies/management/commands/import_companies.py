@@ -1,75 +1,119 @@
 import csv
+import time
+from itertools import islice
+from types import SimpleNamespace
 from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
 from companies.models import Company, Function
+from companies.serializers import CompanyListSerializer
+from companies.services.directory_service import CompanyDirectory
+from companies.services.search_service import company_document, get_search_backend
+from companies.services.stats_service import DirectoryStats
 
 
 class Command(BaseCommand):
     help = 'Import companies from CSV file'
 
+    # Company columns written by the import, besides the name
+    FIELDS = [
+        'logo', 'jobs_page_url', 'company_reviews', 'country', 'state', 'city',
+        'work_environment', 'functions_text', 'engineering_positions', 'status',
+    ]
+
     def add_arguments(self, parser):
         parser.add_argument('csv_file', type=str, help='Path to the CSV file')
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='Stream the file in batches with bulk upserts instead of saving row by row',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Rows per batch in bulk mode (default: 2000)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Show what a bulk import would change without writing anything (implies --bulk)',
+        )
+
+    def parse_row(self, row):
+        """Return (company_data, function_names) for a CSV row, or None if the row is invalid."""
+        functions_text = (row.get('Function') or '').strip()
+
+        company_data = {
+            'name': (row.get('Company Name') or '').strip(),
+            'logo': (row.get('Logo') or '').strip() or None,
+            'jobs_page_url': (row.get('Jobs Page URL') or '').strip(),
+            'company_reviews': (row.get('Company Reviews') or '').strip() or None,
+            'country': (row.get('Country') or '').strip(),
+            'state': (row.get('State') or '').strip() or None,
+            'city': (row.get('City') or '').strip() or None,
+            'work_environment': (row.get('WorkEnvironment') or '').strip(),
+            'functions_text': functions_text,
+            'engineering_positions': (row.get('EngineeringPositions') or '').strip().lower() == 'checked',
+            'status': (row.get('Status') or 'Active').strip(),
+        }
+
+        if not company_data['name'] or not company_data['jobs_page_url']:
+            return None
+
+        function_names = list(dict.fromkeys(f.strip() for f in functions_text.split(',') if f.strip()))
+        return company_data, function_names
 
     def handle(self, *args, **options):
         csv_file = options['csv_file']
-        
+        self.verbosity = options['verbosity']
+
+        if options['bulk'] or options['dry_run']:
+            return self.handle_bulk(csv_file, options['batch_size'], options['dry_run'])
+
         self.stdout.write(self.style.WARNING(f'Importing companies from {csv_file}...'))
-        
+
         imported = 0
         updated = 0
         errors = 0
-        
+
         with open(csv_file, 'r', encoding='utf-8-sig') as file:
             reader = csv.DictReader(file)
-            
+
             for row in reader:
                 try:
-                    # Clean and prepare data
-                    functions_text = row.get('Function', '').strip()
-                    
-                    company_data = {
-                        'name': row.get('Company Name', '').strip(),
-                        'logo': row.get('Logo', '').strip() or None,
-                        'jobs_page_url': row.get('Jobs Page URL', '').strip(),
-                        'company_reviews': row.get('Company Reviews', '').strip() or None,
-                        'country': row.get('Country', '').strip(),
-                        'state': row.get('State', '').strip() or None,
-                        'city': row.get('City', '').strip() or None,
-                        'work_environment': row.get('WorkEnvironment', '').strip(),
-                        'functions_text': functions_text,
-                        'engineering_positions': row.get('EngineeringPositions', '').strip().lower() == 'checked',
-                        'status': row.get('Status', 'Active').strip(),
-                    }
-                    
-                    if not company_data['name'] or not company_data['jobs_page_url']:
+                    parsed = self.parse_row(row)
+                    if parsed is None:
                         errors += 1
                         continue
-                    
+                    company_data, function_names = parsed
+
                     # Create or update company
                     company, created = Company.objects.update_or_create(
                         name=company_data['name'],
                         defaults=company_data
                     )
-                    
+
                     # Parse and assign functions
-                    if functions_text:
-                        function_names = [f.strip() for f in functions_text.split(',') if f.strip()]
+                    if function_names:
                         company.functions.clear()
-                        
+
                         for func_name in function_names:
                             func, _ = Function.objects.get_or_create(name=func_name)
                             company.functions.add(func)
-                    
+
                     if created:
                         imported += 1
                         self.stdout.write(self.style.SUCCESS(f'✓ Imported: {company.name}'))
                     else:
                         updated += 1
                         self.stdout.write(self.style.WARNING(f'↻ Updated: {company.name}'))
-                        
+
                 except Exception as e:
                     errors += 1
                     self.stdout.write(self.style.ERROR(f'✗ Error processing row: {str(e)}'))
-        
+
         # Summary
         self.stdout.write(self.style.SUCCESS('\n' + '='*50))
         self.stdout.write(self.style.SUCCESS(f'Import completed!'))
@@ -77,3 +121,229 @@ class Command(BaseCommand):
         self.stdout.write(self.style.WARNING(f'Updated: {updated}'))
         self.stdout.write(self.style.ERROR(f'Errors: {errors}'))
         self.stdout.write(self.style.SUCCESS('='*50))
+
+    def handle_bulk(self, csv_file, batch_size, dry_run):
+        """
+        Import in batches: one upsert for the companies and one insert for the
+        function links per batch, with function names resolved from memory.
+
+        Bulk writes bypass the model signals, so the stored cards and search
+        rows of touched companies are refreshed per batch, built from the
+        parsed rows rather than read back, and the stats counters and
+        directory are rebuilt once at the end.
+        """
+        mode = 'Dry run of' if dry_run else 'Bulk importing'
+        self.stdout.write(self.style.WARNING(f'{mode} companies from {csv_file} (batch size {batch_size})...'))
+
+        started = time.perf_counter()
+        self._load_functions()
+        self.renderer = JSONRenderer()
+        self.totals = {'rows': 0, 'created': 0, 'updated': 0, 'unchanged': 0, 'errors': 0, 'functions': 0}
+
+        with open(csv_file, 'r', encoding='utf-8-sig', newline='') as file:
+            reader = csv.DictReader(file)
+            while True:
+                rows = list(islice(reader, batch_size))
+                if not rows:
+                    break
+                self.totals['rows'] += len(rows)
+                with transaction.atomic():
+                    self._import_batch(rows, dry_run)
+
+        if not dry_run:
+            DirectoryStats.reconcile()
+            CompanyDirectory.invalidate(full=True)
+
+        elapsed = time.perf_counter() - started
+        totals = self.totals
+        self.stdout.write(self.style.SUCCESS('\n' + '='*50))
+        self.stdout.write(self.style.SUCCESS('Dry run completed (nothing written)' if dry_run else 'Import completed!'))
+        self.stdout.write(f"Rows read: {totals['rows']}")
+        self.stdout.write(self.style.SUCCESS(f"Created: {totals['created']}"))
+        self.stdout.write(self.style.WARNING(f"Updated: {totals['updated']}"))
+        self.stdout.write(f"Unchanged: {totals['unchanged']}")
+        self.stdout.write(f"New functions: {totals['functions']}")
+        self.stdout.write(self.style.ERROR(f"Errors: {totals['errors']}"))
+        self.stdout.write(f"Elapsed: {elapsed:.2f}s ({totals['rows'] / elapsed if elapsed else 0:.0f} rows/s)")
+        self.stdout.write(self.style.SUCCESS('='*50))
+
+    def _import_batch(self, rows, dry_run):
+        # Parse and validate; a repeated name within the batch keeps the last row
+        parsed = {}
+        for row in rows:
+            result = self.parse_row(row)
+            if result is None or self._too_long(result[0]):
+                self.totals['errors'] += 1
+                continue
+            parsed[result[0]['name']] = result
+
+        existing = {
+            values.pop('name'): values
+            for values in Company.objects.filter(name__in=parsed).values(
+                'id', 'name', 'is_sponsored', 'sponsor_order', *self.FIELDS
+            )
+        }
+        Through = Company.functions.through
+        current_links = {}
+        for company_id, function_id in Through.objects.filter(
+            company_id__in=[values['id'] for values in existing.values()]
+        ).values_list('company_id', 'function_id'):
+            current_links.setdefault(company_id, set()).add(function_id)
+
+        new_functions = {
+            name for _, function_names in parsed.values() for name in function_names
+            if name not in self.function_ids
+        }
+        self.totals['functions'] += len(new_functions)
+        if new_functions and dry_run:
+            # Count each new function once across batches
+            self.function_ids.update((name, name) for name in new_functions)
+        elif new_functions:
+            Function.objects.bulk_create([Function(name=name) for name in new_functions], ignore_conflicts=True)
+            self._load_functions()
+
+        writes = []
+        relinks = {}
+        for name, (company_data, function_names) in parsed.items():
+            current = existing.get(name)
+            changed = [
+                field for field in self.FIELDS
+                if current is None or not self._same(current[field], company_data[field])
+            ]
+            links_changed = False
+            if function_names:
+                wanted = {self.function_ids.get(func_name, func_name) for func_name in function_names}
+                links_changed = current is None or wanted != current_links.get(current['id'], set())
+                if links_changed:
+                    relinks[name] = function_names
+
+            if current is None:
+                self.totals['created'] += 1
+                self._report(dry_run, f'+ {name}')
+            elif changed or links_changed:
+                self.totals['updated'] += 1
+                self._report(dry_run, f"~ {name}: {', '.join(changed + (['functions'] if links_changed else []))}")
+            else:
+                self.totals['unchanged'] += 1
+                continue
+            if changed:
+                writes.append(company_data)
+
+        if dry_run or not (writes or relinks):
+            return
+
+        now = timezone.now()
+        if writes:
+            self._upsert(writes, now)
+        written = {company_data['name'] for company_data in writes}
+        company_ids = dict(
+            Company.objects.filter(name__in=written | set(relinks)).values_list('name', 'id')
+        )
+
+        if relinks:
+            relinked_ids = [company_ids[name] for name in relinks]
+            Through.objects.filter(company_id__in=relinked_ids).delete()
+            self._link([
+                (company_ids[name], self.function_ids[func_name])
+                for name, function_names in relinks.items()
+                for func_name in function_names
+            ])
+            # Function-only changes still need to reach the incremental directory refresh
+            Company.objects.filter(pk__in=relinked_ids).exclude(name__in=written).update(updated_at=now)
+
+        # Cards and search rows from what was just written, without reading the companies back
+        cards = []
+        documents = {}
+        for name, company_id in company_ids.items():
+            company_data = parsed[name][0]
+            current = existing.get(name)
+            if name in relinks:
+                function_ids = {self.function_ids[func_name] for func_name in relinks[name]}
+            else:
+                function_ids = current_links.get(current['id'], set()) if current else set()
+            functions = [
+                self.functions[function_id] for function_id in sorted(function_ids, key=self.function_order.get)
+            ]
+            cards.append((self._card(company_id, company_data, current, functions), company_id))
+            documents[company_id] = company_document(
+                SimpleNamespace(**company_data), function_names=[function['name'] for function in functions]
+            )
+        Company.write_cards(cards)
+        get_search_backend().index_documents(documents)
+
+    def _load_functions(self):
+        """Function ids by name, card dicts by id, and their position in Function's default ordering."""
+        functions = list(Function.objects.values('id', 'name', 'color', 'text_color'))
+        self.function_ids = {function['name']: function['id'] for function in functions}
+        self.functions = {function['id']: function for function in functions}
+        self.function_order = {function['id']: position for position, function in enumerate(functions)}
+
+    def _upsert(self, writes, now):
+        """Insert or update companies by name with one executemany."""
+        fields = [field for field in Company._meta.concrete_fields if not field.primary_key]
+        updated = set(self.FIELDS) | {'updated_at'}
+        quote = connection.ops.quote_name
+        sql = 'INSERT INTO {} ({}) VALUES ({}) ON CONFLICT ({}) DO UPDATE SET {}'.format(
+            quote(Company._meta.db_table),
+            ', '.join(quote(field.column) for field in fields),
+            ', '.join(['%s'] * len(fields)),
+            quote(Company._meta.get_field('name').column),
+            ', '.join(f'{quote(field.column)} = EXCLUDED.{quote(field.column)}'
+                      for field in fields if field.name in updated),
+        )
+        # Imported values are plain strings, booleans and None; only the
+        # columns the import does not set need preparing, once per batch
+        constants = {
+            field.name: field.get_db_prep_save(now if field.name in ('created_at', 'updated_at') else field.get_default(),
+                                               connection)
+            for field in fields if field.name not in writes[0]
+        }
+        rows = [
+            [company_data[field.name] if field.name in company_data else constants[field.name] for field in fields]
+            for company_data in writes
+        ]
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, rows)
+
+    def _link(self, links):
+        """Insert (company_id, function_id) rows into the functions through table."""
+        Through = Company.functions.through
+        quote = connection.ops.quote_name
+        sql = 'INSERT INTO {} ({}, {}) VALUES (%s, %s)'.format(
+            quote(Through._meta.db_table),
+            quote(Through._meta.get_field('company').column),
+            quote(Through._meta.get_field('function').column),
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, links)
+
+    def _card(self, company_id, company_data, current, functions):
+        """Render the CompanyListSerializer card of an imported company."""
+        values = {
+            'is_sponsored': current['is_sponsored'] if current else Company._meta.get_field('is_sponsored').default,
+            'sponsor_order': current['sponsor_order'] if current else Company._meta.get_field('sponsor_order').default,
+            **company_data,
+            'id': company_id,
+            'functions': functions,
+        }
+        card = {field: values[field] for field in CompanyListSerializer.Meta.fields}
+        # What ImageField.to_representation returns without a request
+        card['logo'] = Company._meta.get_field('logo').storage.url(card['logo']) if card['logo'] else None
+        return self.renderer.render(card).decode('utf-8')
+
+    @staticmethod
+    def _same(stored, imported):
+        # Blank optional columns are stored as '' or NULL depending on the field
+        return stored == imported or (stored in ('', None) and imported in ('', None))
+
+    def _too_long(self, company_data):
+        for field, value in company_data.items():
+            max_length = Company._meta.get_field(field).max_length
+            if max_length and isinstance(value, str) and len(value) > max_length:
+                return True
+        return False
+
+    def _report(self, dry_run, line):
+        if dry_run or self.verbosity > 1:
+            self.stdout.write(line)
+
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from companies.services.retention_service import DeliveryLogPartitions
+
+
+class Command(BaseCommand):
+    help = 'Partition the sponsor delivery log by month (PostgreSQL), or create upcoming partitions'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--months-ahead',
+            type=int,
+            default=2,
+            help='Monthly partitions to create beyond the current month (default: 2)',
+        )
+
+    def handle(self, *args, **options):
+        if not DeliveryLogPartitions.supported():
+            raise CommandError('Native partitioning needs PostgreSQL')
+
+        today = timezone.now().date()
+        if DeliveryLogPartitions.is_partitioned():
+            created = DeliveryLogPartitions.ensure(today, options['months_ahead'])
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'Converting {DeliveryLogPartitions.TABLE}; beacon processing waits until this commits...'
+            ))
+            try:
+                created = DeliveryLogPartitions.convert(today, options['months_ahead'])
+            except RuntimeError as exc:
+                raise CommandError(str(exc))
+
+        for name in created:
+            self.stdout.write(f'Created partition {name}')
+        self.stdout.write(self.style.SUCCESS(f'{DeliveryLogPartitions.TABLE} is partitioned by month'))
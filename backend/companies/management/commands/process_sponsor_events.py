@@ -0,0 +1,50 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from companies.services.sponsor_service import SponsorEventProcessor
+
+
+class Command(BaseCommand):
+    help = 'Apply queued sponsor impression/click events to the delivery log and daily stats'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help='Events applied per transaction')
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for new events every --interval seconds',
+        )
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds to sleep when the queue is empty')
+        parser.add_argument(
+            '--keep-hours',
+            type=int,
+            default=24,
+            help='Delete processed events older than this many hours after draining (default: 24)',
+        )
+
+    def handle(self, *args, **options):
+        keep = timedelta(hours=options['keep_hours'])
+        last_purge = 0
+
+        while True:
+            started = time.perf_counter()
+            processed = 0
+            while True:
+                applied = SponsorEventProcessor.process_batch(options['batch_size'])
+                processed += applied
+                if applied < options['batch_size']:
+                    break
+
+            if processed:
+                elapsed = time.perf_counter() - started
+                self.stdout.write(self.style.SUCCESS(f'Processed {processed} events in {elapsed:.2f}s'))
+
+            if time.time() - last_purge >= 3600:
+                purged = SponsorEventProcessor.purge_processed(keep)
+                last_purge = time.time()
+                if purged:
+                    self.stdout.write(f'Purged {purged} processed events')
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,56 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from companies.models import SponsorDeliveryLog
+from companies.services.retention_service import DeliveryLogPartitions, DeliveryLogRetention
+
+
+class Command(BaseCommand):
+    help = 'Roll up completed days of sponsor delivery logs and purge raw rows past the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days',
+            type=int,
+            default=settings.SPONSOR_LOG_RETENTION_DAYS,
+            help=f'Days of raw rows to keep (default: SPONSOR_LOG_RETENTION_DAYS = {settings.SPONSOR_LOG_RETENTION_DAYS})',
+        )
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Rows deleted per transaction')
+        parser.add_argument('--sleep', type=float, default=0.0, help='Seconds to pause between delete chunks')
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report pending rollup days and purgeable rows without writing anything',
+        )
+
+    def handle(self, *args, **options):
+        today = timezone.now().date()
+        cutoff = DeliveryLogRetention.cutoff(options['retention_days'], today)
+
+        if options['dry_run']:
+            pending = DeliveryLogRetention.pending_days(today)
+            self.stdout.write(f'Days to roll up: {len(pending)}')
+            # Pending days are rolled up before purging, so they count as purgeable
+            purgeable = SponsorDeliveryLog.objects.filter(shown_at__lt=cutoff).count()
+            self.stdout.write(f'Raw rows before {cutoff:%Y-%m-%d}: {purgeable}')
+            return
+
+        started = time.perf_counter()
+        rolled = DeliveryLogRetention.rollup_pending(today)
+        for date, rows in rolled.items():
+            self.stdout.write(f'Rolled up {date}: {rows} rows')
+
+        if DeliveryLogPartitions.is_partitioned():
+            for name in DeliveryLogPartitions.ensure(today):
+                self.stdout.write(f'Created partition {name}')
+            before = DeliveryLogRetention.purgeable_before(cutoff)
+            if before is not None:
+                for name in DeliveryLogPartitions.drop_before(before):
+                    self.stdout.write(self.style.WARNING(f'Dropped partition {name}'))
+
+        deleted = DeliveryLogRetention.purge(cutoff, options['chunk_size'], options['sleep'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {deleted} delivery log rows before {cutoff:%Y-%m-%d} in {elapsed:.2f}s'
+        ))
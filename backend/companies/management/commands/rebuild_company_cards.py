@@ -0,0 +1,33 @@
+import time
+from django.core.management.base import BaseCommand
+from companies.models import Company
+from companies.services.directory_service import CompanyDirectory
+
+
+class Command(BaseCommand):
+    help = 'Regenerate the stored list card JSON for every company'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing',
+            action='store_true',
+            help='Only fill in companies that have no stored card yet',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of companies written per bulk update (default: 500)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = Company.objects.all()
+        if options['missing']:
+            queryset = queryset.filter(card_json='')
+
+        started = time.perf_counter()
+        total = Company.refresh_cards(queryset, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        CompanyDirectory.invalidate(full=True)
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total} company cards in {elapsed:.2f}s'))
@@ -0,0 +1,19 @@
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from companies.services.search_service import get_search_backend
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the company full-text search index from scratch'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        self.stdout.write(self.style.WARNING(f'Rebuilding search index with {backend.__name__}...'))
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            total = backend.rebuild()
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(f'Indexed {total} companies in {elapsed:.2f}s'))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from companies.models import DirectoryCounter
+from companies.services.stats_service import DirectoryStats
+
+
+class Command(BaseCommand):
+    help = 'Recount the directory stats counters from the companies table (run periodically, e.g. from cron)'
+
+    def handle(self, *args, **options):
+        before = dict(DirectoryCounter.objects.values_list('key', 'value'))
+        stats = DirectoryStats.reconcile()
+        after = dict(DirectoryCounter.objects.values_list('key', 'value'))
+
+        drifted = sorted(key for key in before.keys() | after.keys() if before.get(key, 0) != after.get(key, 0))
+        for key in drifted:
+            self.stdout.write(self.style.WARNING(f'  {key}: {before.get(key, 0)} -> {after.get(key, 0)}'))
+
+        summary = ', '.join(f'{field}={value}' for field, value in stats.items())
+        if drifted:
+            self.stdout.write(self.style.SUCCESS(f'Corrected {len(drifted)} counters ({summary})'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Counters already in sync ({summary})'))
@@ -0,0 +1,240 @@
+import random
+import statistics
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from companies.models import Company, SponsorCampaign
+from companies.services.sponsor_service import (
+    SponsorCampaignTable, SponsorDailyCounters, SponsorFatigueStore, SponsorSelector,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Simulate a day of sponsored delivery against synthetic campaigns and users, '
+        'and report selection latency, queries, cap overshoot and fairness. The campaigns are never '
+        'saved and every beacon is rolled back, so real campaigns are neither locked nor served'
+    )
+
+    COUNTRIES = ['USA', 'Canada', 'Germany', 'United Kingdom', 'India', 'France']
+    FUNCTIONS = ['Engineering', 'Product', 'Design', 'Data', 'Sales', 'Marketing']
+    WORK_ENVIRONMENTS = ['Remote', 'Hybrid', 'On-site']
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campaigns', type=int, default=20, help='Synthetic campaigns to seed')
+        parser.add_argument('--users', type=int, default=2000, help='Synthetic users browsing during the day')
+        parser.add_argument('--pages-per-user', type=float, default=6.0, help='Mean page views per user session')
+        parser.add_argument('--click-rate', type=float, default=0.02, help='Chance an impression is clicked')
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        day = timezone.now().date()
+        day_start = datetime.combine(day, datetime.min.time(), tzinfo=dt_timezone.utc)
+
+        views = self._page_views(options['users'], options['pages_per_user'], day_start, rng)
+        self.stdout.write(f'Simulating {len(views)} page views from {options["users"]} users on {day}...')
+
+        campaigns = self._seed(options['campaigns'], len(views), day_start, rng)
+        try:
+            # Only the synthetic campaigns take part, without a transaction held open for the run
+            with SponsorCampaignTable.pinned(campaigns):
+                results = self._run(views, campaigns, options['click_rate'], rng)
+            self._report(results, campaigns, day_start)
+        finally:
+            # The synthetic campaigns and users leave state in the shared cache
+            cache.delete_many(
+                [SponsorDailyCounters.key(c.id, day, field) for c in campaigns for field in SponsorDailyCounters.FIELDS] +
+                [SponsorFatigueStore.key(self._user_hash(user)) for user in range(options['users'])]
+            )
+
+        self.stdout.write(self.style.SUCCESS('Simulation complete (nothing saved)'))
+
+    @staticmethod
+    def _user_hash(user):
+        return f'simulated-user-{user}'
+
+    def _page_views(self, users, pages_per_user, day_start, rng):
+        """(time, user, filters, page number) for every simulated page view, in time order."""
+        views = []
+        for user in range(users):
+            at = day_start + timedelta(seconds=rng.uniform(0, 24 * 60 * 60 - 1))
+            filters = {}
+            page_number = 1
+            for _ in range(max(1, round(rng.expovariate(1 / pages_per_user)))):
+                if at.date() != day_start.date():
+                    break
+                # Users mostly page through one listing, sometimes refine the filters
+                if page_number == 1 or rng.random() < 0.3:
+                    filters = self._filters(rng)
+                    page_number = 1
+                views.append((at, user, filters, page_number))
+                page_number += 1
+                at += timedelta(seconds=rng.uniform(20, 120))
+        views.sort(key=lambda view: view[0])
+        return views
+
+    def _filters(self, rng):
+        filters = {}
+        if rng.random() < 0.5:
+            filters['country'] = rng.choice(self.COUNTRIES)
+        if rng.random() < 0.3:
+            filters['function'] = rng.choice(self.FUNCTIONS)
+        if rng.random() < 0.2:
+            filters['work_environment'] = rng.choice(self.WORK_ENVIRONMENTS)
+        return filters
+
+    def _seed(self, count, page_views, day_start, rng):
+        """Unsaved campaigns, with negative ids so their cache keys cannot collide with real campaigns."""
+        self.stdout.write(f'Seeding {count} synthetic campaigns...')
+        fair_share = max(1, page_views // max(1, count))
+        campaigns = []
+        for i in range(count):
+            company = Company(
+                id=-(i + 1), name=f'Simulated sponsor {i}', jobs_page_url='https://example.com/jobs',
+                country=rng.choice(self.COUNTRIES), work_environment='Remote', status='Active',
+            )
+            # Roughly half the campaigns target on at least one dimension
+            campaigns.append(SponsorCampaign(
+                id=-(i + 1),
+                company=company,
+                name=f'Simulated campaign {i}',
+                status='active',
+                start_at=day_start - timedelta(days=1),
+                end_at=day_start + timedelta(days=2),
+                priority=rng.randint(1, 5),
+                weight=rng.randint(1, 10),
+                daily_impression_cap=max(1, int(fair_share * rng.uniform(0.3, 3.0))),
+                daily_click_cap=rng.randint(5, 50) if rng.random() < 0.2 else None,
+                targeting_countries=rng.sample(self.COUNTRIES, rng.randint(1, 3)) if rng.random() < 0.4 else [],
+                targeting_functions=rng.sample(self.FUNCTIONS, rng.randint(1, 2)) if rng.random() < 0.3 else [],
+                targeting_work_env=rng.sample(self.WORK_ENVIRONMENTS, 1) if rng.random() < 0.2 else [],
+                pacing='even' if rng.random() < 0.7 else 'asap',
+            ))
+        return campaigns
+
+    def _run(self, views, campaigns, click_rate, rng):
+        by_id = {campaign.id: campaign for campaign in campaigns}
+        results = {
+            'timings': [],
+            'queries': [],
+            'impressions': Counter(),
+            'clicks': Counter(),
+            'expected': Counter(),
+            'capped_at': {},
+            'by_noon': Counter(),
+            'empty': 0,
+        }
+        query_count = [0]
+
+        def count_queries(execute, sql, params, many, context):
+            query_count[0] += 1
+            return execute(sql, params, many, context)
+
+        for at, user, filters, page_number in views:
+            user_hash = self._user_hash(user)
+
+            query_count[0] = 0
+            with connection.execute_wrapper(count_queries):
+                started = time.perf_counter()
+                selected = SponsorSelector.pick_sponsored_campaign(filters, user_hash, page_number, now=at)
+                results['timings'].append((time.perf_counter() - started) * 1000)
+            results['queries'].append(query_count[0])
+
+            # Weight-proportional share among the campaigns targeting this page
+            matching = SponsorCampaignTable.matching_campaigns(filters, at)
+            total_weight = sum(c.priority * c.weight for c in matching)
+            for campaign in matching:
+                results['expected'][campaign.id] += campaign.priority * campaign.weight / total_weight
+
+            if selected is None:
+                results['empty'] += 1
+                continue
+            campaign = by_id[selected.id]
+            self._record(SponsorSelector.record_impression, campaign, user_hash, page_number, at)
+            results['impressions'][campaign.id] += 1
+            if at.hour < 12:
+                results['by_noon'][campaign.id] += 1
+            if results['impressions'][campaign.id] == campaign.daily_impression_cap:
+                results['capped_at'][campaign.id] = at
+            if rng.random() < click_rate:
+                self._record(SponsorSelector.record_click, campaign, user_hash, page_number, at)
+                results['clicks'][campaign.id] += 1
+        return results
+
+    @staticmethod
+    def _record(record, campaign, user_hash, page_number, at):
+        """
+        Record a beacon for its cache side effects (daily counters, fatigue)
+        and roll back its queued event row, one short transaction each.
+        """
+        with transaction.atomic():
+            record(campaign, user_hash, f'simulated:page={page_number}', now=at)
+            transaction.set_rollback(True)
+
+    def _report(self, results, campaigns, day_start):
+        timings, queries = results['timings'], results['queries']
+        served = sum(results['impressions'].values())
+        self.stdout.write(
+            f'\nSelections: {len(timings)}  served: {served}  no sponsor: {results["empty"]}'
+        )
+        self.stdout.write(
+            f'Selection latency: p50 {self._pct(timings, 50):.3f} ms  p99 {self._pct(timings, 99):.3f} ms  '
+            f'max {max(timings):.3f} ms'
+        )
+        self.stdout.write(
+            f'Queries per selection: mean {statistics.mean(queries):.3f}  max {max(queries)}  '
+            f'selections with queries: {sum(1 for q in queries if q)}'
+        )
+
+        self.stdout.write(
+            f'\n{"campaign":<10}{"pacing":<7}{"pri*w":>6}{"cap":>7}{"served":>8}{"over":>6}'
+            f'{"clicks":>8}{"noon %":>8}{"capped at":>11}{"vs weight":>11}'
+        )
+        overshoot = 0
+        deviations = []
+        for campaign in campaigns:
+            delivered = results['impressions'][campaign.id]
+            over = max(0, delivered - campaign.daily_impression_cap)
+            overshoot += over
+            capped_at = results['capped_at'].get(campaign.id)
+            noon = results['by_noon'][campaign.id] / delivered * 100 if delivered else 0
+            expected = results['expected'][campaign.id]
+            # Served vs the weight-proportional share, only for campaigns their cap did not limit
+            ratio = ''
+            if capped_at is None and expected:
+                ratio = f'{delivered / expected:.2f}'
+                deviations.append(abs(delivered - expected))
+            self.stdout.write(
+                f'{campaign.id:<10}{campaign.pacing:<7}{campaign.priority * campaign.weight:>6}'
+                f'{campaign.daily_impression_cap:>7}{delivered:>8}{over:>6}{results["clicks"][campaign.id]:>8}'
+                f'{noon:>8.1f}{capped_at.strftime("%H:%M") if capped_at else "-":>11}{ratio:>11}'
+            )
+
+        total_cap = sum(c.daily_impression_cap for c in campaigns)
+        self.stdout.write(f'\nCap overshoot: {overshoot} impressions ({overshoot / total_cap * 100:.2f}% of total caps)')
+        for pacing in ('even', 'asap'):
+            capped = [
+                (results['capped_at'][c.id] - day_start).total_seconds() / 3600
+                for c in campaigns if c.pacing == pacing and c.id in results['capped_at']
+            ]
+            if capped:
+                self.stdout.write(
+                    f'{pacing} campaigns capped: {len(capped)}, median cap hour {statistics.median(capped):.1f}'
+                )
+        expected_total = sum(results['expected'][c.id] for c in campaigns if c.id not in results['capped_at'])
+        if deviations and expected_total:
+            self.stdout.write(
+                f'Fairness (uncapped campaigns): mean |served - weighted share| '
+                f'{sum(deviations) / expected_total * 100:.1f}% of their expected impressions'
+            )
+
+    @staticmethod
+    def _pct(values, percentile):
+        if len(values) == 1:
+            return values[0]
+        return statistics.quantiles(values, n=100, method='inclusive')[percentile - 1]
@@ -0,0 +1,104 @@
+# Generated manually for the company full-text search index.
+#
+# The index lives in vendor-specific shadow tables that the ORM does not
+# manage: a tsvector/trigram table on PostgreSQL and FTS5 virtual tables on
+# SQLite. See companies.services.search_service.
+
+from django.db import migrations
+
+
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    """
+    CREATE TABLE IF NOT EXISTS companies_company_search (
+        company_id bigint PRIMARY KEY REFERENCES companies_company (id) ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED,
+        document tsvector NOT NULL,
+        text text NOT NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS companies_company_search_document_gin ON companies_company_search USING gin (document)",
+    "CREATE INDEX IF NOT EXISTS companies_company_search_text_trgm ON companies_company_search USING gin (text gin_trgm_ops)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP TABLE IF EXISTS companies_company_search",
+]
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS companies_company_fts USING fts5(name, functions, city, country, tokenize='unicode61')",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS companies_company_fts_trigram USING fts5(text, tokenize='trigram')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS companies_company_fts",
+    "DROP TABLE IF EXISTS companies_company_fts_trigram",
+]
+
+
+def create_search_index(apps, schema_editor):
+    """Create the shadow tables and index existing companies."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_FORWARD
+    elif vendor == 'sqlite':
+        statements = SQLITE_FORWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+    Company = apps.get_model('companies', 'Company')
+    for company in Company.objects.order_by('id').prefetch_related('functions').iterator(chunk_size=1000):
+        name = company.name or ''
+        functions = ' '.join(func.name for func in company.functions.all())
+        city = company.city or ''
+        country = company.country or ''
+        if vendor == 'postgresql':
+            schema_editor.execute(
+                """
+                INSERT INTO companies_company_search (company_id, document, text)
+                VALUES (
+                    %s,
+                    setweight(to_tsvector('simple', %s), 'A') ||
+                    setweight(to_tsvector('simple', %s), 'B') ||
+                    setweight(to_tsvector('simple', %s || ' ' || %s), 'C'),
+                    %s
+                )
+                ON CONFLICT (company_id) DO NOTHING
+                """,
+                [company.id, name, functions, city, country, ' '.join([name, functions, city, country])]
+            )
+        else:
+            schema_editor.execute(
+                "INSERT INTO companies_company_fts (rowid, name, functions, city, country) VALUES (%s, %s, %s, %s, %s)",
+                [company.id, name, functions, city, country]
+            )
+            schema_editor.execute(
+                "INSERT INTO companies_company_fts_trigram (rowid, text) VALUES (%s, %s)",
+                [company.id, ' '.join([name, functions, city, country])]
+            )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        statements = POSTGRES_BACKWARD
+    elif vendor == 'sqlite':
+        statements = SQLITE_BACKWARD
+    else:
+        return
+
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0023_staticpage'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0024_company_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='company',
+            name='card_json',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+    ]
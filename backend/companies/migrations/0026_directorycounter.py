@@ -0,0 +1,49 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:23
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def seed_counters(apps, schema_editor):
+    """Initialise the counters from the existing companies."""
+    Company = apps.get_model('companies', 'Company')
+    DirectoryCounter = apps.get_model('companies', 'DirectoryCounter')
+
+    totals = Company.objects.aggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(status='Active')),
+        engineering=Count('id', filter=Q(engineering_positions=True)),
+    )
+    countries = Company.objects.values_list('country').annotate(count=Count('id')).order_by()
+    for country, count in countries:
+        totals[f'country:{country}'] = count
+    totals['countries'] = len(countries)
+
+    DirectoryCounter.objects.bulk_create(
+        DirectoryCounter(key=key, value=value) for key, value in totals.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0025_company_card_json'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirectoryCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=150, unique=True)),
+                ('value', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Directory Counter',
+                'verbose_name_plural': 'Directory Counters',
+                'ordering': ['key'],
+            },
+        ),
+        migrations.RunPython(seed_counters, migrations.RunPython.noop),
+    ]
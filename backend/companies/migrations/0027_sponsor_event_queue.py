@@ -0,0 +1,39 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:42
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0026_directorycounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sponsorimpressionevent',
+            name='action',
+            field=models.CharField(choices=[('impression', 'Impression'), ('click', 'Click')], default='impression', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='sponsorimpressionevent',
+            name='ip_address',
+            field=models.GenericIPAddressField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='sponsorimpressionevent',
+            name='page_key',
+            field=models.CharField(blank=True, max_length=500),
+        ),
+        migrations.AlterField(
+            model_name='sponsordeliverylog',
+            name='shown_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='sponsorimpressionevent',
+            name='page_url',
+            field=models.URLField(blank=True),
+        ),
+    ]
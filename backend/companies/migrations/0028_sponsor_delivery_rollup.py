@@ -0,0 +1,44 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0027_sponsor_event_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SponsorDeliveryRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('page_key', models.CharField(max_length=500)),
+                ('impressions', models.PositiveIntegerField(default=0)),
+                ('clicks', models.PositiveIntegerField(default=0)),
+                ('unique_users', models.PositiveIntegerField(default=0, help_text='Distinct user hashes on this page that day')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='sponsordeliverylog',
+            index=models.Index(fields=['shown_at'], name='companies_s_shown_a_544587_idx'),
+        ),
+        migrations.AddField(
+            model_name='sponsordeliveryrollup',
+            name='campaign',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='delivery_rollups', to='companies.sponsorcampaign'),
+        ),
+        migrations.AddIndex(
+            model_name='sponsordeliveryrollup',
+            index=models.Index(fields=['date'], name='companies_s_date_788908_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='sponsordeliveryrollup',
+            unique_together={('campaign', 'date', 'page_key')},
+        ),
+    ]
@@ -0,0 +1,186 @@
+import hashlib
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+LOG_MODELS = ['SponsorDeliveryLog', 'SponsorImpressionEvent']
+
+# Log text column -> dimension model
+DIMENSIONS = {'user_agent': 'UserAgent', 'referrer': 'Referrer'}
+
+
+# Log rows read, mapped and written back per round trip
+BATCH_SIZE = 500
+
+
+def digest_for(value):
+    return hashlib.blake2b(value.encode('utf-8'), digest_size=20).hexdigest()
+
+
+def walk(Log, fields):
+    """Yield ``(pk, *fields)`` rows of ``Log`` in primary key order, BATCH_SIZE at a time."""
+    last = 0
+    while True:
+        rows = list(Log.objects.filter(pk__gt=last).order_by('pk').values_list('pk', *fields)[:BATCH_SIZE])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1][0]
+
+
+def update_sql(connection, Log, columns):
+    quote = connection.ops.quote_name
+    return 'UPDATE {} SET {} WHERE {} = %s'.format(
+        quote(Log._meta.db_table),
+        ', '.join(f'{quote(column)} = %s' for column in columns),
+        quote(Log._meta.pk.column),
+    )
+
+
+def encode_dimensions(apps, schema_editor):
+    """
+    Point every log row at the interned copy of its user agent and referrer.
+
+    Each log table is walked once in primary key ranges: the batch's distinct
+    values are interned, mapped to ids in Python and written back with one
+    ``executemany``, so the cost stays linear in the table size however many
+    distinct values there are.
+    """
+    connection = schema_editor.connection
+    dimensions = [apps.get_model('companies', name) for name in DIMENSIONS.values()]
+    for model_name in LOG_MODELS:
+        Log = apps.get_model('companies', model_name)
+        sql = update_sql(connection, Log, [Log._meta.get_field(f'{field}_ref').column for field in DIMENSIONS])
+        for rows in walk(Log, DIMENSIONS):
+            ids = []
+            for position, Dimension in enumerate(dimensions, start=1):
+                digests = {digest_for(row[position]): row[position] for row in rows if row[position]}
+                Dimension.objects.bulk_create(
+                    [Dimension(value=value, digest=digest) for digest, value in digests.items()],
+                    ignore_conflicts=True,
+                )
+                ids.append({
+                    digests[digest]: pk
+                    for digest, pk in Dimension.objects.filter(digest__in=digests).values_list('digest', 'id')
+                })
+            params = [
+                [mapping.get(row[position]) for position, mapping in enumerate(ids, start=1)] + [row[0]]
+                for row in rows
+                if any(row[1:])
+            ]
+            if params:
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, params)
+
+
+def decode_dimensions(apps, schema_editor):
+    """Copy the interned values back onto the log rows, in the same primary key ranges."""
+    connection = schema_editor.connection
+    dimensions = [apps.get_model('companies', name) for name in DIMENSIONS.values()]
+    refs = [f'{field}_ref_id' for field in DIMENSIONS]
+    for model_name in LOG_MODELS:
+        Log = apps.get_model('companies', model_name)
+        sql = update_sql(connection, Log, [Log._meta.get_field(field).column for field in DIMENSIONS])
+        for rows in walk(Log, refs):
+            values = []
+            for position, Dimension in enumerate(dimensions, start=1):
+                pks = {row[position] for row in rows if row[position]}
+                values.append(dict(Dimension.objects.filter(pk__in=pks).values_list('id', 'value')))
+            params = [
+                [mapping.get(row[position], '') for position, mapping in enumerate(values, start=1)] + [row[0]]
+                for row in rows
+                if any(row[1:])
+            ]
+            if params:
+                with connection.cursor() as cursor:
+                    cursor.executemany(sql, params)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0028_sponsor_delivery_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Referrer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.TextField()),
+                ('digest', models.CharField(editable=False, help_text='BLAKE2b digest of value, for the unique lookup', max_length=40, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='UserAgent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('value', models.TextField()),
+                ('digest', models.CharField(editable=False, help_text='BLAKE2b digest of value, for the unique lookup', max_length=40, unique=True)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='sponsordeliverylog',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='companies.useragent'),
+        ),
+        migrations.AddField(
+            model_name='sponsordeliverylog',
+            name='referrer_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='companies.referrer'),
+        ),
+        migrations.AddField(
+            model_name='sponsorimpressionevent',
+            name='user_agent_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='companies.useragent'),
+        ),
+        migrations.AddField(
+            model_name='sponsorimpressionevent',
+            name='referrer_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='companies.referrer'),
+        ),
+        migrations.RunPython(encode_dimensions, decode_dimensions),
+        migrations.RemoveField(
+            model_name='sponsordeliverylog',
+            name='user_agent',
+        ),
+        migrations.RemoveField(
+            model_name='sponsordeliverylog',
+            name='referrer',
+        ),
+        migrations.RemoveField(
+            model_name='sponsorimpressionevent',
+            name='user_agent',
+        ),
+        migrations.RemoveField(
+            model_name='sponsorimpressionevent',
+            name='referrer',
+        ),
+        migrations.RenameField(
+            model_name='sponsordeliverylog',
+            old_name='user_agent_ref',
+            new_name='user_agent',
+        ),
+        migrations.RenameField(
+            model_name='sponsordeliverylog',
+            old_name='referrer_ref',
+            new_name='referrer',
+        ),
+        migrations.RenameField(
+            model_name='sponsorimpressionevent',
+            old_name='user_agent_ref',
+            new_name='user_agent',
+        ),
+        migrations.RenameField(
+            model_name='sponsorimpressionevent',
+            old_name='referrer_ref',
+            new_name='referrer',
+        ),
+    ]
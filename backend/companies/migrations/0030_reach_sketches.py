@@ -0,0 +1,42 @@
+# Generated by Django 4.2.27 on 2026-10-17 17:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0029_log_dimensions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyReachSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('registers', models.BinaryField(help_text='zlib-compressed HyperLogLog registers')),
+                ('estimate', models.PositiveIntegerField(default=0, help_text='Estimated distinct users that day')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reach_sketches', to='companies.company')),
+            ],
+            options={
+                'unique_together': {('company', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CampaignReachSketch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('registers', models.BinaryField(help_text='zlib-compressed HyperLogLog registers')),
+                ('estimate', models.PositiveIntegerField(default=0, help_text='Estimated distinct users that day')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('campaign', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reach_sketches', to='companies.sponsorcampaign')),
+            ],
+            options={
+                'unique_together': {('campaign', 'date')},
+            },
+        ),
+    ]
@@ -0,0 +1,90 @@
+from django.db import migrations, models
+import django.db.models.deletion
+from datetime import timedelta
+from decimal import Decimal
+
+
+COUNTERS = ['page_views', 'job_page_clicks', 'profile_views', 'application_clicks', 'contact_clicks']
+RATES = ['click_through_rate', 'engagement_rate']
+
+# Rollup model -> first day of the period containing a date
+PERIODS = {
+    'CampaignStatisticsWeekly': lambda date: date - timedelta(days=date.weekday()),
+    'CampaignStatisticsMonthly': lambda date: date.replace(day=1),
+}
+
+
+def backfill_rollups(apps, schema_editor):
+    """Sum the existing daily rows into their weeks and months."""
+    CampaignStatistics = apps.get_model('companies', 'CampaignStatistics')
+    for model_name, period_start in PERIODS.items():
+        Rollup = apps.get_model('companies', model_name)
+        rollups = {}
+        for row in CampaignStatistics.objects.values('company_id', 'date', *COUNTERS, *RATES).iterator():
+            key = (row['company_id'], period_start(row['date']))
+            rollup = rollups.get(key)
+            if rollup is None:
+                rollup = rollups[key] = Rollup(
+                    company_id=key[0], period_start=key[1], **{f'{name}_sum': Decimal(0) for name in RATES}
+                )
+            rollup.days += 1
+            for name in COUNTERS:
+                setattr(rollup, name, getattr(rollup, name) + row[name])
+            for name in RATES:
+                setattr(rollup, f'{name}_sum', getattr(rollup, f'{name}_sum') + row[name])
+        Rollup.objects.bulk_create(rollups.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('companies', '0030_reach_sketches'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CampaignStatisticsWeekly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('days', models.PositiveSmallIntegerField(default=0, help_text='Daily rows summed into this period')),
+                ('page_views', models.PositiveIntegerField(default=0)),
+                ('job_page_clicks', models.PositiveIntegerField(default=0)),
+                ('profile_views', models.PositiveIntegerField(default=0)),
+                ('application_clicks', models.PositiveIntegerField(default=0)),
+                ('contact_clicks', models.PositiveIntegerField(default=0)),
+                ('click_through_rate_sum', models.DecimalField(decimal_places=2, default=0.0, max_digits=9)),
+                ('engagement_rate_sum', models.DecimalField(decimal_places=2, default=0.0, max_digits=9)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='weekly_stats', to='companies.company')),
+            ],
+            options={
+                'verbose_name': 'Weekly Campaign Statistics',
+                'verbose_name_plural': 'Weekly Campaign Statistics',
+                'unique_together': {('company', 'period_start')},
+            },
+        ),
+        migrations.CreateModel(
+            name='CampaignStatisticsMonthly',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField()),
+                ('days', models.PositiveSmallIntegerField(default=0, help_text='Daily rows summed into this period')),
+                ('page_views', models.PositiveIntegerField(default=0)),
+                ('job_page_clicks', models.PositiveIntegerField(default=0)),
+                ('profile_views', models.PositiveIntegerField(default=0)),
+                ('application_clicks', models.PositiveIntegerField(default=0)),
+                ('contact_clicks', models.PositiveIntegerField(default=0)),
+                ('click_through_rate_sum', models.DecimalField(decimal_places=2, default=0.0, max_digits=9)),
+                ('engagement_rate_sum', models.DecimalField(decimal_places=2, default=0.0, max_digits=9)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('company', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='monthly_stats', to='companies.company')),
+            ],
+            options={
+                'verbose_name': 'Monthly Campaign Statistics',
+                'verbose_name_plural': 'Monthly Campaign Statistics',
+                'unique_together': {('company', 'period_start')},
+            },
+        ),
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
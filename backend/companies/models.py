@@ -1,4 +1,6 @@
-from django.db import models
+import hashlib
+
+from django.db import models, transaction
 from django.utils.html import format_html
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -40,6 +42,10 @@ class Company(models.Model):
     is_sponsored = models.BooleanField(default=False, help_text="Mark as sponsored company")
     sponsor_order = models.PositiveIntegerField(default=0, help_text="Order for sponsored companies (lower numbers first)")
     
+    # Pre-serialized list card (CompanyListSerializer output), kept in sync by
+    # companies.signals and backfilled with the rebuild_company_cards command
+    card_json = models.TextField(blank=True, default='', editable=False)
+    
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -58,6 +64,12 @@ class Company(models.Model):
     def __str__(self):
         return self.name
     
+    def save(self, *args, **kwargs):
+        # One transaction from pre_save to post_save: the directory stats handlers
+        # lock the stored row before diffing against it (see companies.signals)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+    
     def get_functions_list(self):
         """Return functions as a list of dicts with name and color."""
         return [
@@ -75,6 +87,58 @@ class Company(models.Model):
             return [w.strip() for w in self.work_environment.split(',')]
         return []
     
+    def render_card(self):
+        """Return the list card as JSON text, with a site-relative logo URL."""
+        return Company.render_cards([self])[0]
+    
+    def refresh_card(self):
+        """Regenerate and store the card without touching updated_at."""
+        self.card_json = self.render_card()
+        Company.objects.filter(pk=self.pk).update(card_json=self.card_json)
+    
+    @classmethod
+    def render_cards(cls, companies):
+        """Render list cards for many companies, reusing one serializer."""
+        from rest_framework.renderers import JSONRenderer
+        from .serializers import CompanyListSerializer
+        renderer = JSONRenderer()
+        return [
+            renderer.render(card).decode('utf-8')
+            for card in CompanyListSerializer(companies, many=True).data
+        ]
+    
+    @classmethod
+    def refresh_cards(cls, queryset, batch_size=500):
+        """Regenerate cards for a queryset in batches; returns the number updated."""
+        updated = 0
+        batch = []
+        for company in queryset.order_by('pk').prefetch_related('functions').iterator(chunk_size=batch_size):
+            batch.append(company)
+            if len(batch) >= batch_size:
+                updated += cls.store_cards(batch)
+                batch = []
+        if batch:
+            updated += cls.store_cards(batch)
+        return updated
+    
+    @classmethod
+    def store_cards(cls, companies):
+        """Render and save cards for companies whose functions are prefetched."""
+        rows = []
+        for company, card_json in zip(companies, cls.render_cards(companies)):
+            company.card_json = card_json
+            rows.append((card_json, company.pk))
+        return cls.write_cards(rows)
+    
+    @classmethod
+    def write_cards(cls, rows):
+        """Save already rendered cards given as (card_json, pk) pairs; returns the number written."""
+        from django.db import connection
+        # A plain executemany is much cheaper than bulk_update's CASE expression
+        with connection.cursor() as cursor:
+            cursor.executemany(f'UPDATE {cls._meta.db_table} SET card_json = %s WHERE id = %s', rows)
+        return len(rows)
+    
     def logo_preview(self):
         """Return HTML for logo preview in admin."""
         if self.logo:
@@ -116,6 +180,29 @@ class WorkEnvironment(models.Model):
         return self.name
 
 
+class DirectoryCounter(models.Model):
+    """
+    Running totals behind the public directory stats.
+    
+    Rows are adjusted by the Company save/delete signals in the same
+    transaction as the change, and rebuilt by reconcile_directory_stats.
+    Keys: total, active, engineering, countries, plus one country:<name>
+    row per country used to track distinct countries.
+    """
+    
+    key = models.CharField(max_length=150, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        verbose_name = 'Directory Counter'
+        verbose_name_plural = 'Directory Counters'
+        ordering = ['key']
+    
+    def __str__(self):
+        return f"{self.key}: {self.value}"
+
+
 class AdSlot(models.Model):
     """Model for managing ad slots between company listings."""
     
@@ -588,6 +675,38 @@ class SponsorStatsDaily(models.Model):
         return f"{self.campaign} - {self.date} ({self.impressions}i/{self.clicks}c)"
 
 
+class LogDimension(models.Model):
+    """
+    A distinct request-context string (user agent, referrer) that the sponsor
+    log tables reference by id instead of repeating the text on every row.
+    """
+    value = models.TextField()
+    digest = models.CharField(max_length=40, unique=True, editable=False,
+                              help_text="BLAKE2b digest of value, for the unique lookup")
+
+    class Meta:
+        abstract = True
+
+    def __str__(self):
+        return self.value[:80]
+
+    @staticmethod
+    def digest_for(value):
+        return hashlib.blake2b(value.encode('utf-8'), digest_size=20).hexdigest()
+
+    def save(self, *args, **kwargs):
+        self.digest = self.digest_for(self.value)
+        super().save(*args, **kwargs)
+
+
+class UserAgent(LogDimension):
+    """Distinct User-Agent header values"""
+
+
+class Referrer(LogDimension):
+    """Distinct Referer header values"""
+
+
 class SponsorDeliveryLog(models.Model):
     """Log of sponsor deliveries to users for anti-fatigue"""
     ACTION_CHOICES = [
@@ -602,29 +721,67 @@ class SponsorDeliveryLog(models.Model):
     page_key = models.CharField(max_length=500, 
                                help_text="Page context: browse:page=1:filters=hash")
     
-    # Request context
-    user_agent = models.TextField(blank=True)
+    # Request context (see LogDimensions for the interning of user agents and referrers)
+    user_agent = models.ForeignKey(UserAgent, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    referrer = models.URLField(blank=True)
+    referrer = models.ForeignKey(Referrer, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     
-    shown_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: rows written from queued beacon events keep the event time
+    shown_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         indexes = [
             models.Index(fields=['campaign', 'user_hash', 'shown_at']),
             models.Index(fields=['user_hash', 'shown_at']),
+            models.Index(fields=['shown_at']),
         ]
 
     def __str__(self):
         return f"{self.campaign} -> {self.user_hash[:8]} ({self.action})"
 
 
+class SponsorDeliveryRollup(models.Model):
+    """
+    Daily delivery totals per campaign and page context.
+
+    Rolled up from SponsorDeliveryLog by prune_sponsor_delivery_logs before
+    raw rows leave the retention window (SPONSOR_LOG_RETENTION_DAYS).
+    """
+    campaign = models.ForeignKey(SponsorCampaign, on_delete=models.CASCADE, related_name='delivery_rollups')
+    date = models.DateField()
+    page_key = models.CharField(max_length=500)
+    impressions = models.PositiveIntegerField(default=0)
+    clicks = models.PositiveIntegerField(default=0)
+    unique_users = models.PositiveIntegerField(default=0,
+                                               help_text="Distinct user hashes on this page that day")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['campaign', 'date', 'page_key']
+        indexes = [
+            models.Index(fields=['date']),
+        ]
+
+    def __str__(self):
+        return f"{self.campaign} - {self.date} {self.page_key[:30]} ({self.impressions}i/{self.clicks}c)"
+
+
 class SponsorImpressionEvent(models.Model):
-    """Real-time impression events for immediate processing"""
+    """
+    Queued impression/click beacons.
+    
+    The beacon endpoints append one row each; process_sponsor_events drains
+    unprocessed rows in batches into SponsorDeliveryLog and SponsorStatsDaily.
+    """
     campaign = models.ForeignKey(SponsorCampaign, on_delete=models.CASCADE, related_name='impression_events')
+    action = models.CharField(max_length=20, choices=SponsorDeliveryLog.ACTION_CHOICES, default='impression')
     user_hash = models.CharField(max_length=64, db_index=True)
     session_id = models.CharField(max_length=100, blank=True)
-    page_url = models.URLField()
+    page_url = models.URLField(blank=True)
+    page_key = models.CharField(max_length=500, blank=True)
+    ip_address = models.GenericIPAddressField(null=True, blank=True)
     
     # Viewport tracking
     is_above_fold = models.BooleanField(default=False)
@@ -632,8 +789,8 @@ class SponsorImpressionEvent(models.Model):
                                           help_text="Time spent in viewport in milliseconds")
     
     # Context
-    user_agent = models.TextField(blank=True)
-    referrer = models.URLField(blank=True)
+    user_agent = models.ForeignKey(UserAgent, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
+    referrer = models.ForeignKey(Referrer, on_delete=models.PROTECT, null=True, blank=True, related_name='+')
     
     created_at = models.DateTimeField(auto_now_add=True)
     processed = models.BooleanField(default=False, db_index=True)
@@ -806,3 +963,94 @@ class CampaignStatistics(models.Model):
     
     def __str__(self):
         return f"{self.company.name} - {self.date}"
+
+
+class ReachSketch(models.Model):
+    """
+    HyperLogLog sketch of the distinct user hashes seen on one day.
+
+    Maintained by companies.services.reach_service.ReachSketches; sketches
+    for a range of days merge into one unique-reach estimate.
+    """
+    date = models.DateField()
+    registers = models.BinaryField(help_text="zlib-compressed HyperLogLog registers")
+    estimate = models.PositiveIntegerField(default=0, help_text="Estimated distinct users that day")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class CampaignReachSketch(ReachSketch):
+    """Distinct users shown a sponsor campaign, per day"""
+    campaign = models.ForeignKey(SponsorCampaign, on_delete=models.CASCADE, related_name='reach_sketches')
+
+    class Meta:
+        unique_together = ('campaign', 'date')
+
+    def __str__(self):
+        return f"{self.campaign} - {self.date} (~{self.estimate} users)"
+
+
+class CompanyReachSketch(ReachSketch):
+    """Distinct visitors of a company listing, per day"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='reach_sketches')
+
+    class Meta:
+        unique_together = ('company', 'date')
+
+    def __str__(self):
+        return f"{self.company.name} - {self.date} (~{self.estimate} users)"
+
+
+class CampaignStatisticsRollup(models.Model):
+    """
+    CampaignStatistics summed over a calendar period.
+
+    Maintained from the daily rows by
+    companies.services.rollup_service.StatisticsRollups so long dashboard
+    ranges read one row per period. Unique visitors are not additive and
+    are not rolled up; the rates are stored as sums over ``days`` daily rows.
+    """
+    period_start = models.DateField()
+    days = models.PositiveSmallIntegerField(default=0, help_text="Daily rows summed into this period")
+
+    page_views = models.PositiveIntegerField(default=0)
+    job_page_clicks = models.PositiveIntegerField(default=0)
+    profile_views = models.PositiveIntegerField(default=0)
+    application_clicks = models.PositiveIntegerField(default=0)
+    contact_clicks = models.PositiveIntegerField(default=0)
+
+    click_through_rate_sum = models.DecimalField(max_digits=9, decimal_places=2, default=0.00)
+    engagement_rate_sum = models.DecimalField(max_digits=9, decimal_places=2, default=0.00)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        abstract = True
+
+
+class CampaignStatisticsWeekly(CampaignStatisticsRollup):
+    """CampaignStatistics per week (period_start is the Monday)"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='weekly_stats')
+
+    class Meta:
+        unique_together = ('company', 'period_start')
+        verbose_name = 'Weekly Campaign Statistics'
+        verbose_name_plural = 'Weekly Campaign Statistics'
+
+    def __str__(self):
+        return f"{self.company.name} - week of {self.period_start}"
+
+
+class CampaignStatisticsMonthly(CampaignStatisticsRollup):
+    """CampaignStatistics per calendar month (period_start is the 1st)"""
+    company = models.ForeignKey(Company, on_delete=models.CASCADE, related_name='monthly_stats')
+
+    class Meta:
+        unique_together = ('company', 'period_start')
+        verbose_name = 'Monthly Campaign Statistics'
+        verbose_name_plural = 'Monthly Campaign Statistics'
+
+    def __str__(self):
+        return f"{self.company.name} - {self.period_start:%B %Y}"
@@ -0,0 +1,391 @@
+import atexit
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Any, Callable, Dict, List, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F
+
+logger = logging.getLogger(__name__)
+
+
+class AtomicCounter:
+    """
+    Single-statement counter increments for daily stats rows.
+
+    ``increment`` inserts the row for ``lookup`` with the increments as its
+    initial values, or adds them to the existing row, in one
+    INSERT ... ON CONFLICT DO UPDATE statement (PostgreSQL and SQLite 3.35+).
+    Concurrent beacons never lose updates and never wait on a
+    get_or_create/save round trip. ``increment_many`` does the same for a
+    batch of rows in one multi-row statement.
+    """
+
+    @classmethod
+    def increment(cls, model, lookup: Dict[str, Any], **increments: int) -> Dict[str, int]:
+        """
+        Add ``increments`` to the row of ``model`` matching ``lookup``.
+
+        ``lookup`` must cover a unique constraint of the model (e.g. the
+        campaign/company and date of a daily stats row). Returns the
+        counters' new values.
+        """
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            return cls._increment_with_orm(model, lookup, increments)
+
+        columns, values = cls._row(model, lookup, increments)
+        sql = cls._upsert_sql(model, columns, 1, list(lookup), list(increments))
+        sql += f' RETURNING {", ".join(cls._column(model, name) for name in increments)}'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, values)
+            row = cursor.fetchone()
+        return dict(zip(increments, row))
+
+    @classmethod
+    def increment_many(cls, model, rows: List[Tuple[Dict[str, Any], Dict[str, int]]], batch_size: int = 500) -> None:
+        """
+        Apply several (lookup, increments) pairs with one upsert per
+        ``batch_size`` rows.
+
+        Every lookup must name the same fields; counters a row does not
+        mention are added as 0. Rows with equal lookups are merged first,
+        since one upsert statement may not touch a row twice.
+        """
+        merged = {}
+        for lookup, increments in rows:
+            key = tuple(lookup.items())
+            if key in merged:
+                totals = merged[key][1]
+                for name, amount in increments.items():
+                    totals[name] = totals.get(name, 0) + amount
+            else:
+                merged[key] = (lookup, dict(increments))
+        rows = list(merged.values())
+        if not rows:
+            return
+        if connection.vendor not in ('postgresql', 'sqlite'):
+            for lookup, increments in rows:
+                cls._increment_with_orm(model, lookup, increments)
+            return
+
+        lookup_names = list(rows[0][0])
+        names = list(dict.fromkeys(name for _, increments in rows for name in increments))
+        for start in range(0, len(rows), batch_size):
+            chunk = rows[start:start + batch_size]
+            values = []
+            for lookup, increments in chunk:
+                columns, row_values = cls._row(model, lookup, {name: increments.get(name, 0) for name in names})
+                values.extend(row_values)
+            with connection.cursor() as cursor:
+                cursor.execute(cls._upsert_sql(model, columns, len(chunk), lookup_names, names), values)
+
+    @staticmethod
+    def _column(model, name):
+        return connection.ops.quote_name(model._meta.get_field(name).column)
+
+    @staticmethod
+    def _row(model, lookup, increments):
+        """Column names and prepared values of the row inserted for ``lookup``."""
+        instance = model(**lookup, **increments)
+        columns, values = [], []
+        for field in model._meta.concrete_fields:
+            if field.primary_key:
+                continue
+            value = field.pre_save(instance, add=True)
+            columns.append(field.column)
+            values.append(field.get_db_prep_save(value, connection))
+        return columns, values
+
+    @classmethod
+    def _upsert_sql(cls, model, columns, row_count, lookup_names, increment_names):
+        meta = model._meta
+        quote = connection.ops.quote_name
+        table = quote(meta.db_table)
+        assignments = [
+            f'{cls._column(model, name)} = {table}.{cls._column(model, name)} + EXCLUDED.{cls._column(model, name)}'
+            for name in increment_names
+        ]
+        # auto_now columns (updated_at) take the new row's timestamp
+        assignments += [
+            f'{quote(field.column)} = EXCLUDED.{quote(field.column)}'
+            for field in meta.concrete_fields
+            if getattr(field, 'auto_now', False)
+        ]
+        placeholders = f'({", ".join(["%s"] * len(columns))})'
+        return (
+            f'INSERT INTO {table} ({", ".join(quote(name) for name in columns)}) '
+            f'VALUES {", ".join([placeholders] * row_count)} '
+            f'ON CONFLICT ({", ".join(cls._column(model, name) for name in lookup_names)}) '
+            f'DO UPDATE SET {", ".join(assignments)}'
+        )
+
+    @staticmethod
+    def _increment_with_orm(model, lookup, increments):
+        """Fallback for backends without ON CONFLICT: row lock + F() update."""
+        with transaction.atomic():
+            row, created = model.objects.select_for_update().get_or_create(
+                **lookup, defaults=increments
+            )
+            if not created:
+                model.objects.filter(pk=row.pk).update(
+                    **{name: F(name) + amount for name, amount in increments.items()}
+                )
+                row.refresh_from_db(fields=list(increments))
+        return {name: getattr(row, name) for name in increments}
+
+
+class CounterBuffer:
+    """
+    Per-process write-behind buffer in front of ``AtomicCounter``.
+
+    ``add`` only merges the increments into an in-memory table keyed by
+    (model, lookup). A daemon thread writes the table with
+    ``AtomicCounter.increment_many`` every COUNTER_BUFFER_FLUSH_SECONDS, or
+    as soon as COUNTER_BUFFER_MAX_EVENTS are pending. The number of writes
+    therefore depends on the number of rows touched per interval, not on
+    traffic. Increments are additive, so every gunicorn worker buffers
+    independently. A forked worker starts with an empty buffer, and
+    whatever is pending is flushed at interpreter exit (``--max-requests``
+    recycling, graceful shutdown) and from the gunicorn ``worker_exit``
+    hook. Events pending in a worker that is killed outright are lost.
+
+    A flush first drops rows whose lookup points at a deleted row (a company
+    deleted after its beacons were buffered), since they could never be
+    written. Rows of a failed flush are queued again and retried one at a
+    time, apart from the fresh rows, so a row that keeps failing cannot hold
+    back the others; after COUNTER_BUFFER_MAX_ATTEMPTS failed flushes it is
+    logged and dropped.
+
+    Each process counts buffered, flushed and dropped events (``stats``);
+    flushes also add them to cluster-wide totals in the cache
+    (``cluster_stats``).
+    """
+
+    STATS_PREFIX = 'companies:counter-buffer:'
+    STATS_FIELDS = ('buffered', 'flushed', 'dropped', 'failed_flushes')
+
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _wake = threading.Event()
+    _flusher = None
+    _pending = {}  # (model, sorted lookup items) -> {field: amount}
+    _pending_events = 0
+    _failures = {}  # pending key -> failed flushes so far
+    _stats = Counter()
+    _unpublished = Counter()
+    _flush_hooks = {}  # model -> [hook(rows)]
+
+    @staticmethod
+    def flush_seconds() -> float:
+        return settings.COUNTER_BUFFER_FLUSH_SECONDS
+
+    @classmethod
+    def register_flush_hook(cls, model, hook: Callable[[List[Tuple[Dict[str, Any], Dict[str, int]]]], None]) -> None:
+        """Call ``hook(rows)`` in the flush transaction after ``model``'s rows are written."""
+        cls._flush_hooks.setdefault(model, []).append(hook)
+
+    @classmethod
+    def add(cls, model, lookup: Dict[str, Any], **increments: int) -> None:
+        """Queue ``increments`` for the ``model`` row matching ``lookup`` (see AtomicCounter.increment)."""
+        events = sum(increments.values())
+        if not cls.flush_seconds():
+            cls._write([(model, lookup, increments)])
+            with cls._lock:
+                cls._stats.update(buffered=events, flushed=events)
+            return
+
+        with cls._lock:
+            totals = cls._pending.setdefault((model, tuple(sorted(lookup.items()))), {})
+            for name, amount in increments.items():
+                totals[name] = totals.get(name, 0) + amount
+            cls._pending_events += events
+            cls._stats['buffered'] += events
+            cls._unpublished['buffered'] += events
+            full = cls._pending_events >= settings.COUNTER_BUFFER_MAX_EVENTS
+            if cls._flusher is None or not cls._flusher.is_alive():
+                cls._flusher = threading.Thread(target=cls._run, name='counter-buffer-flush', daemon=True)
+                cls._flusher.start()
+        if full:
+            # Written by the flush thread, off the request path
+            cls._wake.set()
+
+    @classmethod
+    def flush(cls) -> int:
+        """Write everything pending now; returns the number of events written."""
+        with cls._flush_lock:
+            with cls._lock:
+                pending, cls._pending = cls._pending, {}
+                cls._pending_events = 0
+                failures, cls._failures = cls._failures, {}
+            if not pending:
+                return 0
+
+            pending = cls._drop_orphans(pending)
+            # Rows that failed before are written one per transaction, after the fresh ones
+            fresh = {key: increments for key, increments in pending.items() if key not in failures}
+            batches = [fresh] if fresh else []
+            batches += [{key: increments} for key, increments in pending.items() if key in failures]
+
+            written = 0
+            failed = False
+            for batch in batches:
+                events = cls._events(batch)
+                try:
+                    cls._write([(model, dict(lookup), increments) for (model, lookup), increments in batch.items()])
+                except Exception:
+                    logger.exception('Failed to flush %d buffered counter events', events)
+                    failed = True
+                    cls._retry_later(batch, failures)
+                else:
+                    written += events
+
+            with cls._lock:
+                cls._stats['flushed'] += written
+                cls._unpublished['flushed'] += written
+                if failed:
+                    cls._stats['failed_flushes'] += 1
+                    cls._unpublished['failed_flushes'] += 1
+                else:
+                    cls._stats['flushes'] += 1
+                unpublished, cls._unpublished = cls._unpublished, Counter()
+            cls._publish(unpublished)
+            return written
+
+    @staticmethod
+    def _events(pending) -> int:
+        return sum(sum(increments.values()) for increments in pending.values())
+
+    @classmethod
+    def _drop_orphans(cls, pending):
+        """
+        ``pending`` without the rows whose lookup references a row that no
+        longer exists; one query per referenced model.
+        """
+        references = {}  # (model, lookup name) -> related model
+        wanted = {}  # related model -> ids
+        for model, lookup in pending:
+            for name, value in lookup:
+                field = model._meta.get_field(name)
+                if field.is_relation and field.many_to_one:
+                    references[model, name] = field.related_model
+                    wanted.setdefault(field.related_model, set()).add(getattr(value, 'pk', value))
+        existing = {
+            related: set(related._base_manager.filter(pk__in=ids).values_list('pk', flat=True))
+            for related, ids in wanted.items()
+        }
+
+        kept, orphans = {}, {}
+        for key, increments in pending.items():
+            model, lookup = key
+            if all(
+                getattr(value, 'pk', value) in existing[references[model, name]]
+                for name, value in lookup if (model, name) in references
+            ):
+                kept[key] = increments
+            else:
+                orphans[key] = increments
+        if orphans:
+            cls._drop(orphans, 'they reference deleted rows')
+        return kept
+
+    @classmethod
+    def _retry_later(cls, batch, failures) -> None:
+        """Queue the rows of a failed write again, or drop those out of attempts."""
+        retry, exhausted = {}, {}
+        for key, increments in batch.items():
+            attempts = failures.get(key, 0) + 1
+            if attempts >= settings.COUNTER_BUFFER_MAX_ATTEMPTS:
+                exhausted[key] = increments
+            else:
+                retry[key] = (attempts, increments)
+        if exhausted:
+            cls._drop(exhausted, f'they failed {settings.COUNTER_BUFFER_MAX_ATTEMPTS} flushes')
+        with cls._lock:
+            for key, (attempts, increments) in retry.items():
+                totals = cls._pending.setdefault(key, {})
+                for name, amount in increments.items():
+                    totals[name] = totals.get(name, 0) + amount
+                cls._pending_events += sum(increments.values())
+                cls._failures[key] = attempts
+
+    @classmethod
+    def _drop(cls, rows, reason: str) -> None:
+        events = cls._events(rows)
+        logger.error(
+            'Dropped %d buffered counter events because %s: %s', events, reason,
+            [(model._meta.label, dict(lookup), increments) for (model, lookup), increments in rows.items()]
+        )
+        with cls._lock:
+            cls._stats['dropped'] += events
+            cls._unpublished['dropped'] += events
+
+    @classmethod
+    def stats(cls) -> Dict[str, int]:
+        """This process's counters."""
+        with cls._lock:
+            return {
+                'pid': os.getpid(),
+                'pending_events': cls._pending_events,
+                'pending_rows': len(cls._pending),
+                **{field: cls._stats[field] for field in ('buffered', 'flushed', 'dropped', 'flushes', 'failed_flushes')},
+            }
+
+    @classmethod
+    def cluster_stats(cls) -> Dict[str, int]:
+        """Totals across every worker, as of each worker's last flush."""
+        values = cache.get_many([cls.STATS_PREFIX + field for field in cls.STATS_FIELDS])
+        return {field: values.get(cls.STATS_PREFIX + field, 0) for field in cls.STATS_FIELDS}
+
+    @classmethod
+    def _write(cls, rows) -> None:
+        by_model = {}
+        for model, lookup, increments in rows:
+            by_model.setdefault(model, []).append((lookup, increments))
+        with transaction.atomic():
+            for model, model_rows in by_model.items():
+                AtomicCounter.increment_many(model, model_rows)
+                for hook in cls._flush_hooks.get(model, []):
+                    hook(model_rows)
+
+    @classmethod
+    def _publish(cls, counts: Counter) -> None:
+        try:
+            for field, amount in counts.items():
+                key = cls.STATS_PREFIX + field
+                cache.add(key, 0, timeout=None)
+                cache.incr(key, amount)
+        except Exception:
+            # Stats are best effort; a cache outage must not fail the flush
+            logger.warning('Could not publish counter buffer stats', exc_info=True)
+
+    @classmethod
+    def _run(cls) -> None:
+        while True:
+            cls._wake.wait(cls.flush_seconds())
+            cls._wake.clear()
+            try:
+                close_old_connections()
+                cls.flush()
+            except Exception:
+                logger.exception('Counter buffer flush thread error')
+
+    @classmethod
+    def _after_fork(cls) -> None:
+        # Only the forking thread survives; start the child from a clean slate
+        cls._lock = threading.Lock()
+        cls._flush_lock = threading.Lock()
+        cls._wake = threading.Event()
+        cls._flusher = None
+        cls._pending = {}
+        cls._pending_events = 0
+        cls._failures = {}
+        cls._stats = Counter()
+        cls._unpublished = Counter()
+
+
+os.register_at_fork(after_in_child=CounterBuffer._after_fork)
+atexit.register(CounterBuffer.flush)
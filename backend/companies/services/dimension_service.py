@@ -0,0 +1,70 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from django.db import IntegrityError, transaction
+
+from ..models import UserAgent, Referrer
+
+
+class LogDimensions:
+    """
+    Interns user agent and referrer strings for the sponsor log tables.
+
+    Each distinct string is stored once (UserAgent / Referrer) and rows keep
+    its id. Lookups go through a per-process LRU cache, so a steady stream of
+    beacons from the same browsers and pages costs no extra queries. Ids are
+    cached only once the transaction that looked them up commits, so a row
+    created in a rolled-back transaction is never handed out; committed
+    dimension rows are never deleted (PROTECT), so cached ids stay valid.
+    """
+
+    CACHE_SIZE = 4096
+
+    _ids: Dict[type, 'OrderedDict[str, int]'] = {UserAgent: OrderedDict(), Referrer: OrderedDict()}
+    _lock = threading.Lock()
+
+    @classmethod
+    def user_agent_id(cls, value: str) -> Optional[int]:
+        return cls.lookup(UserAgent, value) if value else None
+
+    @classmethod
+    def referrer_id(cls, value: str) -> Optional[int]:
+        return cls.lookup(Referrer, value) if value else None
+
+    @classmethod
+    def lookup(cls, model, value: str) -> int:
+        """Cached ``intern``."""
+        with cls._lock:
+            ids = cls._ids[model]
+            row_id = ids.get(value)
+            if row_id is not None:
+                ids.move_to_end(value)
+                return row_id
+
+        row_id = cls.intern(model, value)
+        transaction.on_commit(lambda: cls._remember(model, value, row_id))
+        return row_id
+
+    @classmethod
+    def _remember(cls, model, value: str, row_id: int) -> None:
+        with cls._lock:
+            ids = cls._ids[model]
+            ids[value] = row_id
+            ids.move_to_end(value)
+            while len(ids) > cls.CACHE_SIZE:
+                ids.popitem(last=False)
+
+    @staticmethod
+    def intern(model, value: str) -> int:
+        """Return the id of ``value``'s row in ``model``, creating it if needed."""
+        digest = model.digest_for(value)
+        row_id = model.objects.filter(digest=digest).values_list('id', flat=True).first()
+        if row_id is not None:
+            return row_id
+        try:
+            with transaction.atomic():
+                return model.objects.create(value=value).id
+        except IntegrityError:
+            # Another writer interned it first
+            return model.objects.get(digest=digest).id
@@ -0,0 +1,559 @@
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import timedelta
+from typing import Optional, Dict, List, Any, Set
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .search_service import get_search_backend, search_terms
+
+
+# Facet name -> entry key holding that company's values for the facet
+FACET_FIELDS = {
+    'countries': 'country_values',
+    'states': 'state_values',
+    'cities': 'city_values',
+    'functions': 'function_values',
+    'work_environments': 'work_environment_values',
+}
+
+
+class KeysetKey:
+    """Position in a multi-column ordering where each column may be descending."""
+
+    __slots__ = ('values', 'descending')
+
+    def __init__(self, values: List[Any], descending: List[bool]):
+        self.values = values
+        self.descending = descending
+
+    def __lt__(self, other: 'KeysetKey') -> bool:
+        for mine, theirs, descending in zip(self.values, other.values, self.descending):
+            if mine != theirs:
+                return mine > theirs if descending else mine < theirs
+        return False
+
+
+class DirectorySnapshot:
+    """
+    In-memory copy of the company directory at one version.
+
+    Entries are kept in the default ordering (-is_sponsored, sponsor_order, name).
+    ``postings`` maps each facet to {value: set of company ids}. Snapshots are
+    never mutated once published; refreshes build a new one.
+    """
+
+    FACET_CACHE_SIZE = 256
+    SEARCH_CACHE_SIZE = 256
+
+    def __init__(self, version: str, full_token: str, by_id: Dict[int, Dict[str, Any]],
+                 postings: Dict[str, Dict[str, Set[int]]], functions: List[Dict[str, Any]]):
+        self.version = version
+        self.full_token = full_token
+        self.by_id = by_id
+        self.postings = postings
+        self.functions = functions
+        self.built_at = time.time()
+        self.entries = sorted(by_id.values(), key=CompanyDirectory.default_sort_key)
+        self.max_updated_at = max((e['updated_at'] for e in self.entries), default=None)
+        self.facet_cache = {}
+        self.search_cache = {}
+
+
+class CompanyDirectory:
+    """
+    Versioned read model of the company directory used by the list endpoint.
+
+    Each worker process keeps its own snapshot and compares it against a
+    version token held in the shared cache. Writes to Company/Function bump
+    the token (see companies.signals) and every worker refreshes lazily on its
+    next read, so steady-state list requests never touch the database.
+
+    Company edits are applied incrementally (only rows whose updated_at moved
+    are reloaded); Function edits change every card carrying the tag, so they
+    also bump a "full" token that forces a complete rebuild.
+    """
+
+    VERSION_KEY = 'companies:directory:version'
+    FULL_KEY = 'companies:directory:full'
+    MAX_AGE_SECONDS = 300  # Safety net for writes that bypass signals (raw SQL, shell)
+    DELTA_OVERLAP = timedelta(seconds=60)  # Re-read window for slow-committing transactions
+
+    # Mirrors CompanyViewSet.ordering_fields / ordering
+    ORDERING_FIELDS = ['name', 'country', 'created_at', 'updated_at', 'is_sponsored', 'sponsor_order']
+    DEFAULT_ORDERING = ['-is_sponsored', 'sponsor_order', 'name']
+
+    SHUFFLE_SEED_POOL = 16
+    SHUFFLE_CACHE_SIZE = 16  # Seeds whose keys are kept, least recently used evicted first
+
+    _snapshot: Optional[DirectorySnapshot] = None
+    _lock = threading.Lock()
+    _shuffle_keys = OrderedDict()  # seed -> {company id: shuffle key}; guarded by _lock
+
+    @staticmethod
+    def default_sort_key(entry: Dict[str, Any]):
+        return (not entry['is_sponsored'], entry['sponsor_order'], entry['name'])
+
+    @classmethod
+    def invalidate(cls, full: bool = False) -> None:
+        """Publish a new directory version once the current transaction commits."""
+        def publish():
+            token = cls.new_token()
+            if full:
+                cache.set(cls.FULL_KEY, token, None)
+            cache.set(cls.VERSION_KEY, token, None)
+        transaction.on_commit(publish)
+
+    @staticmethod
+    def new_token() -> str:
+        """Unique version token prefixed with its publish time in nanoseconds."""
+        return f'{time.time_ns()}-{uuid.uuid4().hex[:12]}'
+
+    @staticmethod
+    def token_timestamp(token: str) -> float:
+        """Publish time of a version token, as a UNIX timestamp."""
+        try:
+            return int(token.split('-', 1)[0]) / 1e9
+        except (AttributeError, ValueError):
+            return time.time()
+
+    @classmethod
+    def _shared_token(cls, key: str) -> str:
+        """Return a shared token, creating one if the cache was flushed."""
+        token = cache.get(key)
+        if token is None:
+            cache.add(key, cls.new_token(), None)
+            token = cache.get(key)
+        return token
+
+    @classmethod
+    def get_snapshot(cls) -> DirectorySnapshot:
+        """Return an up-to-date snapshot, refreshing it if the version moved."""
+        version = cls._shared_token(cls.VERSION_KEY)
+        snapshot = cls._snapshot
+        if cls._is_fresh(snapshot, version):
+            return snapshot
+
+        with cls._lock:
+            snapshot = cls._snapshot
+            if not cls._is_fresh(snapshot, version):
+                full_token = cls._shared_token(cls.FULL_KEY)
+                if (
+                    snapshot is None or
+                    snapshot.full_token != full_token or
+                    snapshot.max_updated_at is None or
+                    time.time() - snapshot.built_at >= cls.MAX_AGE_SECONDS
+                ):
+                    snapshot = cls._build(version, full_token)
+                else:
+                    snapshot = cls._apply_delta(snapshot, version)
+                cls._snapshot = snapshot
+        return snapshot
+
+    @classmethod
+    def _is_fresh(cls, snapshot: Optional[DirectorySnapshot], version: str) -> bool:
+        return (
+            snapshot is not None and
+            snapshot.version == version and
+            time.time() - snapshot.built_at < cls.MAX_AGE_SECONDS
+        )
+
+    @classmethod
+    def _load_entries(cls, queryset) -> List[Dict[str, Any]]:
+        """Load companies with their functions and their stored list cards."""
+        entries = []
+        for company in queryset.prefetch_related('functions'):
+            # Rows saved before card_json existed are rendered on the fly
+            card_json = (company.card_json or company.render_card()).encode('utf-8')
+            function_values = [func.name for func in company.functions.all()]
+            entries.append({
+                'id': company.id,
+                'name': company.name,
+                'country': company.country,
+                'created_at': company.created_at,
+                'updated_at': company.updated_at,
+                'is_sponsored': company.is_sponsored,
+                'sponsor_order': company.sponsor_order,
+                # Lower-cased copies for case-insensitive matching
+                'name_lc': company.name.lower(),
+                'country_lc': (company.country or '').lower(),
+                'state_lc': (company.state or '').lower(),
+                'city_lc': (company.city or '').lower(),
+                'work_environment_lc': (company.work_environment or '').lower(),
+                'status_lc': (company.status or '').lower(),
+                'function_names': [name.lower() for name in function_values],
+                # Facet values
+                'country_values': [company.country] if company.country else [],
+                'state_values': [company.state] if company.state else [],
+                'city_values': [company.city] if company.city else [],
+                'function_values': function_values,
+                'work_environment_values': [w for w in company.get_work_environment_list() if w],
+                'card': json.loads(card_json),
+                'card_json': card_json,
+            })
+        return entries
+
+    @classmethod
+    def _build(cls, version: str, full_token: str) -> DirectorySnapshot:
+        """Rebuild the whole directory from the database."""
+        # Import here to avoid circular imports
+        from ..models import Company, Function
+
+        by_id = {entry['id']: entry for entry in cls._load_entries(Company.objects.all())}
+        postings = {facet: {} for facet in FACET_FIELDS}
+        for entry in by_id.values():
+            cls._add_postings(postings, entry)
+
+        functions = list(Function.objects.all().values('id', 'name', 'color', 'text_color').order_by('name'))
+        return DirectorySnapshot(version, full_token, by_id, postings, functions)
+
+    @classmethod
+    def _apply_delta(cls, snapshot: DirectorySnapshot, version: str) -> DirectorySnapshot:
+        """Reload only companies changed since the snapshot and drop deleted ones."""
+        # Import here to avoid circular imports
+        from ..models import Company
+
+        changed = cls._load_entries(
+            Company.objects.filter(updated_at__gte=snapshot.max_updated_at - cls.DELTA_OVERLAP)
+        )
+
+        by_id = dict(snapshot.by_id)
+        # Copy-on-write: only facet value sets touched by this delta are copied
+        postings = {facet: dict(values) for facet, values in snapshot.postings.items()}
+        touched = set()
+
+        def remove(entry):
+            for facet, field in FACET_FIELDS.items():
+                for value in entry[field]:
+                    if (facet, value) not in touched:
+                        postings[facet][value] = set(postings[facet].get(value, ()))
+                        touched.add((facet, value))
+                    postings[facet][value].discard(entry['id'])
+                    if not postings[facet][value]:
+                        del postings[facet][value]
+                        touched.discard((facet, value))
+
+        for entry in changed:
+            if entry['id'] in by_id:
+                remove(by_id[entry['id']])
+            by_id[entry['id']] = entry
+            for facet, field in FACET_FIELDS.items():
+                for value in entry[field]:
+                    if (facet, value) not in touched:
+                        postings[facet][value] = set(postings[facet].get(value, ()))
+                        touched.add((facet, value))
+                    postings[facet][value].add(entry['id'])
+
+        if len(by_id) != Company.objects.count():
+            live_ids = set(Company.objects.values_list('id', flat=True))
+            for company_id in [i for i in by_id if i not in live_ids]:
+                remove(by_id.pop(company_id))
+
+        return DirectorySnapshot(version, snapshot.full_token, by_id, postings, snapshot.functions)
+
+    @staticmethod
+    def _add_postings(postings: Dict[str, Dict[str, Set[int]]], entry: Dict[str, Any]) -> None:
+        for facet, field in FACET_FIELDS.items():
+            for value in entry[field]:
+                postings[facet].setdefault(value, set()).add(entry['id'])
+
+    @classmethod
+    def query(cls, params, is_sponsored: Optional[bool] = None,
+              seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Filter and order the directory in memory.
+
+        Supports the same query parameters as CompanyFilter, SearchFilter
+        and OrderingFilter on CompanyViewSet. ordering=? returns a seeded,
+        repeatable shuffle (see shuffle_key).
+        """
+        snapshot = cls.get_snapshot()
+        entries = snapshot.entries
+
+        if is_sponsored is not None:
+            entries = [e for e in entries if e['is_sponsored'] == is_sponsored]
+
+        entries = cls._apply_filters(entries, params)
+        entries = cls._apply_search(snapshot, entries, params.get('search', ''))
+        return cls._apply_ordering(entries, params.get('ordering', ''), seed)
+
+    @classmethod
+    def facets(cls, params) -> Dict[str, Any]:
+        """
+        Return every facet value with the number of companies matching it
+        under the currently applied filters.
+
+        Results are memoized per snapshot and normalized filter tuple, so
+        repeated requests for the same filters are a dictionary lookup.
+        """
+        snapshot = cls.get_snapshot()
+        key = tuple(
+            (name, (params.get(name) or '').strip().lower())
+            for name in ('name', 'country', 'state', 'city', 'functions', 'work_environment', 'status', 'search')
+        )
+        result = snapshot.facet_cache.get(key)
+        if result is not None:
+            return result
+
+        if not any(value for _, value in key):
+            counts = {
+                facet: {value: len(ids) for value, ids in values.items()}
+                for facet, values in snapshot.postings.items()
+            }
+        else:
+            candidates = cls._candidates(snapshot, params)
+            matched = cls._apply_search(snapshot, cls._apply_filters(candidates, params), params.get('search', ''))
+            counts = {facet: Counter() for facet in FACET_FIELDS}
+            for entry in matched:
+                for facet, field in FACET_FIELDS.items():
+                    counts[facet].update(entry[field])
+            counts = {facet: dict(counter) for facet, counter in counts.items()}
+
+        result = {
+            facet: sorted(({'value': value, 'count': count} for value, count in values.items()),
+                          key=lambda item: item['value'])
+            for facet, values in counts.items()
+        }
+        if len(snapshot.facet_cache) >= snapshot.FACET_CACHE_SIZE:
+            snapshot.facet_cache.pop(next(iter(snapshot.facet_cache)))
+        snapshot.facet_cache[key] = result
+        return result
+
+    @classmethod
+    def _candidates(cls, snapshot: DirectorySnapshot, params) -> List[Dict[str, Any]]:
+        """Narrow the directory with posting lists before per-entry matching."""
+        lookups = [
+            ('countries', (params.get('country') or '').lower(), False),
+            ('states', (params.get('state') or '').lower(), False),
+            ('functions', (params.get('functions') or '').lower(), True),
+        ]
+        ids = None
+        for facet, term, partial in lookups:
+            if not term:
+                continue
+            matching = set()
+            for value, value_ids in snapshot.postings[facet].items():
+                value = value.lower()
+                if (term in value) if partial else (term == value):
+                    matching |= value_ids
+            ids = matching if ids is None else ids & matching
+        if ids is None:
+            return snapshot.entries
+        return [snapshot.by_id[company_id] for company_id in ids]
+
+    @classmethod
+    def _apply_filters(cls, entries: List[Dict[str, Any]], params) -> List[Dict[str, Any]]:
+        """Apply CompanyFilter semantics (iexact / icontains)."""
+        exact = {
+            'country_lc': (params.get('country') or '').lower(),
+            'state_lc': (params.get('state') or '').lower(),
+            'status_lc': (params.get('status') or '').lower(),
+        }
+        contains = {
+            'name_lc': (params.get('name') or '').lower(),
+            'city_lc': (params.get('city') or '').lower(),
+            'work_environment_lc': (params.get('work_environment') or '').lower(),
+        }
+        exact = {k: v for k, v in exact.items() if v}
+        contains = {k: v for k, v in contains.items() if v}
+        function = (params.get('functions') or '').lower()
+
+        if not exact and not contains and not function:
+            return entries
+
+        results = []
+        for entry in entries:
+            if any(entry[field] != value for field, value in exact.items()):
+                continue
+            if any(value not in entry[field] for field, value in contains.items()):
+                continue
+            if function and not any(function in name for name in entry['function_names']):
+                continue
+            results.append(entry)
+        return results
+
+    @classmethod
+    def _apply_search(cls, snapshot: DirectorySnapshot, entries: List[Dict[str, Any]],
+                      search: str) -> List[Dict[str, Any]]:
+        """
+        Restrict entries to search matches, ordered by relevance.
+
+        Ranked ids come from the configured search backend and are memoized
+        per snapshot. When the backend cannot answer, fall back to SearchFilter
+        semantics: every term must match name, city, function or country.
+        """
+        terms = search_terms(search)
+        if not terms:
+            return entries
+
+        key = ' '.join(term.lower() for term in terms)
+        if key in snapshot.search_cache:
+            ranked = snapshot.search_cache[key]
+        else:
+            ranked = get_search_backend().search(search)
+            if len(snapshot.search_cache) >= snapshot.SEARCH_CACHE_SIZE:
+                snapshot.search_cache.pop(next(iter(snapshot.search_cache)))
+            snapshot.search_cache[key] = ranked
+
+        if ranked is not None:
+            rank = {company_id: position for position, company_id in enumerate(ranked)}
+            matched = [entry for entry in entries if entry['id'] in rank]
+            matched.sort(key=lambda entry: rank[entry['id']])
+            return matched
+
+        terms = [term.lower() for term in terms]
+        results = []
+        for entry in entries:
+            for term in terms:
+                if (
+                    term in entry['name_lc'] or
+                    term in entry['city_lc'] or
+                    term in entry['country_lc'] or
+                    any(term in name for name in entry['function_names'])
+                ):
+                    continue
+                break
+            else:
+                results.append(entry)
+        return results
+
+    @classmethod
+    def ordering_fields(cls, ordering: str) -> List[str]:
+        """Parse an ordering parameter the way OrderingFilter does; ['?'] for random."""
+        if ordering == '?':
+            return ['?']
+        return [
+            term.strip() for term in (ordering or '').split(',')
+            if term.strip() and term.strip().lstrip('-') in cls.ORDERING_FIELDS
+        ]
+
+    @classmethod
+    def keyset_fields(cls, ordering: str, searched: bool = False) -> Optional[List[str]]:
+        """
+        Return the full, unique sort specification for keyset pagination, or
+        None when results are in relevance order and only positions are stable.
+        """
+        fields = cls.ordering_fields(ordering)
+        if fields == ['?']:
+            return ['?', 'id']
+        if not fields:
+            if searched:
+                return None
+            fields = []
+        # Explicit orderings break ties with the default ordering (see _apply_ordering)
+        return fields + cls.DEFAULT_ORDERING + ['id']
+
+    @classmethod
+    def keyset_key(cls, entry: Dict[str, Any], fields: List[str], seed: Optional[int] = None) -> 'KeysetKey':
+        """Comparable position of an entry under a keyset_fields specification."""
+        values = []
+        for field in fields:
+            if field == '?':
+                values.append(cls.shuffle_key(seed, entry['id']))
+            else:
+                values.append(entry[field.lstrip('-')])
+        return KeysetKey(values, [field.startswith('-') for field in fields])
+
+    @classmethod
+    def pick_shuffle_seed(cls) -> int:
+        """
+        Pick a seed for random ordering from a small daily pool, so shuffle
+        keys can be precomputed and shared across requests.
+        """
+        today = int(timezone.now().strftime('%Y%m%d'))
+        return today * 100 + random.randrange(cls.SHUFFLE_SEED_POOL)  # nosec B311
+
+    @classmethod
+    def shuffle_keys(cls, seed: Optional[int]) -> Dict[int, int]:
+        """
+        Shuffle keys of the snapshot's companies for a seed.
+
+        The mappings of the last SHUFFLE_CACHE_SIZE seeds are kept and never
+        mutated once published; companies added since are keyed on the fly
+        by ``shuffle_key``.
+        """
+        with cls._lock:
+            keys = cls._shuffle_keys.get(seed)
+            if keys is not None:
+                cls._shuffle_keys.move_to_end(seed)
+                return keys
+
+        snapshot = cls._snapshot
+        keys = {company_id: cls._shuffle_digest(seed, company_id) for company_id in (snapshot.by_id if snapshot else ())}
+        with cls._lock:
+            cls._shuffle_keys[seed] = keys
+            cls._shuffle_keys.move_to_end(seed)
+            while len(cls._shuffle_keys) > cls.SHUFFLE_CACHE_SIZE:
+                cls._shuffle_keys.popitem(last=False)
+        return keys
+
+    @classmethod
+    def shuffle_key(cls, seed: Optional[int], company_id: int, keys: Optional[Dict[int, int]] = None) -> int:
+        """
+        Deterministic random rank of a company for a seed.
+
+        Keys depend only on (seed, id), so the permutation survives directory
+        refreshes: new companies slot in without reshuffling existing ones.
+        """
+        if keys is None:
+            keys = cls.shuffle_keys(seed)
+        key = keys.get(company_id)
+        return cls._shuffle_digest(seed, company_id) if key is None else key
+
+    @staticmethod
+    def _shuffle_digest(seed: Optional[int], company_id: int) -> int:
+        digest = hashlib.blake2b(f'{seed}:{company_id}'.encode(), digest_size=8).digest()
+        return int.from_bytes(digest, 'big')
+
+    @classmethod
+    def _apply_ordering(cls, entries: List[Dict[str, Any]], ordering: str,
+                        seed: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Apply OrderingFilter semantics, falling back to the default ordering."""
+        fields = cls.ordering_fields(ordering)
+        if fields == ['?']:
+            if seed is None:
+                seed = cls.pick_shuffle_seed()
+            keys = cls.shuffle_keys(seed)
+            return sorted(entries, key=lambda e: (cls.shuffle_key(seed, e['id'], keys), e['id']))
+
+        if not fields:
+            # Snapshot entries are stored in the default ordering; search
+            # results arrive in relevance order
+            return list(entries)
+
+        ordered = sorted(entries, key=cls.default_sort_key)
+        if fields == cls.DEFAULT_ORDERING:
+            return ordered
+        for field in reversed(fields):
+            key = field.lstrip('-')
+            ordered.sort(key=lambda e: e[key], reverse=field.startswith('-'))
+        return ordered
+
+    @classmethod
+    def render(cls, entries: List[Dict[str, Any]], request=None) -> List[Dict[str, Any]]:
+        """Return list-serializer payloads for entries without touching the database."""
+        results = []
+        for entry in entries:
+            card = dict(entry['card'])
+            if request is not None and card.get('logo'):
+                card['logo'] = request.build_absolute_uri(card['logo'])
+            results.append(card)
+        return results
+
+    @classmethod
+    def render_json(cls, entries: List[Dict[str, Any]], request=None) -> List[bytes]:
+        """Return the stored JSON cards for entries, logo URLs made absolute."""
+        if request is None:
+            return [entry['card_json'] for entry in entries]
+        origin = request.build_absolute_uri('/')[:-1].encode('utf-8')
+        return [
+            entry['card_json'].replace(b'"logo":"/', b'"logo":"' + origin + b'/', 1)
+            for entry in entries
+        ]
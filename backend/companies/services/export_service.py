@@ -0,0 +1,153 @@
+import csv
+import json
+import zlib
+from datetime import date as date_type
+from typing import Iterable, Iterator, List
+
+from ..models import CampaignStatistics
+
+
+class _LineBuffer:
+    """File-like target for csv.writer that hands back what was written."""
+
+    def write(self, value):
+        return value
+
+
+class StatisticsExport:
+    """
+    Streaming export of CampaignStatistics rows.
+
+    Rows are read with ``.iterator(chunk_size=CHUNK_SIZE)`` and encoded one
+    chunk at a time, so memory stays flat however long the range or however
+    many companies are exported. Formats:
+
+    - ``csv``: one header row, then one line per daily row;
+    - ``ndjson``: one JSON object per daily row;
+    - ``columnar``: Arrow-style record batches as JSON lines. A schema line
+      comes first, then one ``{"num_rows": n, "columns": {name: [...]}}``
+      line per chunk.
+
+    With ``gzip=True`` the encoded stream is compressed on the fly into a
+    single gzip member.
+    """
+
+    CHUNK_SIZE = 2000
+    FORMATS = {
+        'csv': ('text/csv', 'csv'),
+        'ndjson': ('application/x-ndjson', 'ndjson'),
+        'columnar': ('application/x-ndjson', 'columns.ndjson'),
+    }
+
+    # (values() field, CSV header, column type); the company columns lead multi-company exports
+    COMPANY_FIELDS = [
+        ('company_id', 'Company ID', 'int'),
+        ('company__name', 'Company', 'string'),
+    ]
+    FIELDS = [
+        ('date', 'Date', 'date'),
+        ('page_views', 'Page Views', 'int'),
+        ('unique_visitors', 'Unique Visitors', 'int'),
+        ('job_page_clicks', 'Job Page Clicks', 'int'),
+        ('profile_views', 'Profile Views', 'int'),
+        ('application_clicks', 'Application Clicks', 'int'),
+        ('contact_clicks', 'Contact Clicks', 'int'),
+        ('click_through_rate', 'Click Through Rate (%)', 'decimal'),
+        ('engagement_rate', 'Engagement Rate (%)', 'decimal'),
+    ]
+
+    def __init__(self, company_ids: Iterable[int], start: date_type, end: date_type,
+                 export_format: str = 'csv', gzip: bool = False, include_company: bool = False):
+        if export_format not in self.FORMATS:
+            raise ValueError(f'Unknown export format: {export_format}')
+        self.company_ids = list(company_ids)
+        self.start = start
+        self.end = end
+        self.format = export_format
+        self.gzip = gzip
+        self.include_company = include_company
+        self.row_count = 0
+        self.fields = (self.COMPANY_FIELDS if include_company else []) + self.FIELDS
+
+    @property
+    def content_type(self) -> str:
+        return 'application/gzip' if self.gzip else self.FORMATS[self.format][0]
+
+    def filename(self, stem: str) -> str:
+        extension = self.FORMATS[self.format][1]
+        return f'{stem}.{extension}.gz' if self.gzip else f'{stem}.{extension}'
+
+    def rows(self) -> Iterator[tuple]:
+        ordering = ['company__name', 'company_id', '-date'] if self.include_company else ['-date']
+        return (
+            CampaignStatistics.objects
+            .filter(company_id__in=self.company_ids, date__gte=self.start, date__lte=self.end)
+            .order_by(*ordering)
+            .values_list(*(name for name, _, _ in self.fields))
+            .iterator(chunk_size=self.CHUNK_SIZE)
+        )
+
+    def chunks(self) -> Iterator[List[tuple]]:
+        chunk = []
+        for row in self.rows():
+            chunk.append(row)
+            if len(chunk) >= self.CHUNK_SIZE:
+                self.row_count += len(chunk)
+                yield chunk
+                chunk = []
+        if chunk:
+            self.row_count += len(chunk)
+            yield chunk
+
+    def __iter__(self) -> Iterator[bytes]:
+        encoded = getattr(self, f'_encode_{self.format}')()
+        return self._compress(encoded) if self.gzip else encoded
+
+    def _encode_csv(self) -> Iterator[bytes]:
+        writer = csv.writer(_LineBuffer())
+        yield writer.writerow([header for _, header, _ in self.fields]).encode('utf-8')
+        for chunk in self.chunks():
+            yield ''.join(writer.writerow(row) for row in chunk).encode('utf-8')
+
+    @property
+    def column_names(self) -> List[str]:
+        """JSON keys / column names: the field names, with relation lookups flattened."""
+        return [name.replace('__', '_') for name, _, _ in self.fields]
+
+    def _encode_ndjson(self) -> Iterator[bytes]:
+        names = self.column_names
+        for chunk in self.chunks():
+            yield ''.join(
+                json.dumps(dict(zip(names, self._json_row(row)))) + '\n' for row in chunk
+            ).encode('utf-8')
+
+    def _encode_columnar(self) -> Iterator[bytes]:
+        schema = [{'name': name, 'type': kind} for name, (_, _, kind) in zip(self.column_names, self.fields)]
+        yield (json.dumps({'schema': schema}) + '\n').encode('utf-8')
+        for chunk in self.chunks():
+            columns = zip(*(self._json_row(row) for row in chunk))
+            batch = {
+                'num_rows': len(chunk),
+                'columns': dict(zip(self.column_names, map(list, columns))),
+            }
+            yield (json.dumps(batch) + '\n').encode('utf-8')
+
+    def _json_row(self, row: tuple) -> list:
+        values = []
+        for value, (_, _, kind) in zip(row, self.fields):
+            if kind == 'date':
+                value = value.isoformat()
+            elif kind == 'decimal':
+                value = float(value)
+            values.append(value)
+        return values
+
+    @staticmethod
+    def _compress(chunks: Iterator[bytes]) -> Iterator[bytes]:
+        # wbits=31 writes a gzip header and trailer around the deflate stream
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for chunk in chunks:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+        yield compressor.flush()
@@ -0,0 +1,335 @@
+import hashlib
+import logging
+import math
+import os
+import threading
+import zlib
+from datetime import date as date_type
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+from ..models import CampaignReachSketch, Company, CompanyReachSketch, CampaignStatistics
+
+logger = logging.getLogger(__name__)
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-value sketch (Flajolet et al.) over a 64-bit hash.
+
+    2**PRECISION one-byte registers; the relative standard error of
+    ``count()`` is about 1.04 / sqrt(2**PRECISION) (1.6% at the default
+    precision). Sketches of the same precision merge by taking the
+    register-wise maximum, which is how day sketches combine into a range.
+    """
+
+    PRECISION = 12
+    SIZE = 1 << PRECISION
+    RELATIVE_ERROR = 1.04 / math.sqrt(SIZE)
+
+    _ALPHA = 0.7213 / (1 + 1.079 / SIZE)
+    _RANK_BITS = 64 - PRECISION
+    _RANK_MASK = (1 << _RANK_BITS) - 1
+    _POWERS = [2.0 ** -rank for rank in range(_RANK_BITS + 2)]
+
+    def __init__(self, registers: Optional[bytes] = None):
+        self.registers = bytearray(registers) if registers else bytearray(self.SIZE)
+
+    @classmethod
+    def position(cls, value: str) -> Tuple[int, int]:
+        """(register index, rank) that ``value`` updates."""
+        hashed = int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big')
+        rest = hashed & cls._RANK_MASK
+        return hashed >> cls._RANK_BITS, cls._RANK_BITS - rest.bit_length() + 1
+
+    def update(self, positions: Iterable[Tuple[int, int]]) -> bool:
+        """Apply precomputed positions; returns whether any register grew."""
+        registers = self.registers
+        changed = False
+        for index, rank in positions:
+            if rank > registers[index]:
+                registers[index] = rank
+                changed = True
+        return changed
+
+    def add(self, value: str) -> bool:
+        return self.update([self.position(value)])
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def count(self) -> int:
+        registers = self.registers
+        estimate = self._ALPHA * self.SIZE * self.SIZE / sum(self._POWERS[rank] for rank in registers)
+        if estimate <= 2.5 * self.SIZE:
+            # Small range: linear counting over the empty registers
+            empty = registers.count(0)
+            if empty:
+                estimate = self.SIZE * math.log(self.SIZE / empty)
+        return int(round(estimate))
+
+    def to_bytes(self) -> bytes:
+        # Sparse sketches are mostly zero registers and compress to a few bytes
+        return zlib.compress(bytes(self.registers), 6)
+
+    @classmethod
+    def from_bytes(cls, data: Optional[bytes]) -> 'HyperLogLog':
+        return cls(zlib.decompress(data) if data else None)
+
+
+class ReachSketches:
+    """
+    Daily unique-reach sketches per sponsor campaign and per company.
+
+    Adding users writes the day's sketch row only when a register actually
+    grows. Each process mirrors the registers it last saw, and registers only
+    ever grow, so repeat visitors are filtered out without touching the
+    database. Company visitors from the analytics beacons are not written on
+    the request path: their registers are merged in memory and written with
+    the next CounterBuffer flush (``flush_company_users``). Range queries
+    merge the day sketches, so unique reach over N days costs N small rows,
+    not a COUNT(DISTINCT) over the logs.
+    """
+
+    RELATIVE_ERROR = HyperLogLog.RELATIVE_ERROR
+    MIRROR_SIZE = 4096
+
+    # Sketch model -> owner foreign key column
+    OWNERS = {
+        CampaignReachSketch: 'campaign_id',
+        CompanyReachSketch: 'company_id',
+    }
+
+    _mirrors = {}  # (model, owner id, date) -> registers
+    _pending = {}  # (company id, date) -> {register index: rank} awaiting the next counter flush
+    _pending_lock = threading.Lock()
+
+    @classmethod
+    def add_campaign_users(cls, campaign_id: int, date: date_type, user_hashes: Iterable[str]) -> Optional[int]:
+        return cls.add(CampaignReachSketch, [campaign_id], date, user_hashes).get(campaign_id)
+
+    @classmethod
+    def add_company_users(cls, company_id: int, date: date_type, user_hashes: Iterable[str]) -> None:
+        cls.add_companies_users([company_id], date, user_hashes)
+
+    @classmethod
+    def add_companies_users(cls, company_ids: Iterable[int], date: date_type, user_hashes: Iterable[str]) -> None:
+        """
+        Queue the same users for several companies' day sketches (one beacon batch).
+
+        Only registers the process has not already seen grow are queued;
+        they are written by the next CounterBuffer flush, which then copies
+        the estimates into CampaignStatistics.unique_visitors
+        (``sync_company_statistics``).
+        """
+        positions = [HyperLogLog.position(user_hash) for user_hash in set(user_hashes)]
+        with cls._pending_lock:
+            for company_id in set(company_ids):
+                mirror = cls._mirrors.get((CompanyReachSketch, company_id, date))
+                for index, rank in positions:
+                    if mirror is not None and rank <= mirror[index]:
+                        continue
+                    registers = cls._pending.setdefault((company_id, date), {})
+                    if rank > registers.get(index, 0):
+                        registers[index] = rank
+
+    @classmethod
+    def flush_company_users(cls, rows: Optional[List[Tuple[dict, Dict[str, int]]]] = None) -> None:
+        """
+        Write the queued company registers. Registered as a CounterBuffer
+        flush hook ahead of ``sync_company_statistics``.
+
+        Registers only ever grow, so writing them twice is harmless: queued
+        registers are dropped once the flush transaction commits, and after
+        a rollback they are written again by the next flush. Registers of
+        companies deleted since they were queued are discarded.
+        """
+        with cls._pending_lock:
+            pending = {key: dict(registers) for key, registers in cls._pending.items()}
+        if not pending:
+            return
+
+        existing = set(Company.objects.filter(
+            pk__in={company_id for company_id, _ in pending}
+        ).values_list('pk', flat=True))
+        deleted = [key for key in pending if key[0] not in existing]
+        if deleted:
+            logger.warning('Dropped queued visitor sketches of deleted companies: %s', deleted)
+            with cls._pending_lock:
+                for key in deleted:
+                    cls._pending.pop(key, None)
+                    del pending[key]
+            if not pending:
+                return
+
+        by_date = {}
+        for (company_id, date), registers in pending.items():
+            by_date.setdefault(date, {})[company_id] = list(registers.items())
+        for date, positions in by_date.items():
+            cls._write(CompanyReachSketch, date, positions)
+        transaction.on_commit(lambda: cls._written(pending))
+
+    @classmethod
+    def _written(cls, written: Dict[Tuple[int, date_type], Dict[int, int]]) -> None:
+        with cls._pending_lock:
+            for key, registers in written.items():
+                # Keep what was queued after the flush copied the queue
+                remaining = {
+                    index: rank for index, rank in cls._pending.get(key, {}).items()
+                    if rank > registers.get(index, 0)
+                }
+                if remaining:
+                    cls._pending[key] = remaining
+                else:
+                    cls._pending.pop(key, None)
+
+    @classmethod
+    def _after_fork(cls) -> None:
+        # The parent's queue is its own to flush
+        cls._pending = {}
+        cls._pending_lock = threading.Lock()
+
+    @classmethod
+    def sync_company_statistics(cls, rows: List[Tuple[dict, Dict[str, int]]]) -> None:
+        """
+        Raise CampaignStatistics.unique_visitors to the day sketch estimate
+        for the (lookup, increments) rows that counted page views. A stored
+        count above the estimate (visitors counted before the sketch began)
+        is kept.
+
+        Registered as a CounterBuffer flush hook, so it costs one UPDATE per
+        day per flush rather than one per visitor.
+        """
+        by_date = {}
+        for lookup, increments in rows:
+            if increments.get('page_views'):
+                by_date.setdefault(lookup['date'], []).append(lookup['company_id'])
+        for date, company_ids in by_date.items():
+            estimate = CompanyReachSketch.objects.filter(
+                company_id=OuterRef('company_id'), date=OuterRef('date')
+            ).values('estimate')[:1]
+            CampaignStatistics.objects.filter(company_id__in=company_ids, date=date).update(
+                unique_visitors=Greatest(F('unique_visitors'), Coalesce(Subquery(estimate), F('unique_visitors')))
+            )
+
+    @classmethod
+    def add(cls, model, owner_ids: Iterable[int], date: date_type, user_hashes: Iterable[str]) -> Dict[int, int]:
+        """
+        Add ``user_hashes`` to the ``model`` sketches of ``owner_ids`` on ``date``.
+
+        Returns {owner id: new estimate} for the sketches that changed.
+        """
+        positions = [HyperLogLog.position(user_hash) for user_hash in set(user_hashes)]
+        pending = {}
+        for owner_id in set(owner_ids):
+            mirror = cls._mirrors.get((model, owner_id, date))
+            if mirror is None or any(rank > mirror[index] for index, rank in positions):
+                pending[owner_id] = positions
+        if not pending:
+            return {}
+        return cls._write(model, date, pending)
+
+    @classmethod
+    def _write(cls, model, date: date_type, positions: Dict[int, List[Tuple[int, int]]]) -> Dict[int, int]:
+        """Apply {owner id: register positions} to the day's sketch rows; returns the changed estimates."""
+        owner_field = cls.OWNERS[model]
+        changed, seen = [], []
+        with transaction.atomic():
+            model.objects.bulk_create(
+                [model(**{owner_field: owner_id, 'date': date}) for owner_id in positions],
+                ignore_conflicts=True
+            )
+            # Locked in owner order so concurrent batches cannot deadlock
+            rows = model.objects.select_for_update().filter(
+                **{f'{owner_field}__in': list(positions)}, date=date
+            ).order_by(owner_field)
+            for row in rows:
+                owner_id = getattr(row, owner_field)
+                sketch = HyperLogLog.from_bytes(row.registers)
+                if sketch.update(positions[owner_id]):
+                    row.registers = sketch.to_bytes()
+                    row.estimate = sketch.count()
+                    row.updated_at = timezone.now()
+                    changed.append(row)
+                seen.append(((model, owner_id, date), sketch.registers))
+            model.objects.bulk_update(changed, ['registers', 'estimate', 'updated_at'])
+            # Mirrors must not get ahead of the database if the caller rolls back
+            transaction.on_commit(lambda: [cls._remember(key, registers) for key, registers in seen])
+        return {getattr(row, owner_field): row.estimate for row in changed}
+
+    @classmethod
+    def _remember(cls, key, registers: bytearray) -> None:
+        if len(cls._mirrors) >= cls.MIRROR_SIZE:
+            cls._mirrors.clear()
+        cls._mirrors[key] = registers
+
+    @classmethod
+    def campaign_reach(cls, campaign_ids: List[int], start: date_type, end: date_type) -> int:
+        return cls.reach(CampaignReachSketch, campaign_ids, start, end)
+
+    @classmethod
+    def company_reach(cls, company_ids: List[int], start: date_type, end: date_type) -> int:
+        return cls.reach(CompanyReachSketch, company_ids, start, end)
+
+    @classmethod
+    def company_visitors(cls, company_ids: List[int], start: date_type, end: date_type) -> int:
+        """
+        Estimated distinct visitors of ``company_ids`` between ``start`` and
+        ``end`` inclusive, including days from before the sketches existed.
+
+        Day sketches are merged. Days without a sketch, and days whose stored
+        CampaignStatistics.unique_visitors exceeds the sketch (its first
+        visitors were counted before the sketch began), add the stored daily
+        count instead, which counts a visitor returning on several such days
+        more than once.
+        """
+        stored = CampaignStatistics.objects.filter(
+            company_id=OuterRef('company_id'), date=OuterRef('date')
+        ).values('unique_visitors')[:1]
+        sketches = CompanyReachSketch.objects.filter(
+            company_id__in=company_ids, date__gte=start, date__lte=end
+        ).annotate(stored=Subquery(stored)).values_list('registers', 'estimate', 'stored')
+
+        complete, partial = [], 0
+        for registers, estimate, stored_visitors in sketches:
+            if stored_visitors is not None and stored_visitors > estimate:
+                partial += stored_visitors
+            else:
+                complete.append(registers)
+
+        unsketched = CampaignStatistics.objects.filter(
+            company_id__in=company_ids, date__gte=start, date__lte=end
+        ).exclude(
+            Exists(CompanyReachSketch.objects.filter(company_id=OuterRef('company_id'), date=OuterRef('date')))
+        ).aggregate(total=Sum('unique_visitors'))['total'] or 0
+
+        return cls._count(complete) + partial + unsketched
+
+    @classmethod
+    def reach(cls, model, owner_ids: List[int], start: date_type, end: date_type) -> int:
+        """Estimated distinct users across ``owner_ids`` between ``start`` and ``end`` inclusive."""
+        rows = model.objects.filter(
+            **{f'{cls.OWNERS[model]}__in': owner_ids},
+            date__gte=start,
+            date__lte=end
+        ).values_list('registers', flat=True)
+        return cls._count(rows)
+
+    @staticmethod
+    def _count(registers_list: Iterable[bytes]) -> int:
+        """Estimate of the union of the sketches."""
+        merged = None
+        for registers in registers_list:
+            sketch = HyperLogLog.from_bytes(registers)
+            if merged is None:
+                merged = sketch
+            else:
+                merged.merge(sketch)
+        return merged.count() if merged else 0
+
+
+os.register_at_fork(after_in_child=ReachSketches._after_fork)
@@ -0,0 +1,267 @@
+import re
+import time
+from datetime import date as date_type, datetime, timedelta, timezone as dt_timezone
+from typing import Dict, List, Optional
+
+from django.db import connection, transaction
+from django.db.models import Count, Max, Min, Q
+
+from ..models import SponsorDeliveryLog, SponsorDeliveryRollup
+
+
+def day_start(date: date_type) -> datetime:
+    """Midnight UTC at the start of ``date``."""
+    return datetime.combine(date, datetime.min.time(), tzinfo=dt_timezone.utc)
+
+
+class DeliveryLogRetention:
+    """
+    Rollup and purge of raw SponsorDeliveryLog rows.
+
+    Each completed day is rolled up into SponsorDeliveryRollup. Only days that
+    have been rolled up may be purged, and the purge deletes in small
+    primary-key batches, each in its own short transaction, so beacon
+    writers never wait behind one long DELETE.
+    """
+
+    @classmethod
+    def cutoff(cls, retention_days: int, today: date_type) -> datetime:
+        """Raw rows shown before this instant are outside the retention window."""
+        return day_start(today - timedelta(days=retention_days))
+
+    @classmethod
+    def pending_days(cls, today: date_type) -> List[date_type]:
+        """Completed days whose rollup is missing or may still change."""
+        last = SponsorDeliveryRollup.objects.aggregate(last=Max('date'))['last']
+        first = SponsorDeliveryLog.objects.aggregate(first=Min('shown_at'))['first']
+        if first is None:
+            return []
+        # The last rolled-up day is redone in case late queued events landed in it
+        start = first.date() if last is None else max(last, first.date())
+        return [start + timedelta(days=n) for n in range((today - start).days)]
+
+    @classmethod
+    def rollup_day(cls, date: date_type) -> int:
+        """(Re)build the rollup rows for ``date``; returns how many were written."""
+        start = day_start(date)
+        totals = (
+            SponsorDeliveryLog.objects
+            .filter(shown_at__gte=start, shown_at__lt=start + timedelta(days=1))
+            .values('campaign_id', 'page_key')
+            .annotate(
+                impressions=Count('id', filter=Q(action='impression')),
+                clicks=Count('id', filter=Q(action='click')),
+                unique_users=Count('user_hash', distinct=True),
+            )
+            .order_by()
+        )
+        rollups = [SponsorDeliveryRollup(date=date, **row) for row in totals]
+        with transaction.atomic():
+            SponsorDeliveryRollup.objects.filter(date=date).delete()
+            SponsorDeliveryRollup.objects.bulk_create(rollups, batch_size=1000)
+        return len(rollups)
+
+    @classmethod
+    def rollup_pending(cls, today: date_type) -> Dict[date_type, int]:
+        """Roll up every pending day; returns {date: rollup rows}."""
+        return {date: cls.rollup_day(date) for date in cls.pending_days(today)}
+
+    @classmethod
+    def purgeable_before(cls, before: datetime) -> Optional[datetime]:
+        """Clamp ``before`` to the end of the last rolled-up day (None if nothing is rolled up)."""
+        last = SponsorDeliveryRollup.objects.aggregate(last=Max('date'))['last']
+        if last is None:
+            return None
+        return min(before, day_start(last + timedelta(days=1)))
+
+    @classmethod
+    def purge(cls, before: datetime, chunk_size: int = 5000, pause: float = 0.0) -> int:
+        """Delete rolled-up raw rows shown before ``before``; returns how many were deleted."""
+        before = cls.purgeable_before(before)
+        if before is None:
+            return 0
+
+        deleted = 0
+        while True:
+            ids = list(
+                SponsorDeliveryLog.objects.filter(shown_at__lt=before)
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if not ids:
+                return deleted
+            with transaction.atomic():
+                count, _ = SponsorDeliveryLog.objects.filter(id__in=ids).delete()
+            deleted += count
+            if pause:
+                time.sleep(pause)
+
+
+class DeliveryLogPartitions:
+    """
+    Optional native range partitioning of SponsorDeliveryLog by ``shown_at``
+    (PostgreSQL only).
+
+    ``convert`` swaps the table for one partitioned by calendar month (UTC),
+    with a default partition to catch rows outside the created ranges. Once
+    that is done, the retention job drops whole months instead of deleting
+    them row by row. The primary key becomes (id, shown_at), as partitioning
+    requires. Django still addresses rows by id, so schema migrations that
+    touch this table must be written with the partitioned layout in mind.
+    """
+
+    TABLE = SponsorDeliveryLog._meta.db_table
+    NAME_PATTERN = re.compile(rf'^{TABLE}_p(\d{{4}})(\d{{2}})$')
+
+    @classmethod
+    def supported(cls) -> bool:
+        return connection.vendor == 'postgresql'
+
+    @classmethod
+    def is_partitioned(cls) -> bool:
+        if not cls.supported():
+            return False
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(%s)',
+                [cls.TABLE]
+            )
+            return cursor.fetchone() is not None
+
+    @classmethod
+    def partition_name(cls, year: int, month: int) -> str:
+        return f'{cls.TABLE}_p{year}{month:02d}'
+
+    @staticmethod
+    def month_start(year: int, month: int) -> datetime:
+        return datetime(year, month, 1, tzinfo=dt_timezone.utc)
+
+    @staticmethod
+    def next_month(year: int, month: int) -> tuple:
+        return (year + 1, 1) if month == 12 else (year, month + 1)
+
+    @classmethod
+    def months(cls, first: date_type, today: date_type, months_ahead: int) -> List[tuple]:
+        """(year, month) pairs from ``first``'s month through ``months_ahead`` months after ``today``'s."""
+        last = (today.year, today.month)
+        for _ in range(months_ahead):
+            last = cls.next_month(*last)
+        months = []
+        current = (first.year, first.month)
+        while current <= last:
+            months.append(current)
+            current = cls.next_month(*current)
+        return months
+
+    @classmethod
+    def partitions(cls) -> Dict[tuple, str]:
+        """Existing monthly partitions as {(year, month): table name}."""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT child.relname FROM pg_inherits '
+                'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+                'WHERE pg_inherits.inhparent = to_regclass(%s)',
+                [cls.TABLE]
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        partitions = {}
+        for name in names:
+            match = cls.NAME_PATTERN.match(name)
+            if match:
+                partitions[int(match.group(1)), int(match.group(2))] = name
+        return partitions
+
+    @classmethod
+    def _create_partition(cls, cursor, year: int, month: int) -> str:
+        quote = connection.ops.quote_name
+        name = cls.partition_name(year, month)
+        cursor.execute(
+            f'CREATE TABLE IF NOT EXISTS {quote(name)} PARTITION OF {quote(cls.TABLE)} '
+            f'FOR VALUES FROM (%s) TO (%s)',
+            [cls.month_start(year, month), cls.month_start(*cls.next_month(year, month))]
+        )
+        return name
+
+    @classmethod
+    def ensure(cls, today: date_type, months_ahead: int = 2) -> List[str]:
+        """Create the partitions for this month and ``months_ahead`` more; returns the new ones."""
+        existing = cls.partitions()
+        created = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            for year, month in cls.months(today, today, months_ahead):
+                if (year, month) not in existing:
+                    created.append(cls._create_partition(cursor, year, month))
+        return created
+
+    @classmethod
+    def drop_before(cls, before: datetime) -> List[str]:
+        """Drop monthly partitions that end at or before ``before``; returns their names."""
+        quote = connection.ops.quote_name
+        dropped = []
+        for (year, month), name in sorted(cls.partitions().items()):
+            if cls.month_start(*cls.next_month(year, month)) > before:
+                continue
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f'DROP TABLE {quote(name)}')
+            dropped.append(name)
+        return dropped
+
+    @classmethod
+    def convert(cls, today: date_type, months_ahead: int = 2) -> List[str]:
+        """
+        Rebuild the log table as a partitioned table, copying every row.
+
+        Runs in one transaction that holds an exclusive lock on the table, so
+        beacon processing pauses until it commits. Returns the partitions created.
+        """
+        if not cls.supported():
+            raise RuntimeError('Native partitioning needs PostgreSQL')
+        if cls.is_partitioned():
+            raise RuntimeError(f'{cls.TABLE} is already partitioned')
+
+        quote = connection.ops.quote_name
+        table = quote(cls.TABLE)
+        legacy = quote(f'{cls.TABLE}_unpartitioned')
+        sequence = quote(f'{cls.TABLE}_id_seq')
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Index and foreign key definitions are re-applied to the new parent
+            cursor.execute(
+                'SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s',
+                [cls.TABLE, f'{cls.TABLE}_pkey']
+            )
+            index_definitions = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = to_regclass(%s) AND contype = 'f'",
+                [cls.TABLE]
+            )
+            foreign_keys = cursor.fetchall()
+            cursor.execute(f'SELECT MIN(shown_at), MAX(id) FROM {table}')
+            first_shown, max_id = cursor.fetchone()
+
+            cursor.execute(f'ALTER TABLE {table} RENAME TO {legacy}')
+            cursor.execute(
+                f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (shown_at)'
+            )
+            cursor.execute(f'ALTER TABLE {table} ADD PRIMARY KEY (id, shown_at)')
+            cursor.execute(f'CREATE TABLE {quote(cls.TABLE + "_default")} PARTITION OF {table} DEFAULT')
+
+            first = min(first_shown.date(), today) if first_shown else today
+            created = [
+                cls._create_partition(cursor, year, month)
+                for year, month in cls.months(first, today, months_ahead)
+            ]
+
+            cursor.execute(f'INSERT INTO {table} SELECT * FROM {legacy}')
+            # Drops the old identity sequence and indexes, freeing their names
+            cursor.execute(f'DROP TABLE {legacy}')
+
+            cursor.execute(f'CREATE SEQUENCE {sequence} OWNED BY {table}.id')
+            cursor.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT nextval('{sequence}')")
+            cursor.execute('SELECT setval(%s, %s, false)', [f'{cls.TABLE}_id_seq', (max_id or 0) + 1])
+
+            for definition in index_definitions:
+                cursor.execute(definition)
+            for name, definition in foreign_keys:
+                cursor.execute(f'ALTER TABLE {table} ADD CONSTRAINT {quote(name)} {definition}')
+        return created
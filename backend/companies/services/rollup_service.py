@@ -0,0 +1,224 @@
+from datetime import date as date_type, timedelta
+from decimal import Decimal
+from functools import reduce
+from operator import or_
+from typing import Any, Dict, Iterable, List, Tuple
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+from django.utils import timezone
+
+from ..models import CampaignStatistics, CampaignStatisticsMonthly, CampaignStatisticsWeekly
+
+
+class StatisticsRollups:
+    """
+    Weekly and monthly CampaignStatistics rollups, and the planner that
+    reads a date range from them.
+
+    ``refresh`` recomputes the weeks and months containing changed daily
+    rows. It runs after buffered beacon counters are flushed and after
+    daily rows are saved or deleted. ``plan`` covers a range with whole
+    months, then whole weeks, then single days, and ``report`` reads the
+    planned rows summed across companies, so a year of dashboard statistics
+    is a few dozen rows instead of one per company per day.
+    """
+
+    COUNTERS = ('page_views', 'job_page_clicks', 'profile_views', 'application_clicks', 'contact_clicks')
+    RATES = ('click_through_rate', 'engagement_rate')
+
+    # Coarsest first, as the planner tries them
+    MODELS = {
+        'month': CampaignStatisticsMonthly,
+        'week': CampaignStatisticsWeekly,
+    }
+    TRUNCATE = {
+        'month': TruncMonth,
+        'week': TruncWeek,
+    }
+
+    @staticmethod
+    def period_start(granularity: str, date: date_type) -> date_type:
+        if granularity == 'month':
+            return date.replace(day=1)
+        return date - timedelta(days=date.weekday())
+
+    @staticmethod
+    def period_end(granularity: str, start: date_type) -> date_type:
+        """First day after the period beginning at ``start``."""
+        if granularity == 'month':
+            return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+        return start + timedelta(days=7)
+
+    @classmethod
+    def plan(cls, start: date_type, end: date_type) -> List[Tuple[str, date_type, date_type]]:
+        """
+        Cover ``start``..``end`` (inclusive) with (granularity, first day,
+        last day) segments in date order: whole months where they fit, then
+        whole weeks that stay inside one month, then runs of days.
+        """
+        segments = []
+        cursor = start
+        while cursor <= end:
+            month_end = cls.period_end('month', cls.period_start('month', cursor))
+            for granularity in cls.MODELS:
+                if cls.period_start(granularity, cursor) != cursor:
+                    continue
+                period_end = cls.period_end(granularity, cursor)
+                # A week straddling a month boundary would keep that month from being used
+                if period_end - timedelta(days=1) <= end and period_end <= month_end:
+                    segments.append((granularity, cursor, period_end - timedelta(days=1)))
+                    cursor = period_end
+                    break
+            else:
+                next_week = cls.period_end('week', cls.period_start('week', cursor))
+                last = min(end, next_week - timedelta(days=1), month_end - timedelta(days=1))
+                segments.append(('day', cursor, last))
+                cursor = last + timedelta(days=1)
+        return segments
+
+    @classmethod
+    def _sums(cls, daily: bool) -> Dict[str, Any]:
+        sums = {name: Sum(name) for name in cls.COUNTERS}
+        if daily:
+            sums['days'] = Count('id')
+            sums.update({f'{name}_sum': Sum(name) for name in cls.RATES})
+        else:
+            sums['days'] = Sum('days')
+            sums.update({f'{name}_sum': Sum(f'{name}_sum') for name in cls.RATES})
+        return sums
+
+    @classmethod
+    def report(cls, company_ids: Iterable[int], start: date_type, end: date_type) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """
+        Totals and series of ``company_ids`` between ``start`` and ``end``
+        inclusive, one query per granularity in the plan.
+
+        Totals are the summed counters (``total_*``) and the rates averaged
+        over every daily row (``avg_*``); all None when there are no rows,
+        as with an aggregate over an empty range. The series has one point
+        per planned segment, newest first: ``date`` (first day),
+        ``period_end``, ``granularity`` ('month', 'week' or 'day'), ``days``,
+        the counters and the average daily rates. Day points also carry the
+        summed ``unique_visitors``; week and month points have None there,
+        since daily uniques do not add up.
+        """
+        company_ids = list(company_ids)
+        segments = cls.plan(start, end)
+        points = []
+
+        day_ranges = [Q(date__gte=first, date__lte=last) for granularity, first, last in segments if granularity == 'day']
+        if day_ranges:
+            rows = (
+                CampaignStatistics.objects
+                .filter(reduce(or_, day_ranges), company_id__in=company_ids)
+                .values('date')
+                .annotate(unique_visitors=Sum('unique_visitors'), **cls._sums(daily=True))
+                .order_by()
+            )
+            for row in rows:
+                points.append({**row, 'granularity': 'day', 'period_end': row['date']})
+
+        for granularity, model in cls.MODELS.items():
+            starts = [first for segment, first, last in segments if segment == granularity]
+            if not starts:
+                continue
+            rows = (
+                model.objects
+                .filter(company_id__in=company_ids, period_start__in=starts)
+                .values('period_start')
+                .annotate(**cls._sums(daily=False))
+                .order_by()
+            )
+            for row in rows:
+                first = row.pop('period_start')
+                points.append({
+                    **row,
+                    'date': first,
+                    'period_end': cls.period_end(granularity, first) - timedelta(days=1),
+                    'granularity': granularity,
+                    'unique_visitors': None,
+                })
+
+        days = sum(point['days'] for point in points)
+        totals = {
+            f'total_{name}': sum(point[name] for point in points) if days else None
+            for name in cls.COUNTERS
+        }
+        for name in cls.RATES:
+            totals[f'avg_{name}'] = cls._average(sum(point[f'{name}_sum'] for point in points), days)
+            for point in points:
+                point[name] = cls._average(point.pop(f'{name}_sum'), point['days'])
+
+        points.sort(key=lambda point: point['date'], reverse=True)
+        return totals, points
+
+    @staticmethod
+    def _average(total, days):
+        if not days or total is None:
+            return None
+        return (Decimal(total) / days).quantize(Decimal('0.01'))
+
+    @classmethod
+    def refresh(cls, keys: Iterable[Tuple[int, date_type]]) -> None:
+        """Recompute the week and month rollups containing the (company id, date) daily rows."""
+        keys = set(keys)
+        if not keys:
+            return
+
+        now = timezone.now()
+        with transaction.atomic():
+            for granularity, model in cls.MODELS.items():
+                periods = sorted({(company_id, cls.period_start(granularity, date)) for company_id, date in keys})
+                company_ids = {company_id for company_id, _ in periods}
+                starts = {first for _, first in periods}
+
+                # Lock the rollup rows (in key order) before reading the daily rows,
+                # so a concurrent refresh of the same period sees this one's writes
+                model.objects.bulk_create(
+                    [model(company_id=company_id, period_start=first) for company_id, first in periods],
+                    ignore_conflicts=True
+                )
+                rollups = {
+                    (rollup.company_id, rollup.period_start): rollup
+                    for rollup in model.objects.select_for_update()
+                    .filter(company_id__in=company_ids, period_start__in=starts)
+                    .order_by('company_id', 'period_start')
+                }
+
+                sums = (
+                    CampaignStatistics.objects
+                    .filter(
+                        company_id__in=company_ids,
+                        date__gte=min(starts),
+                        date__lt=cls.period_end(granularity, max(starts))
+                    )
+                    .annotate(period_start=cls.TRUNCATE[granularity]('date'))
+                    .values('company_id', 'period_start')
+                    .annotate(**cls._sums(daily=True))
+                    .order_by()
+                )
+                fresh = {(row.pop('company_id'), row.pop('period_start')): row for row in sums}
+
+                changed, emptied = [], []
+                for key in periods:
+                    rollup = rollups[key]
+                    values = fresh.get(key)
+                    if values is None:
+                        emptied.append(rollup.pk)
+                        continue
+                    for name, value in values.items():
+                        setattr(rollup, name, value)
+                    rollup.updated_at = now
+                    changed.append(rollup)
+                model.objects.bulk_update(
+                    changed, ['days', *cls.COUNTERS, *(f'{name}_sum' for name in cls.RATES), 'updated_at']
+                )
+                if emptied:
+                    model.objects.filter(pk__in=emptied).delete()
+
+    @classmethod
+    def refresh_rows(cls, rows: List[Tuple[Dict[str, Any], Dict[str, int]]]) -> None:
+        """CounterBuffer flush hook: refresh the periods of the flushed daily rows."""
+        cls.refresh((lookup['company_id'], lookup['date']) for lookup, _ in rows)
@@ -0,0 +1,278 @@
+import logging
+import re
+from typing import Dict, Optional, List, Iterable
+
+from django.conf import settings
+from django.db import connection, DatabaseError
+
+logger = logging.getLogger(__name__)
+
+
+def search_terms(query: str) -> List[str]:
+    """Split a search string the same way DRF's SearchFilter does."""
+    return [term for term in re.split(r'[\s,]+', query or '') if term]
+
+
+def company_document(company, function_names: Optional[Iterable[str]] = None) -> dict:
+    """
+    Return the searchable text of a company, one entry per weighted column.
+    ``function_names`` stands in for ``company.functions`` when given.
+    """
+    if function_names is None:
+        function_names = [func.name for func in company.functions.all()]
+    return {
+        'name': company.name or '',
+        'functions': ' '.join(function_names),
+        'city': company.city or '',
+        'country': company.country or '',
+    }
+
+
+class BaseSearchBackend:
+    """
+    Company search index kept in a shadow table next to companies_company.
+
+    ``search`` returns company ids ordered by relevance (best first), one
+    entry per company, or None when the backend cannot answer the query and
+    callers should fall back to substring matching.
+    """
+
+    BATCH_SIZE = 1000
+
+    @classmethod
+    def search(cls, query: str) -> Optional[List[int]]:
+        raise NotImplementedError
+
+    @classmethod
+    def index_companies(cls, companies: Iterable) -> None:
+        cls.index_documents({company.id: company_document(company) for company in companies})
+
+    @classmethod
+    def index_documents(cls, documents: Dict[int, dict]) -> None:
+        """Index ``company_document`` dicts keyed by company id, replacing any previous entries."""
+        raise NotImplementedError
+
+    @classmethod
+    def remove_companies(cls, company_ids: Iterable[int]) -> None:
+        raise NotImplementedError
+
+    @classmethod
+    def clear(cls) -> None:
+        raise NotImplementedError
+
+    @classmethod
+    def rebuild(cls) -> int:
+        """Re-index every company in batches; returns the number indexed."""
+        # Import here to avoid circular imports
+        from ..models import Company
+
+        cls.clear()
+        total = 0
+        queryset = Company.objects.order_by('id').prefetch_related('functions')
+        batch = []
+        for company in queryset.iterator(chunk_size=cls.BATCH_SIZE):
+            batch.append(company)
+            if len(batch) >= cls.BATCH_SIZE:
+                cls.index_companies(batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            cls.index_companies(batch)
+            total += len(batch)
+        return total
+
+    @staticmethod
+    def _merge(primary: List[int], fallback: List[int]) -> List[int]:
+        """Ranked hits first, then fallback hits not already returned."""
+        seen = set(primary)
+        return primary + [company_id for company_id in fallback if company_id not in seen]
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    """
+    tsvector + GIN full-text search with pg_trgm fallback.
+
+    Words are matched by prefix and ranked with ts_rank_cd (name weighted
+    above functions, then location). Substring and misspelled matches are
+    appended from the trigram index.
+    """
+
+    TABLE = 'companies_company_search'
+
+    @classmethod
+    def search(cls, query: str) -> Optional[List[int]]:
+        terms = search_terms(query)
+        words = [re.sub(r'[^\w]', '', term) for term in terms]
+        words = [word for word in words if word]
+        if not terms:
+            return None
+
+        try:
+            with connection.cursor() as cursor:
+                primary = []
+                if words:
+                    cursor.execute(
+                        f"""
+                        SELECT company_id
+                        FROM {cls.TABLE}, to_tsquery('simple', %s) AS query
+                        WHERE document @@ query
+                        ORDER BY ts_rank_cd(document, query) DESC, company_id
+                        """,
+                        [' & '.join(f'{word}:*' for word in words)]
+                    )
+                    primary = [row[0] for row in cursor.fetchall()]
+
+                cursor.execute(
+                    f"""
+                    SELECT company_id
+                    FROM {cls.TABLE}
+                    WHERE text ILIKE ALL(%s)
+                    ORDER BY similarity(text, %s) DESC, company_id
+                    """,
+                    [[f'%{cls._escape_like(term)}%' for term in terms], query]
+                )
+                fallback = [row[0] for row in cursor.fetchall()]
+        except DatabaseError:
+            logger.warning('Postgres company search failed; falling back to substring search.', exc_info=True)
+            return None
+
+        return cls._merge(primary, fallback)
+
+    @staticmethod
+    def _escape_like(term: str) -> str:
+        return term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    @classmethod
+    def index_documents(cls, documents: Dict[int, dict]) -> None:
+        rows = []
+        for company_id, doc in documents.items():
+            rows.append([
+                company_id, doc['name'], doc['functions'], doc['city'], doc['country'],
+                ' '.join(doc.values()),
+            ])
+        if not rows:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"""
+                INSERT INTO {cls.TABLE} (company_id, document, text)
+                VALUES (
+                    %s,
+                    setweight(to_tsvector('simple', %s), 'A') ||
+                    setweight(to_tsvector('simple', %s), 'B') ||
+                    setweight(to_tsvector('simple', %s || ' ' || %s), 'C'),
+                    %s
+                )
+                ON CONFLICT (company_id) DO UPDATE
+                SET document = EXCLUDED.document, text = EXCLUDED.text
+                """,
+                rows
+            )
+
+    @classmethod
+    def remove_companies(cls, company_ids: Iterable[int]) -> None:
+        company_ids = list(company_ids)
+        if not company_ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {cls.TABLE} WHERE company_id = ANY(%s)", [company_ids])
+
+    @classmethod
+    def clear(cls) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {cls.TABLE}")
+
+
+class SqliteSearchBackend(BaseSearchBackend):
+    """
+    SQLite FTS5 shadow tables.
+
+    A unicode61 table answers word-prefix queries ranked by bm25 with
+    per-column weights; a trigram table appends substring matches. Queries
+    with terms shorter than three characters are left to the caller.
+    """
+
+    TABLE = 'companies_company_fts'
+    TRIGRAM_TABLE = 'companies_company_fts_trigram'
+    # bm25 weights for (name, functions, city, country)
+    WEIGHTS = (10.0, 5.0, 2.0, 2.0)
+
+    @staticmethod
+    def _quote(term: str) -> str:
+        return '"' + term.replace('"', '""') + '"'
+
+    @classmethod
+    def search(cls, query: str) -> Optional[List[int]]:
+        terms = search_terms(query)
+        if not terms or any(len(term) < 3 for term in terms):
+            # Too short for trigram matching; let the caller do substring matching
+            return None
+
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"""
+                    SELECT rowid FROM {cls.TABLE}
+                    WHERE {cls.TABLE} MATCH %s
+                    ORDER BY bm25({cls.TABLE}, {', '.join(str(w) for w in cls.WEIGHTS)}), rowid
+                    """,
+                    [' AND '.join(cls._quote(term) + '*' for term in terms)]
+                )
+                primary = [row[0] for row in cursor.fetchall()]
+
+                cursor.execute(
+                    f"""
+                    SELECT rowid FROM {cls.TRIGRAM_TABLE}
+                    WHERE {cls.TRIGRAM_TABLE} MATCH %s
+                    ORDER BY rank, rowid
+                    """,
+                    [' AND '.join(cls._quote(term) for term in terms)]
+                )
+                fallback = [row[0] for row in cursor.fetchall()]
+        except DatabaseError:
+            logger.warning('SQLite company search failed; falling back to substring search.', exc_info=True)
+            return None
+
+        return cls._merge(primary, fallback)
+
+    @classmethod
+    def index_documents(cls, documents: Dict[int, dict]) -> None:
+        rows = []
+        for company_id, doc in documents.items():
+            rows.append((company_id, doc['name'], doc['functions'], doc['city'], doc['country']))
+        if not rows:
+            return
+        ids = [[row[0]] for row in rows]
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {cls.TABLE} WHERE rowid = %s", ids)
+            cursor.executemany(f"DELETE FROM {cls.TRIGRAM_TABLE} WHERE rowid = %s", ids)
+            cursor.executemany(
+                f"INSERT INTO {cls.TABLE} (rowid, name, functions, city, country) VALUES (%s, %s, %s, %s, %s)",
+                rows
+            )
+            cursor.executemany(
+                f"INSERT INTO {cls.TRIGRAM_TABLE} (rowid, text) VALUES (%s, %s)",
+                [(row[0], ' '.join(row[1:])) for row in rows]
+            )
+
+    @classmethod
+    def remove_companies(cls, company_ids: Iterable[int]) -> None:
+        ids = [[company_id] for company_id in company_ids]
+        if not ids:
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(f"DELETE FROM {cls.TABLE} WHERE rowid = %s", ids)
+            cursor.executemany(f"DELETE FROM {cls.TRIGRAM_TABLE} WHERE rowid = %s", ids)
+
+    @classmethod
+    def clear(cls) -> None:
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {cls.TABLE}")
+            cursor.execute(f"DELETE FROM {cls.TRIGRAM_TABLE}")
+
+
+def get_search_backend():
+    """Return the search backend matching the configured database engine."""
+    if getattr(settings, 'DATABASE_ENGINE', 'sqlite') == 'postgresql':
+        return PostgresSearchBackend
+    return SqliteSearchBackend
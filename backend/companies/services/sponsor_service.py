@@ -1,12 +1,481 @@
 import hashlib
 import random
-from typing import Optional, Dict, List, Any
-from datetime import datetime, timedelta
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Optional, Dict, List, Any, Set
+from datetime import datetime, timedelta, date as date_type, timezone as dt_timezone
 from django.utils import timezone
 from django.db import transaction
+from django.db.models import Count
 from django.core.cache import cache
 
-from ..models import SponsorCampaign, SponsorDeliveryLog, SponsorStatsDaily
+from ..models import SponsorCampaign, SponsorDeliveryLog, SponsorStatsDaily, SponsorImpressionEvent
+from .counter_service import AtomicCounter
+from .dimension_service import LogDimensions
+from .reach_service import ReachSketches
+from .directory_service import CompanyDirectory
+
+
+class AliasTable:
+    """
+    Walker/Vose alias table for O(1) weighted draws.
+
+    Built in O(n) from non-negative weights; each draw costs one randrange
+    and one random() from the caller's generator, so a seeded
+    ``random.Random`` gives the same pick in every process.
+    """
+
+    def __init__(self, weights: List[float]):
+        n = len(weights)
+        total = float(sum(weights))
+        scaled = [weight * n / total for weight in weights]
+        self.probability = [1.0] * n
+        self.alias = list(range(n))
+
+        small = [i for i, p in enumerate(scaled) if p < 1.0]
+        large = [i for i, p in enumerate(scaled) if p >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            self.probability[less] = scaled[less]
+            self.alias[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            (small if scaled[more] < 1.0 else large).append(more)
+        # Leftovers are 1.0 up to rounding error
+
+    def draw(self, rng: random.Random) -> int:
+        """Return an index with probability proportional to its weight."""
+        column = rng.randrange(len(self.probability))
+        return column if rng.random() < self.probability[column] else self.alias[column]
+
+
+# Page filter -> SponsorCampaign targeting list it is matched against
+TARGETING_DIMENSIONS = {
+    'country': 'targeting_countries',
+    'function': 'targeting_functions',
+    'work_environment': 'targeting_work_env',
+}
+
+
+class CampaignTable:
+    """
+    Immutable set of deliverable campaigns with an inverted targeting index.
+
+    ``index[dimension]`` maps each targeted value to the ids of campaigns
+    targeting it; the ``None`` bucket holds campaigns that do not target the
+    dimension at all (they match any value).
+    """
+
+    def __init__(self, version: str, campaigns: List['SponsorCampaign']):
+        self.version = version
+        self.built_at = time.time()
+        self.campaigns = campaigns
+        self.by_id = {campaign.id: campaign for campaign in campaigns}
+        self.position = {campaign.id: position for position, campaign in enumerate(campaigns)}
+        self.all_ids = frozenset(self.by_id)
+        self.index = {}
+        for dimension, attribute in TARGETING_DIMENSIONS.items():
+            buckets = {None: set()}
+            for campaign in campaigns:
+                values = getattr(campaign, attribute) or []
+                if not values:
+                    buckets[None].add(campaign.id)
+                for value in values:
+                    try:
+                        buckets.setdefault(value, set()).add(campaign.id)
+                    except TypeError:
+                        # Unhashable JSON value; it can never equal a query parameter
+                        continue
+            self.index[dimension] = {value: frozenset(ids) for value, ids in buckets.items()}
+
+    def matching_ids(self, filters: Dict[str, Any]) -> frozenset:
+        """Ids of campaigns whose targeting matches ``filters`` (SponsorCampaign.matches_targeting)."""
+        ids = self.all_ids
+        for dimension in TARGETING_DIMENSIONS:
+            value = filters.get(dimension)
+            if not value:
+                continue
+            buckets = self.index[dimension]
+            try:
+                targeted = buckets.get(value, frozenset())
+            except TypeError:
+                targeted = frozenset()
+            ids = ids & (buckets[None] | targeted)
+            if not ids:
+                break
+        return ids
+
+
+class SponsorCampaignTable:
+    """
+    Per-process table of deliverable campaigns.
+
+    Reloaded when the shared version token moves (campaign saved or deleted,
+    see companies.signals) or after REFRESH_SECONDS, so steady-state
+    selection does not query SponsorCampaign. Targeting is resolved by set
+    intersection on the table's inverted index. Start dates are checked at
+    read time, so scheduled campaigns go live without a reload.
+    """
+
+    VERSION_KEY = 'sponsors:campaigns:version'
+    REFRESH_SECONDS = 60
+
+    _table: Optional[CampaignTable] = None
+    _pinned: Optional[List['SponsorCampaign']] = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def invalidate(cls) -> None:
+        """Publish a new table version once the current transaction commits."""
+        transaction.on_commit(lambda: cache.set(cls.VERSION_KEY, CompanyDirectory.new_token(), None))
+
+    @classmethod
+    def matching_campaigns(cls, filters: Dict[str, Any], now: datetime) -> List['SponsorCampaign']:
+        """Live campaigns targeting ``filters``, in table order."""
+        table = cls.get_table()
+        ids = sorted(table.matching_ids(filters), key=table.position.__getitem__)
+        return [
+            campaign for campaign in (table.by_id[campaign_id] for campaign_id in ids)
+            if campaign.start_at <= now <= campaign.end_at
+        ]
+
+    @classmethod
+    def discard(cls) -> None:
+        """Drop this process's copy; the next read reloads from the database."""
+        cls._table = None
+
+    @classmethod
+    @contextmanager
+    def pinned(cls, campaigns: List['SponsorCampaign']):
+        """
+        Serve exactly ``campaigns``, saved or not, in this process while the
+        block runs, instead of the active campaigns in the database. For
+        simulate_sponsor_delivery; other processes are unaffected.
+        """
+        with cls._lock:
+            cls._pinned, cls._table = list(campaigns), None
+        try:
+            yield
+        finally:
+            with cls._lock:
+                cls._pinned, cls._table = None, None
+
+    @classmethod
+    def get(cls, campaign_id) -> Optional['SponsorCampaign']:
+        """An active, unexpired campaign by id, or None."""
+        try:
+            campaign_id = int(campaign_id)
+        except (TypeError, ValueError):
+            return None
+        return cls.get_table().by_id.get(campaign_id)
+
+    @classmethod
+    def get_table(cls) -> CampaignTable:
+        version = cache.get(cls.VERSION_KEY)
+        if version is None:
+            cache.add(cls.VERSION_KEY, CompanyDirectory.new_token(), None)
+            version = cache.get(cls.VERSION_KEY)
+
+        table = cls._table
+        if not cls._is_fresh(table, version):
+            with cls._lock:
+                table = cls._table
+                if not cls._is_fresh(table, version):
+                    if cls._pinned is not None:
+                        campaigns = cls._pinned
+                    else:
+                        campaigns = list(SponsorCampaign.objects.filter(
+                            status='active',
+                            end_at__gte=timezone.now()
+                        ).select_related('company'))
+                    table = cls._table = CampaignTable(version, campaigns)
+        return table
+
+    @classmethod
+    def _is_fresh(cls, table: Optional[CampaignTable], version: str) -> bool:
+        return (
+            table is not None and
+            table.version == version and
+            time.time() - table.built_at < cls.REFRESH_SECONDS
+        )
+
+
+class SponsorDailyCounters:
+    """
+    Today's impression and click counts per campaign, in the shared cache.
+
+    A missing key is seeded from SponsorStatsDaily plus still-queued beacon
+    events; recorded impressions and clicks increment it as they are queued.
+    SponsorStatsDaily stays the source of truth. The cache copy exists so cap
+    checks and delivery scoring cost one cache round trip instead of queries
+    per campaign.
+    """
+
+    FIELDS = ('impressions', 'clicks')
+    TIMEOUT = 2 * 24 * 60 * 60  # Keys outlive their day, then expire
+
+    @staticmethod
+    def key(campaign_id: int, date: date_type, field: str) -> str:
+        return f'sponsors:daily:{date.isoformat()}:{campaign_id}:{field}'
+
+    @classmethod
+    def get_many(cls, campaign_ids: List[int], date: date_type) -> Dict[int, Dict[str, int]]:
+        """Return {campaign id: {'impressions': n, 'clicks': n}} for ``date``."""
+        keys = {
+            cls.key(campaign_id, date, field): (campaign_id, field)
+            for campaign_id in campaign_ids
+            for field in cls.FIELDS
+        }
+        values = cache.get_many(list(keys)) if keys else {}
+        missing = {campaign_id for key, (campaign_id, _) in keys.items() if key not in values}
+        if missing:
+            values.update(cls._seed(missing, date))
+
+        counts = {campaign_id: dict.fromkeys(cls.FIELDS, 0) for campaign_id in campaign_ids}
+        for key, (campaign_id, field) in keys.items():
+            counts[campaign_id][field] = values.get(key, 0)
+        return counts
+
+    @classmethod
+    def increment(cls, campaign_id: int, date: date_type, field: str, amount: int = 1) -> None:
+        try:
+            cache.incr(cls.key(campaign_id, date, field), amount)
+        except ValueError:
+            # Not cached yet; seeding counts the event that was just queued
+            cls._seed([campaign_id], date)
+
+    @classmethod
+    def _seed(cls, campaign_ids, date: date_type) -> Dict[str, int]:
+        rows = {
+            row['campaign_id']: row
+            for row in SponsorStatsDaily.objects.filter(
+                campaign_id__in=campaign_ids, date=date
+            ).values('campaign_id', *cls.FIELDS)
+        }
+        # Queued beacons are not in the stats rows yet
+        day_start = datetime.combine(date, datetime.min.time(), tzinfo=dt_timezone.utc)
+        pending = Counter()
+        for campaign_id, action, count in SponsorImpressionEvent.objects.filter(
+            campaign_id__in=campaign_ids,
+            processed=False,
+            created_at__gte=day_start,
+            created_at__lt=day_start + timedelta(days=1)
+        ).values_list('campaign_id', 'action').annotate(count=Count('id')).order_by():
+            pending[campaign_id, 'impressions' if action == 'impression' else 'clicks'] += count
+
+        values = {}
+        for campaign_id in campaign_ids:
+            row = rows.get(campaign_id, {})
+            for field in cls.FIELDS:
+                key = cls.key(campaign_id, date, field)
+                value = row.get(field, 0) + pending[campaign_id, field]
+                if not cache.add(key, value, cls.TIMEOUT):
+                    value = cache.get(key, value)
+                values[key] = value
+        return values
+
+
+class SponsorFatigueStore:
+    """
+    Each user's most recent sponsored impressions, in the shared cache.
+
+    A bounded ring buffer of (campaign id, shown-at timestamp) pairs per
+    user_hash, appended when an impression is recorded and expired by TTL.
+    The fatigue check reads only this buffer, never SponsorDeliveryLog.
+    """
+
+    SIZE = 32  # Impressions remembered per user
+    TIMEOUT = 60 * 60  # Longest window the fatigue rules look back over
+
+    @staticmethod
+    def key(user_hash: str) -> str:
+        return f'sponsors:fatigue:{user_hash}'
+
+    @classmethod
+    def recent(cls, user_hash: str) -> List[tuple]:
+        """Return the user's impressions, oldest first."""
+        return cache.get(cls.key(user_hash)) or []
+
+    @classmethod
+    def record(cls, user_hash: str, campaign_id: int, shown_at: datetime) -> None:
+        entries = cls.recent(user_hash)
+        entries.append((campaign_id, shown_at.timestamp()))
+        cache.set(cls.key(user_hash), entries[-cls.SIZE:], cls.TIMEOUT)
+
+
+class SponsorPacer:
+    """
+    Token buckets that enforce daily caps and ``pacing`` across workers.
+
+    Time is split into TICK_SECONDS windows. At the start of a window each
+    worker computes every campaign's allowance from one read of the shared
+    daily counters: what it may still deliver by now, i.e. the whole
+    remaining cap for ``asap`` campaigns, and for ``even`` campaigns only
+    the share of the cap accrued so far today plus EVEN_BURST_SECONDS of
+    headroom. Picks take tokens by incrementing the campaign's counter for
+    the window in the shared cache, so all workers spend one budget and a
+    campaign cannot be picked past its allowance within a window. A refused
+    take marks the campaign exhausted in this worker until the next window.
+    """
+
+    TICK_SECONDS = 10
+    EVEN_BURST_SECONDS = 15 * 60
+    DAY_SECONDS = 24 * 60 * 60
+
+    _allowances: Dict[int, float] = {}
+    _exhausted: Set[int] = set()
+    _window: Optional[int] = None
+    _ticked_version: Optional[str] = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def key(campaign_id: int, window: int) -> str:
+        return f'sponsors:pacing:{window}:{campaign_id}'
+
+    @classmethod
+    def window(cls, now: datetime) -> int:
+        return int(now.timestamp()) // cls.TICK_SECONDS
+
+    @classmethod
+    def budget(cls, campaign: 'SponsorCampaign', now: datetime) -> float:
+        """Impressions ``campaign`` may have delivered by ``now`` today."""
+        cap = campaign.daily_impression_cap
+        if campaign.pacing != 'even':
+            return cap
+        day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        elapsed = (now - day_start).total_seconds() + cls.EVEN_BURST_SECONDS
+        return min(cap, cap * elapsed / cls.DAY_SECONDS)
+
+    @classmethod
+    def has_tokens(cls, campaign: 'SponsorCampaign', now: datetime) -> bool:
+        cls._maybe_tick(now)
+        return campaign.id not in cls._exhausted and cls._allowances.get(campaign.id, 0) >= 1
+
+    @classmethod
+    def take(cls, campaign: 'SponsorCampaign', now: datetime) -> bool:
+        """Spend one of the window's shared tokens for a pick; False when none are left."""
+        cls._maybe_tick(now)
+        with cls._lock:
+            window = cls._window
+            allowance = cls._allowances.get(campaign.id, 0)
+            if allowance < 1 or campaign.id in cls._exhausted:
+                return False
+
+            key = cls.key(campaign.id, window)
+            if cache.add(key, 1, 2 * cls.TICK_SECONDS):
+                taken = 1
+            else:
+                try:
+                    taken = cache.incr(key)
+                except ValueError:
+                    # Expired between the two calls
+                    cache.add(key, 1, 2 * cls.TICK_SECONDS)
+                    taken = 1
+
+            if taken > allowance:
+                cls._exhausted.add(campaign.id)
+                return False
+            return True
+
+    @classmethod
+    def tick(cls, now: datetime) -> None:
+        """Recompute every campaign's allowance for the window from today's delivery counts."""
+        table = SponsorCampaignTable.get_table()
+        campaigns = list(table.by_id.values())
+        counts = SponsorDailyCounters.get_many([c.id for c in campaigns], now.date())
+
+        allowances = {}
+        for campaign in campaigns:
+            delivered = counts[campaign.id]
+            if campaign.daily_click_cap and delivered['clicks'] >= campaign.daily_click_cap:
+                allowances[campaign.id] = 0
+            else:
+                allowances[campaign.id] = max(0, cls.budget(campaign, now) - delivered['impressions'])
+
+        cls._allowances = allowances
+        cls._exhausted = set()
+        cls._window = cls.window(now)
+        cls._ticked_version = table.version
+
+    @classmethod
+    def _maybe_tick(cls, now: datetime) -> None:
+        if cls._is_current(now):
+            return
+        with cls._lock:
+            if not cls._is_current(now):
+                cls.tick(now)
+
+    @classmethod
+    def _is_current(cls, now: datetime) -> bool:
+        return (
+            # Windows divide the day evenly, so a new day always starts a new window
+            cls._window == cls.window(now) and
+            # A reloaded campaign table may hold campaigns without an allowance
+            cls._ticked_version == getattr(SponsorCampaignTable._table, 'version', None)
+        )
+
+
+class SponsorEventProcessor:
+    """
+    Drains queued SponsorImpressionEvent rows.
+
+    Each batch becomes one bulk insert into SponsorDeliveryLog, one counter
+    upsert and one reach-sketch update per campaign and day, and one update
+    marking the events processed, all in a single transaction. Rows are claimed with SKIP LOCKED on
+    PostgreSQL, so several workers can drain the queue side by side.
+    """
+
+    @classmethod
+    def process_batch(cls, batch_size: int = 1000) -> int:
+        """Apply up to ``batch_size`` pending events; returns how many were applied."""
+        with transaction.atomic():
+            events = list(
+                SponsorImpressionEvent.objects.select_for_update(skip_locked=True)
+                .filter(processed=False)
+                .order_by('id')[:batch_size]
+            )
+            if not events:
+                return 0
+
+            SponsorDeliveryLog.objects.bulk_create([
+                SponsorDeliveryLog(
+                    campaign_id=event.campaign_id,
+                    user_hash=event.user_hash,
+                    action=event.action,
+                    page_key=event.page_key,
+                    user_agent_id=event.user_agent_id,
+                    ip_address=event.ip_address,
+                    referrer_id=event.referrer_id,
+                    shown_at=event.created_at
+                )
+                for event in events
+            ])
+
+            daily = {}
+            reached = {}
+            for event in events:
+                field = 'impressions' if event.action == 'impression' else 'clicks'
+                counts = daily.setdefault((event.campaign_id, event.created_at.date()), Counter())
+                counts[field] += 1
+                if event.action == 'impression':
+                    reached.setdefault((event.campaign_id, event.created_at.date()), set()).add(event.user_hash)
+            for (campaign_id, date), counts in daily.items():
+                AtomicCounter.increment(SponsorStatsDaily, {'campaign_id': campaign_id, 'date': date}, **counts)
+            for (campaign_id, date), user_hashes in reached.items():
+                ReachSketches.add_campaign_users(campaign_id, date, user_hashes)
+
+            SponsorImpressionEvent.objects.filter(id__in=[event.id for event in events]).update(processed=True)
+        return len(events)
+
+    @classmethod
+    def purge_processed(cls, older_than: timedelta) -> int:
+        """Delete processed events older than ``older_than``; returns the number deleted."""
+        deleted, _ = SponsorImpressionEvent.objects.filter(
+            processed=True,
+            created_at__lt=timezone.now() - older_than
+        ).delete()
+        return deleted
 
 
 class SponsorSelector:
@@ -15,10 +484,16 @@ class SponsorSelector:
     Handles targeting, rotation, fatigue, and tracking.
     """
     
-    # Anti-fatigue settings
+    # Anti-fatigue settings (see SponsorFatigueStore)
     FATIGUE_MINUTES = 45  # Don't show same sponsor within 45 minutes
     FATIGUE_PAGE_VIEWS = 3  # Or within last 3 page views
     
+    # Weighted selection: scores are re-read from the daily counters at most
+    # once per period for each distinct eligible set
+    WEIGHT_PERIOD_SECONDS = 30
+    ALIAS_CACHE_SIZE = 1024
+    _alias_tables = {}  # (campaign ids, period) -> AliasTable
+    
     @classmethod
     def pick_sponsored_campaign(
         cls, 
@@ -54,38 +529,28 @@ class SponsorSelector:
         if not eligible:
             return None
             
-        # Step 3: Choose one using weighted "least delivered" rotation
-        selected = cls._weighted_selection(eligible, filters, user_hash, page_number, now)
-        
-        return selected
+        # Step 3: Choose one using weighted "least delivered" rotation; another
+        # worker may have taken a campaign's last token since the eligibility check
+        while eligible:
+            selected = cls._weighted_selection(eligible, filters, user_hash, page_number, now)
+            if SponsorPacer.take(selected, now):
+                return selected
+            eligible = [c for c in eligible if c.id != selected.id]
+        return None
     
     @classmethod
     def _get_eligible_campaigns(cls, filters: Dict[str, Any], now: datetime) -> List['SponsorCampaign']:
         """Get campaigns that meet basic eligibility criteria"""
-        # Import here to avoid circular imports
-        from ..models import SponsorCampaign
-        
-        # Active campaigns within date range
-        eligible = SponsorCampaign.objects.filter(
-            status='active',
-            start_at__lte=now,
-            end_at__gte=now
-        ).select_related('company')
-        
-        # Filter by targeting and daily caps
-        matching_campaigns = []
-        for campaign in eligible:
-            # Check targeting match
-            if not campaign.matches_targeting(filters):
-                continue
-                
-            # Check daily caps
-            if not campaign.under_daily_caps(now.date()):
-                continue
-                
-            matching_campaigns.append(campaign)
-            
-        return matching_campaigns
+        # Active campaigns within date range, matching the page targeting
+        matching_campaigns = SponsorCampaignTable.matching_campaigns(filters, now)
+        if not matching_campaigns:
+            return []
+
+        # Daily caps and pacing
+        return [
+            campaign for campaign in matching_campaigns
+            if SponsorPacer.has_tokens(campaign, now)
+        ]
     
     @classmethod
     def _apply_fatigue_rules(cls, eligible: List['SponsorCampaign'], user_hash: str, now: datetime) -> List['SponsorCampaign']:
@@ -93,28 +558,25 @@ class SponsorSelector:
         if not eligible:
             return eligible
             
-        # Get recently shown campaigns for this user
-        fatigue_cutoff = now - timedelta(minutes=cls.FATIGUE_MINUTES)
+        recent = SponsorFatigueStore.recent(user_hash)
+        if not recent:
+            return eligible
         
-        recent_campaign_ids = SponsorDeliveryLog.objects.filter(
-            user_hash=user_hash,
-            action='impression',
-            shown_at__gte=fatigue_cutoff
-        ).values_list('campaign_id', flat=True).distinct()
+        # Campaigns in the user's last FATIGUE_PAGE_VIEWS impressions
+        last_views = {campaign_id for campaign_id, _ in recent[-cls.FATIGUE_PAGE_VIEWS:]}
+        
+        # ...or shown within the fatigue window
+        fatigue_cutoff = (now - timedelta(minutes=cls.FATIGUE_MINUTES)).timestamp()
+        recent_campaign_ids = last_views | {
+            campaign_id for campaign_id, shown_at in recent if shown_at >= fatigue_cutoff
+        }
         
         # Remove recently shown campaigns
         filtered = [c for c in eligible if c.id not in recent_campaign_ids]
         
-        # If that eliminates all campaigns, relax the rule (use last hour only)
+        # If that eliminates all campaigns, relax the rule (last page views only)
         if not filtered:
-            relaxed_cutoff = now - timedelta(hours=1)
-            recent_hour_ids = SponsorDeliveryLog.objects.filter(
-                user_hash=user_hash,
-                action='impression', 
-                shown_at__gte=relaxed_cutoff
-            ).values_list('campaign_id', flat=True).distinct()
-            
-            filtered = [c for c in eligible if c.id not in recent_hour_ids]
+            filtered = [c for c in eligible if c.id not in last_views]
             
         # If still empty, return original eligible set
         return filtered if filtered else eligible
@@ -142,38 +604,43 @@ class SponsorSelector:
             # Browse pages: rotate every hour for stability during pagination
             time_component = now.strftime('%Y%m%d%H')
             
-        seed_data = f"{time_component}-{user_hash}-{page_number}-{hash(str(sorted(filters.items())))}"
-        seed = int(hashlib.md5(seed_data.encode(), usedforsecurity=False).hexdigest()[:8], 16)  # nosec B324
-        random.seed(seed)
+        # A digest (not hash(), which is salted per process) so every worker agrees
+        seed_data = f"{time_component}-{user_hash}-{page_number}-{sorted(filters.items())}"
+        seed = int(hashlib.md5(seed_data.encode(), usedforsecurity=False).hexdigest(), 16)  # nosec B324
+        rng = random.Random(seed)  # nosec B311
         
-        # Calculate selection scores
-        scored_campaigns = []
-        today = now.date()
+        table = cls._alias_table(eligible, now)
+        if table is None:
+            return rng.choice(eligible)  # Fallback to uniform random
+        return eligible[table.draw(rng)]
+    
+    @classmethod
+    def _alias_table(cls, eligible: List['SponsorCampaign'], now: datetime) -> Optional['AliasTable']:
+        """
+        Alias table over the eligible campaigns' scores, shared by every
+        request that sees the same eligible set within one weight period.
+        """
+        key = (tuple(c.id for c in eligible), int(now.timestamp()) // cls.WEIGHT_PERIOD_SECONDS)
+        table = cls._alias_tables.get(key)
+        if table is not None:
+            return table
         
-        for campaign in eligible:
-            impressions_today = campaign.impressions_today(today)
-            
+        # Calculate selection scores
+        daily_counts = SponsorDailyCounters.get_many([c.id for c in eligible], now.date())
+        scores = [
             # Score formula: (priority * weight) / (1 + impressions_today)
             # Higher priority and lower delivery = higher score
-            score = (campaign.priority * campaign.weight) / (1 + impressions_today)
-            scored_campaigns.append((campaign, score))
-        
-        # Weighted random selection
-        total_score = sum(score for _, score in scored_campaigns)
-        if total_score <= 0:
-            return random.choice(eligible)  # Fallback to uniform random  # nosec B311
-            
-        # Select based on weighted probability
-        target = random.uniform(0, total_score)  # nosec B311
-        current_sum = 0
+            (campaign.priority * campaign.weight) / (1 + daily_counts[campaign.id]['impressions'])
+            for campaign in eligible
+        ]
+        if sum(scores) <= 0:
+            return None
         
-        for campaign, score in scored_campaigns:
-            current_sum += score
-            if current_sum >= target:
-                return campaign
-                
-        # Fallback (shouldn't happen)
-        return scored_campaigns[0][0] if scored_campaigns else None
+        table = AliasTable(scores)
+        if len(cls._alias_tables) >= cls.ALIAS_CACHE_SIZE:
+            cls._alias_tables.clear()
+        cls._alias_tables[key] = table
+        return table
     
     @classmethod
     def record_impression(
@@ -183,31 +650,12 @@ class SponsorSelector:
         page_key: str,
         user_agent: str = "",
         ip_address: str = "",
-        referrer: str = ""
+        referrer: str = "",
+        page_url: str = "",
+        now: Optional[datetime] = None
     ) -> None:
         """Record an impression for tracking and anti-fatigue"""
-        now = timezone.now()
-        
-        with transaction.atomic():
-            # Log the delivery
-            SponsorDeliveryLog.objects.create(
-                campaign=campaign,
-                user_hash=user_hash,
-                action='impression',
-                page_key=page_key,
-                user_agent=user_agent,
-                ip_address=ip_address,
-                referrer=referrer
-            )
-            
-            # Update daily stats
-            stats, created = SponsorStatsDaily.objects.get_or_create(
-                campaign=campaign,
-                date=now.date(),
-                defaults={'impressions': 0, 'clicks': 0}
-            )
-            stats.impressions += 1
-            stats.save()
+        cls._queue_event('impression', campaign, user_hash, page_key, user_agent, ip_address, referrer, page_url, now)
     
     @classmethod
     def record_click(
@@ -217,31 +665,39 @@ class SponsorSelector:
         page_key: str,
         user_agent: str = "",
         ip_address: str = "",
-        referrer: str = ""
+        referrer: str = "",
+        page_url: str = "",
+        now: Optional[datetime] = None
     ) -> None:
         """Record a click for tracking"""
-        now = timezone.now()
+        cls._queue_event('click', campaign, user_hash, page_key, user_agent, ip_address, referrer, page_url, now)
+    
+    @classmethod
+    def _queue_event(cls, action, campaign, user_hash, page_key, user_agent, ip_address, referrer, page_url, now=None) -> None:
+        """
+        Append the beacon to the event queue (a single insert once the
+        user agent and referrer are in the LogDimensions cache).
         
-        with transaction.atomic():
-            # Log the click
-            SponsorDeliveryLog.objects.create(
-                campaign=campaign,
-                user_hash=user_hash,
-                action='click',
-                page_key=page_key,
-                user_agent=user_agent,
-                ip_address=ip_address,
-                referrer=referrer
-            )
-            
-            # Update daily stats
-            stats, created = SponsorStatsDaily.objects.get_or_create(
-                campaign=campaign,
-                date=now.date(),
-                defaults={'impressions': 0, 'clicks': 0}
-            )
-            stats.clicks += 1
-            stats.save()
+        The delivery log and daily stats are written in batches by
+        process_sponsor_events; the cached daily counter is bumped right away
+        so caps apply before the queue is drained.
+        """
+        SponsorImpressionEvent.objects.create(
+            campaign_id=campaign.id,
+            action=action,
+            user_hash=user_hash,
+            page_key=page_key[:500],
+            page_url=(page_url or '')[:200],
+            user_agent_id=LogDimensions.user_agent_id(user_agent),
+            ip_address=ip_address or None,
+            referrer_id=LogDimensions.referrer_id((referrer or '')[:200])
+        )
+        if now is None:
+            now = timezone.now()
+        if action == 'impression':
+            SponsorFatigueStore.record(user_hash, campaign.id, now)
+        field = 'impressions' if action == 'impression' else 'clicks'
+        SponsorDailyCounters.increment(campaign.id, now.date(), field)
     
     @classmethod
     def get_user_hash(cls, request) -> str:
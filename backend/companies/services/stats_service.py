@@ -0,0 +1,154 @@
+from collections import Counter
+from typing import Optional, Dict, Any
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+
+class DirectoryStats:
+    """
+    Public directory totals served from DirectoryCounter rows.
+
+    Company saves and deletes apply their contribution deltas inside the
+    writing transaction, so concurrent admin edits never lose an increment.
+    The assembled stats dict is cached under one key that is dropped on commit.
+    """
+
+    CACHE_KEY = 'companies:directory:stats'
+    CACHE_TIMEOUT = 300
+    COUNTRY_PREFIX = 'country:'
+
+    # Response field -> counter key
+    FIELDS = {
+        'total_companies': 'total',
+        'active_companies': 'active',
+        'engineering_positions': 'engineering',
+        'countries_count': 'countries',
+    }
+
+    @staticmethod
+    def state(company) -> Dict[str, Any]:
+        """Return the company fields the counters depend on."""
+        return {
+            'status': company.status,
+            'engineering_positions': company.engineering_positions,
+            'country': company.country,
+        }
+
+    @classmethod
+    def contributions(cls, state: Optional[Dict[str, Any]]) -> Counter:
+        """Counter increments one company in ``state`` accounts for."""
+        if state is None:
+            return Counter()
+        return Counter({
+            'total': 1,
+            'active': int(state['status'] == 'Active'),
+            'engineering': int(bool(state['engineering_positions'])),
+            f"{cls.COUNTRY_PREFIX}{state['country']}": 1,
+        })
+
+    @classmethod
+    def record_change(cls, before: Optional[Dict[str, Any]], after: Optional[Dict[str, Any]]) -> None:
+        """Apply the difference between two company states (None = no row)."""
+        delta = cls.contributions(after)
+        delta.subtract(cls.contributions(before))
+        cls.adjust(delta)
+
+    @classmethod
+    def adjust(cls, delta: Dict[str, int]) -> None:
+        """Add ``delta`` to the counters and maintain the distinct country count."""
+        # Import here to avoid circular imports
+        from ..models import DirectoryCounter
+
+        delta = Counter({key: value for key, value in delta.items() if value})
+        if not delta:
+            return
+
+        with transaction.atomic():
+            # Lock country rows in key order so concurrent writers cannot deadlock
+            for key in sorted(k for k in delta if k.startswith(cls.COUNTRY_PREFIX)):
+                counter, _ = DirectoryCounter.objects.select_for_update().get_or_create(key=key)
+                previous = counter.value
+                current = previous + delta.pop(key)
+                DirectoryCounter.objects.filter(pk=counter.pk).update(value=current)
+                if previous <= 0 < current:
+                    delta['countries'] += 1
+                elif current <= 0 < previous:
+                    delta['countries'] -= 1
+
+            for key, value in delta.items():
+                if value:
+                    cls._increment(key, value)
+
+        transaction.on_commit(lambda: cache.delete(cls.CACHE_KEY))
+
+    @staticmethod
+    def _increment(key: str, value: int) -> None:
+        from ..models import DirectoryCounter
+
+        if not DirectoryCounter.objects.filter(key=key).update(value=F('value') + value):
+            DirectoryCounter.objects.get_or_create(key=key)
+            DirectoryCounter.objects.filter(key=key).update(value=F('value') + value)
+
+    @classmethod
+    def get(cls) -> Dict[str, int]:
+        """Return the stats payload; one cache read on the hot path."""
+        from ..models import DirectoryCounter
+
+        stats = cache.get(cls.CACHE_KEY)
+        if stats is not None:
+            return stats
+
+        values = dict(
+            DirectoryCounter.objects.filter(key__in=cls.FIELDS.values()).values_list('key', 'value')
+        )
+        if not values:
+            # Counters were never seeded
+            return cls.reconcile()
+        stats = {field: values.get(key, 0) for field, key in cls.FIELDS.items()}
+        cache.set(cls.CACHE_KEY, stats, cls.CACHE_TIMEOUT)
+        return stats
+
+    @classmethod
+    def compute(cls) -> Dict[str, int]:
+        """Count every counter key from the companies table."""
+        from ..models import Company
+
+        totals = Company.objects.aggregate(
+            total=Count('id'),
+            active=Count('id', filter=Q(status='Active')),
+            engineering=Count('id', filter=Q(engineering_positions=True)),
+        )
+        countries = Company.objects.values_list('country').annotate(count=Count('id')).order_by()
+        for country, count in countries:
+            totals[f'{cls.COUNTRY_PREFIX}{country}'] = count
+        totals['countries'] = len(countries)
+        return totals
+
+    @classmethod
+    def reconcile(cls) -> Dict[str, int]:
+        """Overwrite the counters with freshly computed values; returns the stats."""
+        from ..models import DirectoryCounter
+
+        with transaction.atomic():
+            expected = cls.compute()
+            existing = {
+                counter.key: counter
+                for counter in DirectoryCounter.objects.select_for_update()
+            }
+            stale = [key for key in existing if key not in expected]
+            DirectoryCounter.objects.filter(key__in=stale).delete()
+
+            changed = []
+            for key, value in expected.items():
+                counter = existing.get(key)
+                if counter is None:
+                    changed.append(DirectoryCounter(key=key, value=value))
+                elif counter.value != value:
+                    counter.value = value
+                    counter.save(update_fields=['value', 'updated_at'])
+            DirectoryCounter.objects.bulk_create(changed)
+
+        cache.delete(cls.CACHE_KEY)
+        return {field: expected.get(key, 0) for field, key in cls.FIELDS.items()}
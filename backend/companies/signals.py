@@ -0,0 +1,146 @@
+"""
+Signal handlers keeping derived data in sync with Company and Function rows:
+the stored list cards, the search index, the in-memory directory and the
+directory stats counters. Campaign writes refresh the sponsor campaign table,
+and daily campaign statistics keep their weekly and monthly rollups current.
+"""
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CampaignStatistics, Company, Function, SponsorCampaign
+from .services.directory_service import CompanyDirectory
+from .services.rollup_service import StatisticsRollups
+from .services.search_service import get_search_backend
+from .services.sponsor_service import SponsorCampaignTable
+from .services.stats_service import DirectoryStats
+
+
+@receiver(post_save, sender=Company)
+def refresh_company_on_save(sender, instance, **kwargs):
+    """Rebuild the card and search row in the same transaction as the save."""
+    instance.refresh_card()
+    get_search_backend().index_companies([instance])
+    CompanyDirectory.invalidate()
+
+
+@receiver(post_delete, sender=Company)
+def refresh_company_on_delete(sender, instance, **kwargs):
+    get_search_backend().remove_companies([instance.pk])
+    CompanyDirectory.invalidate()
+
+
+@receiver(pre_save, sender=Company)
+def remember_company_stats_state(sender, instance, raw=False, **kwargs):
+    """
+    Capture the stored row so post_save can apply only the difference.
+
+    The row stays locked until Company.save's transaction commits, so an
+    overlapping edit waits and diffs against this save's result instead of
+    applying the same delta again.
+    """
+    previous = None
+    if instance.pk and not raw:
+        previous = Company.objects.select_for_update().filter(pk=instance.pk).values(
+            'status', 'engineering_positions', 'country'
+        ).first()
+    instance._stats_previous_state = previous
+
+
+@receiver(post_save, sender=Company)
+def update_stats_on_save(sender, instance, **kwargs):
+    DirectoryStats.record_change(
+        getattr(instance, '_stats_previous_state', None),
+        DirectoryStats.state(instance)
+    )
+
+
+@receiver(post_delete, sender=Company)
+def update_stats_on_delete(sender, instance, **kwargs):
+    DirectoryStats.record_change(DirectoryStats.state(instance), None)
+
+
+@receiver(m2m_changed, sender=Company.functions.through)
+def refresh_companies_on_functions_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Function tags were added to or removed from companies.
+
+    Tags are part of the card and the search document. updated_at is touched
+    so the incremental directory refresh picks the companies up.
+    """
+    if reverse and action == 'pre_clear':
+        # function.companies.clear() does not report which companies changed
+        instance._affected_company_ids = list(instance.companies.values_list('id', flat=True))
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        company_ids = [instance.pk]
+    elif action == 'post_clear':
+        company_ids = getattr(instance, '_affected_company_ids', [])
+    else:
+        company_ids = list(pk_set or [])
+    _refresh_companies(company_ids)
+
+
+@receiver(pre_delete, sender=Function)
+def remember_function_companies(sender, instance, **kwargs):
+    """Tag rows are gone by post_delete, so capture the tagged companies first."""
+    instance._affected_company_ids = list(instance.companies.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=Function)
+@receiver(post_delete, sender=Function)
+def refresh_companies_on_function_change(sender, instance, **kwargs):
+    """A renamed, recolored or deleted function changes every tagged company."""
+    if not kwargs.get('created'):
+        company_ids = getattr(instance, '_affected_company_ids', None)
+        if company_ids is None:
+            company_ids = list(instance.companies.values_list('id', flat=True))
+        _refresh_companies(company_ids, touch=False)
+    # The function list itself is part of the directory; force a full rebuild
+    CompanyDirectory.invalidate(full=True)
+
+
+def _refresh_companies(company_ids, touch=True):
+    if not company_ids:
+        return
+    queryset = Company.objects.filter(pk__in=company_ids)
+    if touch:
+        queryset.update(updated_at=timezone.now())
+    Company.refresh_cards(queryset)
+    get_search_backend().index_companies(queryset.prefetch_related('functions'))
+    CompanyDirectory.invalidate()
+
+
+@receiver(post_save, sender=SponsorCampaign)
+@receiver(post_delete, sender=SponsorCampaign)
+def refresh_campaign_table(sender, instance, **kwargs):
+    SponsorCampaignTable.invalidate()
+
+
+@receiver(pre_save, sender=CampaignStatistics)
+def remember_statistics_period(sender, instance, raw=False, **kwargs):
+    """Capture the stored company and date so a moved row refreshes its old period too."""
+    previous = None
+    if instance.pk and not raw:
+        previous = CampaignStatistics.objects.filter(pk=instance.pk).values_list('company_id', 'date').first()
+    instance._rollup_previous_key = previous
+
+
+@receiver(post_save, sender=CampaignStatistics)
+def refresh_rollups_on_save(sender, instance, **kwargs):
+    keys = [(instance.company_id, instance.date)]
+    previous = getattr(instance, '_rollup_previous_key', None)
+    if previous:
+        keys.append(previous)
+    StatisticsRollups.refresh(keys)
+
+
+@receiver(post_delete, sender=CampaignStatistics)
+def refresh_rollups_on_delete(sender, instance, origin=None, **kwargs):
+    # Deleting the company cascades to its rollups as well
+    if isinstance(origin, Company):
+        return
+    StatisticsRollups.refresh([(instance.company_id, instance.date)])
@@ -0,0 +1,1059 @@
+import csv
+import gzip
+import io
+import json
+import random
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import DatabaseError, OperationalError, connection
+from django.db.models import Avg, Sum
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from .filters import CompanyFilter
+from .models import (
+    CampaignReachSketch, CampaignStatistics, Company, CompanyReachSketch, Function, SponsorCampaign,
+    SponsorImpressionEvent, SponsorStatsDaily
+)
+from .services.counter_service import AtomicCounter, CounterBuffer
+from .services.directory_service import CompanyDirectory
+from .services.export_service import StatisticsExport
+from .services.reach_service import HyperLogLog, ReachSketches
+from .services.rollup_service import StatisticsRollups
+from .services.search_service import get_search_backend
+from .services.sponsor_service import (
+    AliasTable, SponsorCampaignTable, SponsorDailyCounters, SponsorPacer, SponsorSelector
+)
+
+
+def make_company(name, **fields):
+    fields = {
+        'jobs_page_url': 'https://example.com/jobs', 'country': 'USA',
+        'work_environment': 'Remote', **fields,
+    }
+    return Company.objects.create(name=name, **fields)
+
+
+class AtomicCounterConcurrencyTests(TransactionTestCase):
+    """Concurrent AtomicCounter increments must never lose an update."""
+
+    THREADS = 8
+    INCREMENTS = 400  # Per counter, across all threads
+
+    def setUp(self):
+        now = timezone.now()
+        self.today = now.date()
+        self.company = Company.objects.create(
+            name='Counter check', jobs_page_url='https://example.com/jobs',
+            country='Nowhere', work_environment='Remote', status='Inactive',
+        )
+        self.campaign = SponsorCampaign.objects.create(
+            company=self.company, name='Counter check', status='draft',
+            start_at=now, end_at=now + timedelta(days=1), daily_impression_cap=1,
+        )
+
+    def run_concurrently(self, *increments):
+        """Call each of ``increments`` INCREMENTS times, spread over THREADS threads."""
+        def work(count):
+            try:
+                for _ in range(count):
+                    for increment in increments:
+                        # Retried one statement at a time, so none is applied twice
+                        while True:
+                            try:
+                                increment()
+                                break
+                            except OperationalError:
+                                # SQLite allows one writer at a time; retry when the database is busy
+                                time.sleep(0.001)
+            finally:
+                connection.close()
+
+        shares = [
+            self.INCREMENTS // self.THREADS + (1 if i < self.INCREMENTS % self.THREADS else 0)
+            for i in range(self.THREADS)
+        ]
+        with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+            list(executor.map(work, shares))
+
+    def test_increment(self):
+        self.run_concurrently(
+            lambda: AtomicCounter.increment(
+                SponsorStatsDaily, {'campaign': self.campaign, 'date': self.today}, impressions=1
+            ),
+            lambda: AtomicCounter.increment(
+                CampaignStatistics, {'company': self.company, 'date': self.today}, page_views=1
+            ),
+        )
+
+        self.assertEqual(
+            SponsorStatsDaily.objects.get(campaign=self.campaign, date=self.today).impressions, self.INCREMENTS
+        )
+        self.assertEqual(
+            CampaignStatistics.objects.get(company=self.company, date=self.today).page_views, self.INCREMENTS
+        )
+
+    def test_increment_many(self):
+        yesterday = self.today - timedelta(days=1)
+
+        def increment():
+            AtomicCounter.increment_many(CampaignStatistics, [
+                ({'company_id': self.company.pk, 'date': self.today}, {'page_views': 1}),
+                ({'company_id': self.company.pk, 'date': self.today}, {'job_page_clicks': 2}),
+                ({'company_id': self.company.pk, 'date': yesterday}, {'page_views': 3}),
+            ])
+
+        self.run_concurrently(increment)
+
+        today_row = CampaignStatistics.objects.get(company=self.company, date=self.today)
+        self.assertEqual(today_row.page_views, self.INCREMENTS)
+        self.assertEqual(today_row.job_page_clicks, 2 * self.INCREMENTS)
+        self.assertEqual(
+            CampaignStatistics.objects.get(company=self.company, date=yesterday).page_views, 3 * self.INCREMENTS
+        )
+
+
+@override_settings(COUNTER_BUFFER_FLUSH_SECONDS=60, COUNTER_BUFFER_MAX_EVENTS=1000, COUNTER_BUFFER_MAX_ATTEMPTS=3)
+class CounterBufferTests(TransactionTestCase):
+    """CounterBuffer merges increments in memory and writes them on flush."""
+
+    def setUp(self):
+        self.reset_buffers()
+        # A flusher that looks alive, so no thread flushes behind the test's back
+        CounterBuffer._flusher = mock.Mock(**{'is_alive.return_value': True})
+        self.addCleanup(self.reset_buffers)
+        self.today = timezone.now().date()
+        self.first = make_company('First')
+        self.second = make_company('Second')
+
+    @staticmethod
+    def reset_buffers():
+        CounterBuffer._after_fork()
+        ReachSketches._after_fork()
+        ReachSketches._mirrors.clear()
+
+    def add(self, company, **increments):
+        CounterBuffer.add(CampaignStatistics, {'company_id': company.pk, 'date': self.today}, **increments)
+
+    def row(self, company):
+        return CampaignStatistics.objects.filter(company=company, date=self.today).first()
+
+    def test_add_merges_until_flush(self):
+        self.add(self.first, page_views=1)
+        self.add(self.first, page_views=2, job_page_clicks=1)
+        self.add(self.second, job_page_clicks=1)
+
+        self.assertIsNone(self.row(self.first))
+        self.assertEqual(CounterBuffer.stats()['pending_rows'], 2)
+        self.assertEqual(CounterBuffer.stats()['pending_events'], 5)
+
+        self.assertEqual(CounterBuffer.flush(), 5)
+        self.assertEqual((self.row(self.first).page_views, self.row(self.first).job_page_clicks), (3, 1))
+        self.assertEqual(self.row(self.second).job_page_clicks, 1)
+
+        self.add(self.first, page_views=1)
+        CounterBuffer.flush()
+        self.assertEqual(self.row(self.first).page_views, 4)
+
+        stats = CounterBuffer.stats()
+        self.assertEqual(
+            {field: stats[field] for field in ('pending_events', 'pending_rows', 'buffered', 'flushed', 'flushes')},
+            {'pending_events': 0, 'pending_rows': 0, 'buffered': 6, 'flushed': 6, 'flushes': 2}
+        )
+        self.assertEqual(CounterBuffer.flush(), 0)
+
+    @override_settings(COUNTER_BUFFER_MAX_EVENTS=3)
+    def test_full_buffer_wakes_the_flusher(self):
+        self.add(self.first, page_views=2)
+        self.assertFalse(CounterBuffer._wake.is_set())
+        self.add(self.second, page_views=1)
+        self.assertTrue(CounterBuffer._wake.is_set())
+
+    @override_settings(COUNTER_BUFFER_FLUSH_SECONDS=0)
+    def test_zero_interval_writes_through(self):
+        self.add(self.first, page_views=1)
+        self.assertEqual(self.row(self.first).page_views, 1)
+        self.assertEqual(CounterBuffer.stats()['pending_events'], 0)
+
+    def test_rows_of_deleted_companies_are_dropped(self):
+        ReachSketches.add_companies_users([self.first.pk, self.second.pk], self.today, ['visitor'])
+        self.add(self.first, page_views=1)
+        self.add(self.second, page_views=2)
+        self.first.delete()
+
+        with self.assertLogs('companies.services', 'WARNING'):
+            self.assertEqual(CounterBuffer.flush(), 2)
+        self.assertEqual(self.row(self.second).page_views, 2)
+        self.assertEqual(self.row(self.second).unique_visitors, 1)
+        self.assertTrue(CompanyReachSketch.objects.filter(company=self.second, date=self.today).exists())
+
+        stats = CounterBuffer.stats()
+        self.assertEqual((stats['dropped'], stats['failed_flushes'], stats['pending_rows']), (1, 0, 0))
+        self.assertEqual(ReachSketches._pending, {})
+
+    def test_failing_row_is_isolated_then_dropped(self):
+        increment_many = AtomicCounter.increment_many
+
+        def fail_first(model, rows, *args, **kwargs):
+            if any(lookup['company_id'] == self.first.pk for lookup, _ in rows):
+                raise DatabaseError('simulated')
+            return increment_many(model, rows, *args, **kwargs)
+
+        self.add(self.first, page_views=1)
+        self.add(self.second, page_views=2)
+        with mock.patch.object(AtomicCounter, 'increment_many', side_effect=fail_first), \
+                self.assertLogs('companies.services.counter_service', 'ERROR'):
+            # Both rows fail together, then are retried one at a time
+            self.assertEqual(CounterBuffer.flush(), 0)
+            self.assertEqual(CounterBuffer.stats()['pending_events'], 3)
+            self.assertEqual(CounterBuffer.flush(), 2)
+            self.assertEqual(self.row(self.second).page_views, 2)
+            self.assertEqual(CounterBuffer.stats()['pending_events'], 1)
+            # Out of attempts
+            self.assertEqual(CounterBuffer.flush(), 0)
+
+        stats = CounterBuffer.stats()
+        self.assertEqual(
+            {field: stats[field] for field in ('pending_events', 'flushed', 'dropped', 'failed_flushes')},
+            {'pending_events': 0, 'flushed': 2, 'dropped': 1, 'failed_flushes': 3}
+        )
+        self.assertIsNone(self.row(self.first))
+        self.assertEqual(CounterBuffer.flush(), 0)
+
+
+class DirectoryTestCase(TestCase):
+    """A small directory, read through a fresh CompanyDirectory snapshot."""
+
+    @classmethod
+    def setUpTestData(cls):
+        engineering = Function.objects.create(name='Engineering')
+        design = Function.objects.create(name='Design')
+        data = Function.objects.create(name='Data Engineering')
+        rows = [
+            ('Acme', 'USA', 'California', 'San Francisco', 'Remote, Hybrid', 'Active', [engineering]),
+            ('Borealis', 'Canada', 'Ontario', 'Toronto', 'On-Site', 'Active', [design]),
+            ('Cobalt', 'USA', 'New York', 'New York', 'Hybrid', 'Inactive', [engineering, data]),
+            ('Dune', 'usa', 'california', 'Santa Clara', 'Remote', 'Active', []),
+            ('Ember', 'Germany', '', 'Berlin', 'On-Site', 'Active', [data]),
+            ('Fjord', 'Norway', None, None, 'Remote', 'Active', [design, engineering]),
+        ]
+        for position, (name, country, state, city, work_environment, status, functions) in enumerate(rows):
+            company = make_company(
+                name, country=country, state=state, city=city, work_environment=work_environment,
+                status=status, is_sponsored=position == 2, sponsor_order=position,
+            )
+            company.functions.set(functions)
+
+    def setUp(self):
+        cache.clear()
+        CompanyDirectory._snapshot = None
+        CompanyDirectory._shuffle_keys.clear()
+        self.addCleanup(cache.clear)
+
+    @staticmethod
+    def names(entries):
+        return [entry['name'] for entry in entries]
+
+
+class CompanyDirectoryTests(DirectoryTestCase):
+    """The in-memory directory answers like the CompanyViewSet queryset would."""
+
+    FILTERS = [
+        {},
+        {'name': 'o'},
+        {'country': 'usa'},
+        {'country': 'USA', 'state': 'CALIFORNIA'},
+        {'city': 'san'},
+        {'functions': 'engineering'},
+        {'functions': 'data', 'country': 'germany'},
+        {'work_environment': 'remote'},
+        {'status': 'inactive'},
+        {'state': 'ontario', 'work_environment': 'site'},
+        {'country': 'France'},
+    ]
+
+    def test_filters_match_company_filter(self):
+        ordering = CompanyDirectory.DEFAULT_ORDERING
+        for params in self.FILTERS:
+            with self.subTest(params=params):
+                expected = CompanyFilter(params, queryset=Company.objects.all()).qs.distinct().order_by(*ordering)
+                self.assertEqual(self.names(CompanyDirectory.query(params)), [c.name for c in expected])
+
+    def test_ordering_matches_the_database(self):
+        for ordering in ('name', '-name', 'country', '-created_at,name', 'sponsor_order', 'bogus'):
+            with self.subTest(ordering=ordering):
+                fields = CompanyDirectory.ordering_fields(ordering) + CompanyDirectory.DEFAULT_ORDERING
+                expected = Company.objects.order_by(*fields)
+                self.assertEqual(
+                    self.names(CompanyDirectory.query({'ordering': ordering})), [c.name for c in expected]
+                )
+
+    def test_sponsored_split(self):
+        self.assertEqual(self.names(CompanyDirectory.query({}, is_sponsored=True)), ['Cobalt'])
+        self.assertNotIn('Cobalt', self.names(CompanyDirectory.query({}, is_sponsored=False)))
+
+    def test_writes_refresh_the_snapshot(self):
+        snapshot = CompanyDirectory.get_snapshot()
+        self.assertIs(CompanyDirectory.get_snapshot(), snapshot)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_company('Glacier', country='Iceland', sponsor_order=9)
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.get(name='Acme').delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            borealis = Company.objects.get(name='Borealis')
+            borealis.country = 'Iceland'
+            borealis.save()
+
+        self.assertIsNot(CompanyDirectory.get_snapshot(), snapshot)
+        self.assertEqual(self.names(CompanyDirectory.query({'country': 'iceland'})), ['Borealis', 'Glacier'])
+        self.assertNotIn('Acme', self.names(CompanyDirectory.query({})))
+
+    def test_function_rename_rebuilds_cards(self):
+        CompanyDirectory.get_snapshot()
+        with self.captureOnCommitCallbacks(execute=True):
+            design = Function.objects.get(name='Design')
+            design.name = 'Product Design'
+            design.save()
+
+        self.assertEqual(self.names(CompanyDirectory.query({'functions': 'product'})), ['Borealis', 'Fjord'])
+        card = CompanyDirectory.get_snapshot().by_id[Company.objects.get(name='Borealis').pk]['card']
+        self.assertIn('Product Design', json.dumps(card))
+
+
+class DirectoryFacetTests(DirectoryTestCase):
+    """Facet counts agree with counting the CompanyFilter results."""
+
+    def expected_facets(self, params):
+        counts = {facet: Counter() for facet in ('countries', 'states', 'cities', 'functions', 'work_environments')}
+        for company in CompanyFilter(params, queryset=Company.objects.all()).qs.distinct():
+            counts['countries'].update([company.country] if company.country else [])
+            counts['states'].update([company.state] if company.state else [])
+            counts['cities'].update([company.city] if company.city else [])
+            counts['functions'].update(function.name for function in company.functions.all())
+            counts['work_environments'].update(w for w in company.get_work_environment_list() if w)
+        return {
+            facet: [{'value': value, 'count': count} for value, count in sorted(counter.items())]
+            for facet, counter in counts.items()
+        }
+
+    def test_counts_match_filtered_results(self):
+        for params in CompanyDirectoryTests.FILTERS:
+            with self.subTest(params=params):
+                self.assertEqual(CompanyDirectory.facets(params), self.expected_facets(params))
+
+    def test_counts_follow_incremental_updates(self):
+        CompanyDirectory.facets({})
+        with self.captureOnCommitCallbacks(execute=True):
+            acme = Company.objects.get(name='Acme')
+            acme.country = 'Canada'
+            acme.work_environment = 'On-Site'
+            acme.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            Company.objects.get(name='Ember').delete()
+
+        for params in ({}, {'country': 'canada'}, {'functions': 'data'}):
+            with self.subTest(params=params):
+                self.assertEqual(CompanyDirectory.facets(params), self.expected_facets(params))
+
+    def test_filters_endpoint(self):
+        response = self.client.get('/api/companies/filters/', {'country': 'USA'})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        # Options cover the whole directory; facets the applied filters
+        self.assertEqual(data['countries'], ['Canada', 'Germany', 'Norway', 'USA', 'usa'])
+        self.assertEqual(
+            [function['name'] for function in data['functions']], ['Data Engineering', 'Design', 'Engineering']
+        )
+        self.assertEqual(data['facets'], self.expected_facets({'country': 'USA'}))
+
+
+class CompanyCursorPaginationTests(DirectoryTestCase):
+    """Keyset cursors walk the organic list once, in order, across writes."""
+
+    def organic_names(self, **params):
+        return self.names(CompanyDirectory.query(params, is_sponsored=False))
+
+    def walk(self, link, direction='next'):
+        pages = []
+        while link:
+            response = self.client.get(link)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            pages.append([card['name'] for card in data['results']])
+            link = data[direction]
+        return pages
+
+    def test_pages_cover_the_list_in_order(self):
+        for ordering in ('', 'name', '-created_at', 'country'):
+            with self.subTest(ordering=ordering):
+                pages = self.walk(f'/api/companies/?pagination=cursor&page_size=2&ordering={ordering}')
+                self.assertEqual(len(pages), 3)
+                self.assertEqual(sum(pages, []), self.organic_names(ordering=ordering))
+
+    def test_previous_links_walk_back(self):
+        response = self.client.get('/api/companies/?pagination=cursor&page_size=2&ordering=name')
+        last = self.client.get(self.client.get(response.json()['next']).json()['next']).json()
+        pages = self.walk(last['previous'], direction='previous')
+        self.assertEqual(sum(reversed(pages), []), self.organic_names(ordering='name')[:4])
+
+    def test_writes_between_pages_do_not_repeat_or_skip(self):
+        first = self.client.get('/api/companies/?pagination=cursor&page_size=2&ordering=name').json()
+        self.assertEqual([card['name'] for card in first['results']], ['Acme', 'Borealis'])
+        with self.captureOnCommitCallbacks(execute=True):
+            make_company('Aardvark')
+            make_company('Delta')
+
+        rest = sum(self.walk(first['next']), [])
+        self.assertEqual(rest, ['Delta', 'Dune', 'Ember', 'Fjord'])
+
+    def test_seeded_shuffle_is_stable_across_pages(self):
+        first = self.client.get('/api/companies/?pagination=cursor&page_size=2&ordering=?&seed=7').json()
+        self.assertEqual(first['seed'], 7)
+        self.assertIn('seed=7', first['next'])
+        pages = [[card['name'] for card in first['results']]] + self.walk(first['next'])
+        shuffled = sum(pages, [])
+        self.assertCountEqual(shuffled, self.organic_names())
+        self.assertEqual(self.names(CompanyDirectory.query({'ordering': '?'}, is_sponsored=False, seed=7)), shuffled)
+
+        # Keys depend on (seed, id) only, so a new company leaves the others' order alone
+        with self.captureOnCommitCallbacks(execute=True):
+            make_company('Glacier')
+        reshuffled = self.names(CompanyDirectory.query({'ordering': '?'}, is_sponsored=False, seed=7))
+        self.assertEqual([name for name in reshuffled if name != 'Glacier'], shuffled)
+
+    def test_other_seeds_shuffle_differently(self):
+        orders = {
+            tuple(self.names(CompanyDirectory.query({'ordering': '?'}, seed=seed)))
+            for seed in range(20)
+        }
+        self.assertGreater(len(orders), 1)
+
+    def test_invalid_cursors_are_rejected(self):
+        for cursor in ('not-base64!', 'WzFd', 'eyJwIjotMX0=', 'eyJrIjpbMV19', 'eyJwIjp0cnVlfQ=='):
+            with self.subTest(cursor=cursor), self.assertLogs('django.request', 'WARNING'):
+                response = self.client.get('/api/companies/', {'cursor': cursor, 'ordering': 'name'})
+                self.assertEqual(response.status_code, 404)
+
+
+class OrganicPageCacheTests(DirectoryTestCase):
+    """Organic list pages are cached per query and revalidated with ETags."""
+
+    URL = '/api/companies/?page_size=2&ordering=name'
+
+    def setUp(self):
+        super().setUp()
+        # No live campaigns unless a test picks one
+        patcher = mock.patch.object(SponsorSelector, 'pick_sponsored_campaign', return_value=None)
+        self.pick = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeat_pages_come_from_the_cache(self):
+        first = self.client.get(self.URL)
+        with mock.patch.object(CompanyDirectory, 'query', wraps=CompanyDirectory.query) as query:
+            second = self.client.get(self.URL + '&utm_source=newsletter&_=123')
+            query.assert_not_called()
+            self.client.get(self.URL + '&page=2')
+            query.assert_called_once()
+        self.assertEqual(first.content, second.content)
+        self.assertEqual([card['name'] for card in first.json()['results']], ['Acme', 'Borealis'])
+
+    def test_cached_links_drop_requester_params(self):
+        self.client.get(self.URL + '&utm_source=newsletter')
+        data = self.client.get(self.URL + '&ref=other').json()
+        self.assertNotIn('utm_source', data['next'])
+        self.assertNotIn('ref=', data['next'])
+        self.assertIn('page=2', data['next'])
+
+    def test_sponsored_slot_is_spliced_per_request(self):
+        now = timezone.now()
+        campaign = SponsorCampaign.objects.create(
+            company=Company.objects.get(name='Cobalt'), name='Spring', status='active',
+            start_at=now, end_at=now + timedelta(days=1), daily_impression_cap=100,
+        )
+        plain = self.client.get(self.URL)
+        self.pick.return_value = campaign
+        sponsored = self.client.get(self.URL)
+
+        results = sponsored.json()['results']
+        self.assertEqual((results[0]['name'], results[0]['sponsored_campaign_id']), ('Cobalt', campaign.pk))
+        self.assertEqual(results[1:], plain.json()['results'])
+        self.assertNotEqual(plain['ETag'], sponsored['ETag'])
+
+    def test_etag_revalidation(self):
+        response = self.client.get(self.URL)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'private, no-cache')
+
+        not_modified = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertEqual(not_modified.content, b'')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_company('Aardvark')
+        changed = self.client.get(self.URL, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], response['ETag'])
+        self.assertEqual(changed.json()['results'][0]['name'], 'Aardvark')
+
+
+class AliasTableTests(SimpleTestCase):
+    """Alias tables draw each index with probability proportional to its weight."""
+
+    WEIGHTS = [[1], [1, 1, 1], [1, 2, 3, 4], [0, 5, 0, 1], [0.1, 100, 3.3], [random.Random(1).random() for _ in range(50)]]
+
+    @staticmethod
+    def probabilities(table):
+        n = len(table.probability)
+        result = [0.0] * n
+        for column, (probability, alias) in enumerate(zip(table.probability, table.alias)):
+            result[column] += probability / n
+            result[alias] += (1 - probability) / n
+        return result
+
+    def test_exact_probabilities(self):
+        for weights in self.WEIGHTS:
+            with self.subTest(weights=weights):
+                total = sum(weights)
+                for actual, weight in zip(self.probabilities(AliasTable(weights)), weights):
+                    self.assertAlmostEqual(actual, weight / total, places=9)
+
+    def test_sampled_frequencies(self):
+        draws = 60000
+        table = AliasTable([1, 2, 3, 4])
+        rng = random.Random(0)
+        counts = Counter(table.draw(rng) for _ in range(draws))
+        for index, weight in enumerate([1, 2, 3, 4]):
+            self.assertAlmostEqual(counts[index] / draws, weight / 10, delta=0.01)
+
+    def test_zero_weights_are_never_drawn(self):
+        table = AliasTable([0, 5, 0, 1])
+        rng = random.Random(0)
+        self.assertEqual({table.draw(rng) for _ in range(2000)}, {1, 3})
+
+    def test_seeded_draws_repeat(self):
+        table = AliasTable([3, 1, 4, 1, 5])
+        first = [table.draw(random.Random(seed)) for seed in range(100)]
+        self.assertEqual(first, [table.draw(random.Random(seed)) for seed in range(100)])
+
+
+class SponsorTestCase(TestCase):
+    """Sponsor services with their per-process tables and the cache reset."""
+
+    def setUp(self):
+        self.reset_sponsor_state()
+        self.addCleanup(self.reset_sponsor_state)
+        self.now = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0)
+        self.company = make_company('Sponsor')
+
+    @staticmethod
+    def reset_sponsor_state():
+        cache.clear()
+        SponsorCampaignTable.discard()
+        SponsorSelector._alias_tables.clear()
+        SponsorPacer._allowances = {}
+        SponsorPacer._exhausted = set()
+        SponsorPacer._window = None
+        SponsorPacer._ticked_version = None
+
+    def make_campaign(self, name, **fields):
+        fields = {
+            'status': 'active', 'start_at': self.now - timedelta(days=1), 'end_at': self.now + timedelta(days=1),
+            'daily_impression_cap': 1000, **fields,
+        }
+        return SponsorCampaign.objects.create(company=self.company, name=name, **fields)
+
+
+class SponsorWeightedSelectionTests(SponsorTestCase):
+    """Picks follow (priority * weight) / (1 + impressions today)."""
+
+    def pick_shares(self, eligible, picks=4000):
+        counts = Counter(
+            SponsorSelector._weighted_selection(eligible, {}, f'user-{i}', 1, self.now).id
+            for i in range(picks)
+        )
+        return {campaign.id: counts[campaign.id] / picks for campaign in eligible}
+
+    def test_shares_follow_scores(self):
+        light = self.make_campaign('Light', priority=1, weight=1)
+        heavy = self.make_campaign('Heavy', priority=3, weight=1)
+        # 3 / (1 + 2) = 1 against 1 / (1 + 0)
+        delivered = self.make_campaign('Delivered', priority=3, weight=1)
+        SponsorStatsDaily.objects.create(campaign=delivered, date=self.now.date(), impressions=2)
+
+        shares = self.pick_shares([light, heavy, delivered])
+        self.assertAlmostEqual(shares[light.id], 0.2, delta=0.03)
+        self.assertAlmostEqual(shares[heavy.id], 0.6, delta=0.03)
+        self.assertAlmostEqual(shares[delivered.id], 0.2, delta=0.03)
+
+    def test_alias_tables_are_shared_within_a_period(self):
+        eligible = [self.make_campaign('One'), self.make_campaign('Two')]
+        table = SponsorSelector._alias_table(eligible, self.now)
+        self.assertIs(SponsorSelector._alias_table(eligible, self.now + timedelta(seconds=1)), table)
+        later = self.now + timedelta(seconds=SponsorSelector.WEIGHT_PERIOD_SECONDS)
+        self.assertIsNot(SponsorSelector._alias_table(eligible, later), table)
+
+    def test_same_user_and_page_get_the_same_pick(self):
+        eligible = [self.make_campaign(f'Campaign {i}') for i in range(5)]
+        picks = {
+            SponsorSelector._weighted_selection(eligible, {'country': 'USA'}, 'user', 2, self.now).id
+            for _ in range(20)
+        }
+        self.assertEqual(len(picks), 1)
+
+
+class SponsorPacerTests(SponsorTestCase):
+    """Pacing budgets cap picks per window, shared by every worker."""
+
+    def takes(self, campaign, now=None, attempts=50):
+        return sum(SponsorPacer.take(campaign, now or self.now) for _ in range(attempts))
+
+    @staticmethod
+    def new_worker():
+        # A process with the same shared cache and none of this one's state
+        SponsorPacer._allowances = {}
+        SponsorPacer._exhausted = set()
+        SponsorPacer._window = None
+        SponsorPacer._ticked_version = None
+
+    def test_even_budget_accrues_through_the_day(self):
+        campaign = self.make_campaign('Even', daily_impression_cap=960, pacing='even')
+        midnight = self.now.replace(hour=0)
+        self.assertEqual(SponsorPacer.budget(campaign, midnight), 10)
+        self.assertEqual(SponsorPacer.budget(campaign, self.now), 490)
+        self.assertEqual(SponsorPacer.budget(campaign, self.now.replace(hour=23, minute=50)), 960)
+        asap = self.make_campaign('Asap', daily_impression_cap=960, pacing='asap')
+        self.assertEqual(SponsorPacer.budget(asap, midnight), 960)
+
+    def test_takes_stop_at_the_remaining_budget(self):
+        campaign = self.make_campaign('Asap', daily_impression_cap=10, pacing='asap')
+        SponsorStatsDaily.objects.create(campaign=campaign, date=self.now.date(), impressions=4)
+
+        self.assertTrue(SponsorPacer.has_tokens(campaign, self.now))
+        self.assertEqual(self.takes(campaign), 6)
+        self.assertFalse(SponsorPacer.has_tokens(campaign, self.now))
+
+    def test_workers_share_one_budget(self):
+        campaign = self.make_campaign('Asap', daily_impression_cap=10, pacing='asap')
+        self.assertEqual(self.takes(campaign, attempts=7), 7)
+        self.new_worker()
+        self.assertEqual(self.takes(campaign), 3)
+        self.new_worker()
+        self.assertEqual(self.takes(campaign), 0)
+
+    def test_next_window_reads_the_delivered_counts(self):
+        campaign = self.make_campaign('Asap', daily_impression_cap=10, pacing='asap')
+        self.assertEqual(self.takes(campaign, attempts=3), 3)
+        SponsorDailyCounters.increment(campaign.id, self.now.date(), 'impressions', 8)
+
+        later = self.now + timedelta(seconds=SponsorPacer.TICK_SECONDS)
+        self.assertEqual(self.takes(campaign, now=later), 2)
+
+    def test_click_cap_stops_delivery(self):
+        campaign = self.make_campaign('Clicks', daily_impression_cap=10, daily_click_cap=2, pacing='asap')
+        SponsorStatsDaily.objects.create(campaign=campaign, date=self.now.date(), clicks=2)
+        self.assertFalse(SponsorPacer.has_tokens(campaign, self.now))
+        self.assertEqual(self.takes(campaign), 0)
+
+    def test_picks_never_exceed_the_cap(self):
+        capped = self.make_campaign('Capped', daily_impression_cap=3, pacing='asap')
+        other = self.make_campaign('Other', daily_impression_cap=1000, pacing='asap')
+        picks = Counter(
+            getattr(SponsorSelector.pick_sponsored_campaign({}, f'user-{i}', now=self.now), 'id', None)
+            for i in range(200)
+        )
+        self.assertEqual(picks[capped.id], 3)
+        self.assertEqual(picks[other.id], 197)
+
+
+
+class SimulateSponsorDeliveryTests(SponsorTestCase):
+    """simulate_sponsor_delivery runs on unsaved campaigns and leaves the real ones alone."""
+
+    def test_real_campaigns_are_neither_changed_nor_served(self):
+        real = self.make_campaign('Real')
+        output = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            call_command('simulate_sponsor_delivery', campaigns=3, users=40, stdout=output)
+
+        # Nothing but the rolled-back beacon rows is written, so no real row is ever locked
+        writes = [
+            query['sql'] for query in queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE')) and 'sponsorimpressionevent' not in query['sql']
+        ]
+        self.assertEqual(writes, [])
+
+        self.assertIn('Simulation complete', output.getvalue())
+        real.refresh_from_db()
+        self.assertEqual(real.status, 'active')
+        self.assertEqual(list(SponsorCampaign.objects.all()), [real])
+        self.assertEqual(list(Company.objects.all()), [self.company])
+        self.assertFalse(SponsorImpressionEvent.objects.exists())
+        today = timezone.now().date()
+        self.assertIsNone(cache.get(SponsorDailyCounters.key(real.id, today, 'impressions')))
+        self.assertIsNone(cache.get(SponsorDailyCounters.key(-1, today, 'impressions')))
+        # The table is unpinned again
+        self.assertEqual(SponsorCampaignTable.get(real.id), real)
+
+class HyperLogLogTests(SimpleTestCase):
+    """Estimates stay within a few standard errors of the true count."""
+
+    @staticmethod
+    def sketch(values):
+        sketch = HyperLogLog()
+        for value in values:
+            sketch.add(value)
+        return sketch
+
+    def test_error_bounds(self):
+        for n in (1, 10, 100, 1000, 10000, 50000):
+            with self.subTest(n=n):
+                estimate = self.sketch(f'user-{i}' for i in range(n)).count()
+                self.assertLessEqual(abs(estimate - n), max(1, 3 * HyperLogLog.RELATIVE_ERROR * n))
+
+    def test_empty_and_duplicates(self):
+        self.assertEqual(HyperLogLog().count(), 0)
+        sketch = self.sketch(['same'] * 100)
+        self.assertEqual(sketch.count(), 1)
+        self.assertFalse(sketch.add('same'))
+
+    def test_merge_counts_the_union(self):
+        first = self.sketch(f'user-{i}' for i in range(0, 6000))
+        second = self.sketch(f'user-{i}' for i in range(4000, 10000))
+        first.merge(second)
+        self.assertLessEqual(abs(first.count() - 10000), 3 * HyperLogLog.RELATIVE_ERROR * 10000)
+
+    def test_serialization_round_trip(self):
+        sketch = self.sketch(f'user-{i}' for i in range(500))
+        data = sketch.to_bytes()
+        self.assertLess(len(data), HyperLogLog.SIZE)
+        self.assertEqual(HyperLogLog.from_bytes(data).registers, sketch.registers)
+        self.assertEqual(HyperLogLog.from_bytes(None).count(), 0)
+
+
+class ReachSketchesTests(SponsorTestCase):
+    """Day sketches answer unique reach over date ranges."""
+
+    def setUp(self):
+        super().setUp()
+        ReachSketches._mirrors.clear()
+        self.addCleanup(ReachSketches._mirrors.clear)
+        self.today = self.now.date()
+        self.campaign = self.make_campaign('Reach')
+
+    def test_campaign_reach_unions_days(self):
+        yesterday = self.today - timedelta(days=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            ReachSketches.add_campaign_users(self.campaign.id, yesterday, [f'user-{i}' for i in range(300)])
+            ReachSketches.add_campaign_users(self.campaign.id, self.today, [f'user-{i}' for i in range(200, 500)])
+
+        self.assertEqual(CampaignReachSketch.objects.filter(campaign=self.campaign).count(), 2)
+        self.assertAlmostEqual(
+            ReachSketches.campaign_reach([self.campaign.id], yesterday, self.today), 500,
+            delta=3 * HyperLogLog.RELATIVE_ERROR * 500
+        )
+        self.assertAlmostEqual(
+            ReachSketches.campaign_reach([self.campaign.id], self.today, self.today), 300,
+            delta=3 * HyperLogLog.RELATIVE_ERROR * 300
+        )
+        self.assertEqual(ReachSketches.campaign_reach([self.campaign.id], self.today + timedelta(days=1),
+                                                      self.today + timedelta(days=2)), 0)
+
+    def test_repeat_users_skip_the_database(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(ReachSketches.add_campaign_users(self.campaign.id, self.today, ['a', 'b']), 2)
+        with self.assertNumQueries(0):
+            self.assertIsNone(ReachSketches.add_campaign_users(self.campaign.id, self.today, ['b', 'a']))
+
+    def test_company_visitors_include_stored_history(self):
+        days = [self.today - timedelta(days=offset) for offset in range(3)]
+        # Before the sketches: stored counts only
+        CampaignStatistics.objects.create(company=self.company, date=days[2], unique_visitors=40)
+        # Sketch started mid-day: the stored count is higher than the sketch
+        CampaignStatistics.objects.create(company=self.company, date=days[1], unique_visitors=25)
+        ReachSketches._write(CompanyReachSketch, days[1], {
+            self.company.id: [HyperLogLog.position(f'user-{i}') for i in range(10)]
+        })
+        # Fully sketched day
+        CampaignStatistics.objects.create(company=self.company, date=days[0], unique_visitors=0)
+        ReachSketches._write(CompanyReachSketch, days[0], {
+            self.company.id: [HyperLogLog.position(f'user-{i}') for i in range(100, 160)]
+        })
+
+        sketched = CompanyReachSketch.objects.get(company=self.company, date=days[0]).estimate
+        self.assertAlmostEqual(sketched, 60, delta=3)
+        self.assertEqual(ReachSketches.company_visitors([self.company.id], days[2], days[0]), 40 + 25 + sketched)
+        self.assertEqual(ReachSketches.company_visitors([self.company.id], days[0], days[0]), sketched)
+
+
+class StatisticsRollupTests(TestCase):
+    """Reports planned over rollups add up to the raw daily rows."""
+
+    START = date(2025, 1, 1)
+    DAYS = 430
+
+    @classmethod
+    def setUpTestData(cls):
+        rng = random.Random(22)
+        cls.companies = [make_company('North'), make_company('South'), make_company('Elsewhere')]
+        rows = [
+            CampaignStatistics(
+                company=company, date=cls.START + timedelta(days=offset),
+                page_views=rng.randrange(100), unique_visitors=rng.randrange(50),
+                job_page_clicks=rng.randrange(20), profile_views=rng.randrange(30),
+                application_clicks=rng.randrange(5), contact_clicks=rng.randrange(3),
+                click_through_rate=Decimal(rng.randrange(10000)) / 100,
+                engagement_rate=Decimal(rng.randrange(10000)) / 100,
+            )
+            for company in cls.companies
+            for offset in range(cls.DAYS)
+            # Gaps, so some days and periods have no rows
+            if rng.random() < 0.9
+        ]
+        CampaignStatistics.objects.bulk_create(rows)
+        StatisticsRollups.refresh((row.company_id, row.date) for row in rows)
+
+    def raw(self, company_ids, first, last):
+        rows = CampaignStatistics.objects.filter(company_id__in=company_ids, date__gte=first, date__lte=last)
+        sums = rows.aggregate(
+            **{name: Sum(name) for name in StatisticsRollups.COUNTERS},
+            **{name: Avg(name) for name in StatisticsRollups.RATES},
+        )
+        for name in StatisticsRollups.RATES:
+            if sums[name] is not None:
+                sums[name] = Decimal(sums[name]).quantize(Decimal('0.01'))
+        return sums
+
+    def assert_matches_raw(self, company_ids, first, last):
+        totals, points = StatisticsRollups.report(company_ids, first, last)
+        expected = self.raw(company_ids, first, last)
+        for name in StatisticsRollups.COUNTERS:
+            self.assertEqual(totals[f'total_{name}'], expected[name], name)
+        for name in StatisticsRollups.RATES:
+            self.assertAlmostEqual(totals[f'avg_{name}'], expected[name], delta=Decimal('0.01'), msg=name)
+        for point in points:
+            period = self.raw(company_ids, point['date'], point['period_end'])
+            for name in StatisticsRollups.COUNTERS:
+                self.assertEqual(point[name], period[name], (point['granularity'], point['date'], name))
+        return points
+
+    def test_plan_covers_the_range(self):
+        rng = random.Random(7)
+        for _ in range(300):
+            first = self.START + timedelta(days=rng.randrange(self.DAYS))
+            last = first + timedelta(days=rng.randrange(200))
+            with self.subTest(first=first, last=last):
+                segments = StatisticsRollups.plan(first, last)
+                self.assertEqual(segments[0][1], first)
+                self.assertEqual(segments[-1][2], last)
+                for (_, _, previous_last), (_, next_first, _) in zip(segments, segments[1:]):
+                    self.assertEqual(next_first, previous_last + timedelta(days=1))
+                for granularity, segment_first, segment_last in segments:
+                    # No segment crosses a month boundary
+                    self.assertEqual(segment_first.replace(day=1), segment_last.replace(day=1))
+                    if granularity != 'day':
+                        self.assertEqual(StatisticsRollups.period_start(granularity, segment_first), segment_first)
+                        self.assertEqual(
+                            StatisticsRollups.period_end(granularity, segment_first),
+                            segment_last + timedelta(days=1)
+                        )
+
+    def test_plan_prefers_coarse_periods(self):
+        self.assertEqual(StatisticsRollups.plan(date(2025, 1, 30), date(2025, 3, 16)), [
+            ('day', date(2025, 1, 30), date(2025, 1, 31)),
+            ('month', date(2025, 2, 1), date(2025, 2, 28)),
+            ('day', date(2025, 3, 1), date(2025, 3, 2)),
+            ('week', date(2025, 3, 3), date(2025, 3, 9)),
+            ('week', date(2025, 3, 10), date(2025, 3, 16)),
+        ])
+
+    def test_reports_match_raw_sums(self):
+        ids = [company.pk for company in self.companies[:2]]
+        for first, last in [
+            (self.START, self.START + timedelta(days=self.DAYS - 1)),
+            (date(2025, 1, 30), date(2025, 3, 16)),
+            (date(2025, 6, 3), date(2025, 6, 3)),
+            (date(2025, 11, 14), date(2026, 2, 27)),
+        ]:
+            with self.subTest(first=first, last=last):
+                points = self.assert_matches_raw(ids, first, last)
+                self.assertEqual(points, sorted(points, key=lambda point: point['date'], reverse=True))
+        self.assert_matches_raw([self.companies[2].pk], self.START, date(2025, 12, 31))
+
+    def test_empty_range(self):
+        totals, points = StatisticsRollups.report([self.companies[0].pk], date(2020, 1, 1), date(2020, 3, 31))
+        self.assertEqual(points, [])
+        self.assertTrue(all(value is None for value in totals.values()))
+
+    def test_saves_and_deletes_refresh_the_rollups(self):
+        company = self.companies[0]
+        row = CampaignStatistics.objects.filter(company=company, date__month=3, date__year=2025).first()
+        row.page_views += 1000
+        row.save()
+        CampaignStatistics.objects.filter(company=company, date__month=4, date__year=2025).first().delete()
+        # Moved to another month: both months change
+        moved = CampaignStatistics.objects.filter(company=company, date__month=5, date__year=2025).first()
+        moved.date = date(2020, 5, 5)
+        moved.save()
+
+        self.assert_matches_raw([company.pk], date(2025, 3, 1), date(2025, 5, 31))
+        self.assert_matches_raw([company.pk], date(2020, 5, 1), date(2020, 5, 31))
+
+
+class StatisticsExportTests(TestCase):
+    """Every export format carries the same rows, in chunks, optionally gzipped."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.start = date(2025, 3, 1)
+        cls.end = date(2025, 3, 31)
+        cls.zulu = make_company('Zulu, "Quoted"')
+        cls.alpha = make_company('Alpha')
+        CampaignStatistics.objects.bulk_create([
+            CampaignStatistics(
+                company=company, date=cls.start + timedelta(days=offset),
+                page_views=offset + 2, unique_visitors=offset // 2 + 1, job_page_clicks=offset % 3,
+                click_through_rate=Decimal('12.34'), engagement_rate=Decimal(offset + 2),
+            )
+            for company in (cls.zulu, cls.alpha)
+            # Rows outside the range are left out
+            for offset in range(-2, 33)
+        ])
+
+    def export(self, export_format, **options):
+        options = {'include_company': True, **options}
+        export = StatisticsExport([self.zulu.pk, self.alpha.pk], self.start, self.end, export_format, **options)
+        data = b''.join(export)
+        if options.get('gzip'):
+            data = gzip.decompress(data)
+        return export, data.decode('utf-8')
+
+    def expected_rows(self):
+        """(company id, name, date, page views) in export order."""
+        rows = CampaignStatistics.objects.filter(
+            company__in=[self.zulu, self.alpha], date__gte=self.start, date__lte=self.end
+        ).order_by('company__name', 'company_id', '-date')
+        return [(row.company_id, row.company.name, row.date.isoformat(), row.page_views) for row in rows]
+
+    def test_csv(self):
+        export, data = self.export('csv')
+        rows = list(csv.reader(io.StringIO(data)))
+        self.assertEqual(rows[0][:4], ['Company ID', 'Company', 'Date', 'Page Views'])
+        self.assertEqual(
+            [(int(row[0]), row[1], row[2], int(row[3])) for row in rows[1:]], self.expected_rows()
+        )
+        self.assertEqual(export.row_count, 62)
+        self.assertEqual(rows[1][-2:], ['12.34', '32.00'])
+
+    def test_ndjson(self):
+        export, data = self.export('ndjson')
+        rows = [json.loads(line) for line in data.splitlines()]
+        self.assertEqual(
+            [(row['company_id'], row['company_name'], row['date'], row['page_views']) for row in rows],
+            self.expected_rows()
+        )
+        self.assertEqual((rows[0]['click_through_rate'], rows[0]['engagement_rate']), (12.34, 32.0))
+
+    def test_columnar(self):
+        with mock.patch.object(StatisticsExport, 'CHUNK_SIZE', 25):
+            export, data = self.export('columnar')
+        schema, *batches = [json.loads(line) for line in data.splitlines()]
+        self.assertEqual(schema['schema'][:3], [
+            {'name': 'company_id', 'type': 'int'},
+            {'name': 'company_name', 'type': 'string'},
+            {'name': 'date', 'type': 'date'},
+        ])
+        self.assertEqual([batch['num_rows'] for batch in batches], [25, 25, 12])
+        columns = {
+            name: sum((batch['columns'][name] for batch in batches), [])
+            for name in ('company_id', 'company_name', 'date', 'page_views')
+        }
+        self.assertEqual(
+            list(zip(columns['company_id'], columns['company_name'], columns['date'], columns['page_views'])),
+            self.expected_rows()
+        )
+
+    def test_gzip_wraps_every_format(self):
+        for export_format in StatisticsExport.FORMATS:
+            with self.subTest(export_format=export_format):
+                _, plain = self.export(export_format)
+                export, unzipped = self.export(export_format, gzip=True)
+                self.assertEqual(unzipped, plain)
+                self.assertEqual(export.content_type, 'application/gzip')
+                self.assertTrue(export.filename('stats').endswith('.gz'))
+
+    def test_single_company_columns_and_names(self):
+        export = StatisticsExport([self.alpha.pk], self.start, self.end, 'ndjson')
+        rows = [json.loads(line) for line in b''.join(export).decode('utf-8').splitlines()]
+        self.assertNotIn('company_id', rows[0])
+        self.assertEqual(rows[0]['date'], '2025-03-31')
+        self.assertEqual(export.content_type, 'application/x-ndjson')
+        self.assertEqual(export.filename('stats'), 'stats.ndjson')
+        self.assertEqual(StatisticsExport([], self.start, self.end, 'columnar').filename('s'), 's.columns.ndjson')
+        with self.assertRaises(ValueError):
+            StatisticsExport([self.alpha.pk], self.start, self.end, 'xml')
+
+    def test_empty_export(self):
+        export = StatisticsExport([self.alpha.pk], date(2020, 1, 1), date(2020, 1, 2), 'csv')
+        self.assertEqual(b''.join(export).decode('utf-8').splitlines()[0].split(',')[0], 'Date')
+        self.assertEqual(export.row_count, 0)
+
+
+class BulkImportTests(TestCase):
+    """import_companies --bulk writes cards and search rows without reading the companies back."""
+
+    HEADER = ['Company Name', 'Logo', 'Jobs Page URL', 'Company Reviews', 'Country', 'State', 'City',
+              'WorkEnvironment', 'Function', 'EngineeringPositions', 'Status']
+
+    def import_rows(self, rows):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(self.HEADER)
+            writer.writerows(rows)
+            file.flush()
+            call_command('import_companies', file.name, '--bulk', stdout=io.StringIO())
+
+    def test_cards_and_search_match_the_stored_companies(self):
+        engineering = Function.objects.create(name='Engineering', color='#000000')
+        acme = make_company('Acme', city='Old Town', is_sponsored=True, sponsor_order=3)
+        acme.functions.set([engineering])
+        borealis = make_company('Borealis', city='Toronto', country='Canada', functions_text='Zoology, Engineering')
+        borealis.functions.set([engineering])
+        Company.objects.filter(pk=borealis.pk).update(updated_at=timezone.now() - timedelta(days=1))
+
+        self.import_rows([
+            ['Acme', 'company_logos/acme.png', 'https://example.com/jobs', '', 'USA', '', 'Boston',
+             'Remote', 'Engineering, Design', 'checked', 'Active'],
+            # Only the function links change
+            ['Borealis', '', 'https://example.com/jobs', '', 'Canada', '', 'Toronto',
+             'Remote', 'Zoology, Engineering', '', 'Active'],
+            ['Cobalt', '', 'https://example.com/cobalt', '', 'Norway', '', 'Oslo', 'Hybrid', '', '', 'Active'],
+        ])
+
+        companies = {company.name: company for company in Company.objects.prefetch_related('functions')}
+        self.assertEqual(set(companies), {'Acme', 'Borealis', 'Cobalt'})
+        for company in companies.values():
+            with self.subTest(company=company.name):
+                self.assertEqual(company.card_json, company.render_card())
+
+        card = json.loads(companies['Acme'].card_json)
+        self.assertEqual((card['is_sponsored'], card['sponsor_order'], card['city']), (True, 3, 'Boston'))
+        self.assertEqual(card['logo'], '/media/company_logos/acme.png')
+        self.assertEqual([function['name'] for function in card['functions']], ['Design', 'Engineering'])
+        self.assertEqual(card['functions'][1]['color'], '#000000')
+        self.assertEqual(json.loads(companies['Cobalt'].card_json)['functions'], [])
+        self.assertGreater(companies['Borealis'].updated_at, timezone.now() - timedelta(hours=1))
+
+        backend = get_search_backend()
+        self.assertEqual(backend.search('Zoology'), [companies['Borealis'].pk])
+        self.assertEqual(backend.search('Boston'), [companies['Acme'].pk])
+        self.assertEqual(backend.search('Oslo'), [companies['Cobalt'].pk])
@@ -1,12 +1,25 @@
+import base64
+import bisect
+import hashlib
+import json
+from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action, api_view, permission_classes as perm_classes_decorator
-from rest_framework.pagination import PageNumberPagination
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.renderers import JSONRenderer
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.utils.urls import replace_query_param
+from django.core.cache import cache
 from django.db.models import Q, Count
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from django.utils import timezone
-from .models import Company, Function, WorkEnvironment, AdSlot, SiteSettings, FormLayout, SponsorCampaign, HowItWorksSection, RecruiterSection, CampaignStatistics, StaticPage
+from .models import Company, Function, WorkEnvironment, AdSlot, SiteSettings, FormLayout, HowItWorksSection, RecruiterSection, CampaignStatistics, StaticPage
 from .serializers import (
     CompanySerializer,
     CompanyListSerializer,
@@ -18,7 +31,11 @@ from .serializers import (
     StaticPageNavSerializer
 )
 from .filters import CompanyFilter
-from .services.sponsor_service import SponsorSelector
+from .services.sponsor_service import SponsorSelector, SponsorCampaignTable
+from .services.directory_service import CompanyDirectory, KeysetKey
+from .services.counter_service import CounterBuffer
+from .services.reach_service import ReachSketches
+from .services.stats_service import DirectoryStats
 
 
 class CompanyPagination(PageNumberPagination):
@@ -28,6 +45,129 @@ class CompanyPagination(PageNumberPagination):
     max_page_size = 100
 
 
+class CompanyCursorPagination(BasePagination):
+    """
+    Keyset pagination over in-memory directory results.
+
+    The cursor carries the sort key of the boundary row, so pages stay stable
+    when companies are added or removed between requests and deep pages cost
+    the same as the first one. Relevance-ordered search results have no
+    stable key and fall back to a position cursor.
+    """
+    cursor_query_param = 'cursor'
+    page_size = 30
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    datetime_fields = {'created_at', 'updated_at'}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.count = len(queryset)
+        page_size = self.get_page_size(request)
+        self.seed = getattr(view, 'shuffle_seed', None)
+        self.fields = CompanyDirectory.keyset_fields(
+            request.query_params.get('ordering', ''),
+            searched=bool(request.query_params.get('search')),
+        )
+
+        cursor = self.decode_cursor(request)
+        if cursor is None:
+            start = 0
+        elif self.fields is None or 'k' not in cursor:
+            start = max(0, cursor.get('p', 0) - (page_size if cursor.get('r') else 0))
+        else:
+            boundary = KeysetKey(self.decode_values(cursor['k']), [f.startswith('-') for f in self.fields])
+            position_key = lambda entry: CompanyDirectory.keyset_key(entry, self.fields, self.seed)
+            try:
+                if cursor.get('r'):
+                    start = max(0, bisect.bisect_left(queryset, boundary, key=position_key) - page_size)
+                else:
+                    start = bisect.bisect_right(queryset, boundary, key=position_key)
+            except TypeError:
+                # Cursor values of the wrong type for the ordering do not compare
+                raise NotFound('Invalid cursor')
+
+        end = min(start + page_size, self.count)
+        self.page = queryset[start:end]
+        self.page_number = start // page_size + 1
+        self.has_next = end < self.count
+        # A cursor past the end (e.g. edited by hand) gives an empty page with no boundary row
+        self.has_previous = start > 0 and bool(self.page)
+        self.start, self.end = start, end
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except (TypeError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], self.end, reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.page[0], self.start, reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def encode_cursor(self, entry, position, reverse):
+        if self.fields is None:
+            payload = {'p': position}
+        else:
+            key = CompanyDirectory.keyset_key(entry, self.fields, self.seed)
+            payload = {'k': [self.encode_value(v) for v in key.values]}
+        if reverse:
+            payload['r'] = 1
+        token = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode()).decode()
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+        except (ValueError, TypeError):
+            raise NotFound('Invalid cursor')
+        if not isinstance(payload, dict):
+            raise NotFound('Invalid cursor')
+        position = payload.get('p', 0)
+        if not isinstance(position, int) or isinstance(position, bool) or position < 0:
+            raise NotFound('Invalid cursor')
+        if 'k' in payload and self.fields is not None and (
+            not isinstance(payload['k'], list) or len(payload['k']) != len(self.fields)
+        ):
+            raise NotFound('Invalid cursor')
+        return payload
+
+    def encode_value(self, value):
+        if isinstance(value, datetime):
+            return {'dt': value.isoformat()}
+        return value
+
+    def decode_values(self, values):
+        try:
+            decoded = [
+                datetime.fromisoformat(value['dt']) if isinstance(value, dict) else value
+                for value in values
+            ]
+        except (KeyError, TypeError, ValueError):
+            raise NotFound('Invalid cursor')
+        return decoded
+
+
 class StaticPageViewSet(viewsets.ReadOnlyModelViewSet):
     """Public read-only API for admin-managed static pages."""
 
@@ -76,6 +216,7 @@ class CompanyViewSet(viewsets.ModelViewSet):
             'record_sponsored_click',
             'track_job_click',
             'track_page_view',
+            'track_events',
         ]
         if self.action in public_actions:
             return [AllowAny()]
@@ -86,6 +227,24 @@ class CompanyViewSet(viewsets.ModelViewSet):
     ordering_fields = ['name', 'country', 'created_at', 'updated_at', 'is_sponsored', 'sponsor_order']
     ordering = ['-is_sponsored', 'sponsor_order', 'name']
     
+    # Query parameters that shape the organic part of a list page; anything
+    # else (cache busters, tracking params) does not split the page cache.
+    ORGANIC_PAGE_PARAMS = (
+        'name', 'country', 'state', 'city', 'functions', 'work_environment', 'status',
+        'search', 'ordering', 'page', 'page_size', 'cursor', 'pagination', 'seed',
+    )
+    ORGANIC_PAGE_TIMEOUT = 300
+    
+    # Batch beacon event type -> CampaignStatistics counter
+    EVENT_COUNTERS = {
+        'page_view': 'page_views',
+        'job_click': 'job_page_clicks',
+        'profile_view': 'profile_views',
+        'application_click': 'application_clicks',
+        'contact_click': 'contact_clicks',
+    }
+    MAX_BEACON_EVENTS = 200
+    
     def get_serializer_class(self):
         """Use lightweight serializer for list view."""
         if self.action == 'list':
@@ -109,20 +268,28 @@ class CompanyViewSet(viewsets.ModelViewSet):
             # Remove None values
             filters = {k: v for k, v in filters.items() if v}
         
-        # Get all companies matching filters (organic only for main results)
-        queryset = self.filter_queryset(self.get_queryset())
-        organic_companies = queryset.filter(is_sponsored=False)
+        # Random ordering uses a seeded shuffle; clients echo the seed back
+        # (it is added to next/previous links) so pages never repeat rows.
+        self.shuffle_seed = None
+        if request.query_params.get('ordering') == '?':
+            try:
+                self.shuffle_seed = int(request.query_params['seed'])
+            except (KeyError, ValueError):
+                self.shuffle_seed = CompanyDirectory.pick_shuffle_seed()
         
-        # Handle random ordering (not supported by DRF's OrderingFilter)
-        ordering_param = request.query_params.get('ordering', '')
-        if ordering_param == '?':
-            organic_companies = organic_companies.order_by('?')
+        # Keyset pagination when a cursor is supplied or requested
+        if (
+            request.query_params.get(CompanyCursorPagination.cursor_query_param) or
+            request.query_params.get('pagination') == 'cursor'
+        ):
+            self._paginator = CompanyCursorPagination()
         
-        # Get pagination info
-        page = self.paginate_queryset(organic_companies)
-        if page is not None:
+        # Organic results are shared between users and cached as rendered JSON;
+        # only the sponsored slot is computed per request.
+        organic_page = self.get_organic_page(request)
+        if organic_page is not None:
             # Paginated response
-            page_number = getattr(self.paginator.page, 'number', 1)
+            page_number = organic_page['page_number']
             page_key = SponsorSelector.build_page_key(request, filters, page_number)
             
             # Select sponsored campaign using production algorithm
@@ -134,29 +301,35 @@ class CompanyViewSet(viewsets.ModelViewSet):
             )
             
             # Build final results: [1 sponsored company] + [organic results]
-            final_results = []
+            sponsored_json = b''
             if sponsored_campaign:
-                final_results.append(sponsored_campaign.company)
+                sponsored_json = JSONRenderer().render(self.get_sponsored_card(sponsored_campaign, request))
                 
                 # Record impression (will be confirmed by frontend)
                 # For now just log the selection, actual impression recorded via API
-                
-            final_results.extend(page)
             
-            # Serialize with sponsored context
-            serializer = self.get_serializer(final_results, many=True)
-            response_data = serializer.data
+            results = b','.join(part for part in (sponsored_json, organic_page['results']) if part)
+            response = HttpResponse(
+                organic_page['head'] + b'"results":[' + results + b']' + organic_page['tail'],
+                content_type='application/json'
+            )
             
-            # Add sponsored campaign info to response
-            if sponsored_campaign:
-                response_data[0]['sponsored_campaign_id'] = sponsored_campaign.id
-                
-            paginated_response = self.get_paginated_response(response_data)
-            # Add cache busting headers
-            paginated_response['Cache-Control'] = 'no-cache, no-store, must-revalidate'
-            paginated_response['Pragma'] = 'no-cache'
-            paginated_response['Expires'] = '0'
-            return paginated_response
+            # Validators change with the directory version or the sponsored pick.
+            # private: the sponsored slot is per user, so shared caches must not store it.
+            etag_source = f"{organic_page['key']}:{sponsored_campaign.id if sponsored_campaign else ''}"
+            response['ETag'] = '"%s"' % hashlib.sha1(etag_source.encode(), usedforsecurity=False).hexdigest()[:32]  # nosec B324
+            response['Last-Modified'] = http_date(organic_page['last_modified'])
+            response['Cache-Control'] = 'private, no-cache'
+            return get_conditional_response(
+                request,
+                etag=response['ETag'],
+                last_modified=int(organic_page['last_modified']),
+                response=response
+            )
+        
+        organic_companies = CompanyDirectory.query(
+            request.query_params, is_sponsored=False, seed=self.shuffle_seed
+        )
         
         # Non-paginated fallback (e.g., homepage preview)
         page_key = SponsorSelector.build_page_key(request, filters, 1)
@@ -170,22 +343,14 @@ class CompanyViewSet(viewsets.ModelViewSet):
         )
         
         # Build results: [1 sponsored] + [organic results]
-        final_results = []
+        response_data = []
         if sponsored_campaign:
-            final_results.append(sponsored_campaign.company)
+            response_data.append(self.get_sponsored_card(sponsored_campaign, request))
         
         # Get organic results (limit based on context)
         organic_limit = 12 if 'homepage' in request.get_full_path() else 30
-        remaining_limit = organic_limit - len(final_results)
-        final_results.extend(organic_companies[:remaining_limit])
-        
-        # Serialize with sponsored context
-        serializer = self.get_serializer(final_results, many=True)
-        response_data = serializer.data
-        
-        # Add sponsored campaign info to first result if present
-        if sponsored_campaign and response_data:
-            response_data[0]['sponsored_campaign_id'] = sponsored_campaign.id
+        remaining_limit = organic_limit - len(response_data)
+        response_data.extend(CompanyDirectory.render(organic_companies[:remaining_limit], request))
             
         response = Response(response_data)
         # Add cache busting headers
@@ -194,51 +359,111 @@ class CompanyViewSet(viewsets.ModelViewSet):
         response['Expires'] = '0'
         return response
     
-    @action(detail=False, methods=['get'])
-    def filters(self, request):
+    def get_sponsored_card(self, campaign, request):
+        """List card of a campaign's company, taken from the directory when possible."""
+        entry = CompanyDirectory.get_snapshot().by_id.get(campaign.company_id)
+        if entry is not None:
+            sponsored_data = CompanyDirectory.render([entry], request)[0]
+        else:
+            sponsored_data = self.get_serializer(campaign.company).data
+        sponsored_data['sponsored_campaign_id'] = campaign.id
+        return sponsored_data
+    
+    def get_organic_page(self, request):
         """
-        Get available filter options.
-        Returns unique values for countries, states, cities, functions, and work environments.
+        Return the organic part of a list page as pre-rendered JSON fragments.
+
+        Pages are cached in the shared cache under the directory version and
+        the normalized query, so any change to the directory retires them.
+        Returns None when pagination is disabled.
         """
-        # Get unique countries
-        countries = Company.objects.values_list('country', flat=True).distinct().order_by('country')
+        version = CompanyDirectory.get_snapshot().version
+        params = sorted(
+            (name, request.query_params.getlist(name))
+            for name in self.ORGANIC_PAGE_PARAMS
+            if name in request.query_params and name != 'seed'
+        )
+        raw_key = json.dumps([
+            request.build_absolute_uri('/'), type(self.paginator).__name__, params, self.shuffle_seed
+        ])
+        digest = hashlib.sha1(raw_key.encode(), usedforsecurity=False).hexdigest()  # nosec B324
+        cache_key = f'companies:organic:{version}:{digest}'
         
-        # Get unique states (non-null)
-        states = Company.objects.exclude(state__isnull=True).exclude(state='').values_list('state', flat=True).distinct().order_by('state')
+        organic_page = cache.get(cache_key)
+        if organic_page is not None:
+            return organic_page
         
-        # Get unique cities (non-null)
-        cities = Company.objects.exclude(city__isnull=True).exclude(city='').values_list('city', flat=True).distinct().order_by('city')
+        # Get all companies matching filters (organic only for main results).
+        # Served from the in-memory directory.
+        organic_companies = CompanyDirectory.query(
+            request.query_params, is_sponsored=False, seed=self.shuffle_seed
+        )
+        page = self.paginate_queryset(organic_companies)
+        if page is None:
+            return None
+        
+        envelope = self.get_paginated_response([]).data
+        envelope.pop('results', None)
+        # The links are shared with every request under this key
+        for link in ('next', 'previous'):
+            if envelope.get(link):
+                envelope[link] = self.organic_link(envelope[link])
+        tail = {}
+        if self.shuffle_seed is not None:
+            tail['seed'] = self.shuffle_seed
+            for link in ('next', 'previous'):
+                if envelope.get(link):
+                    envelope[link] = replace_query_param(envelope[link], 'seed', self.shuffle_seed)
         
-        # Get unique functions
-        functions = Function.objects.all().values('id', 'name', 'color', 'text_color').order_by('name')
+        renderer = JSONRenderer()
+        # '{"count":..,"next":..,"previous":..' + ',' | '"results":[...]' | ',"seed":..}'
+        head = renderer.render(envelope)[:-1] + b','
+        tail = b',' + renderer.render(tail)[1:] if tail else b'}'
         
-        # Get unique work environments
-        all_work_envs = set()
-        for company in Company.objects.all():
-            all_work_envs.update(company.get_work_environment_list())
+        organic_page = {
+            'key': f'{version}:{digest}',
+            'head': head,
+            'results': b','.join(CompanyDirectory.render_json(page, request)),
+            'tail': tail,
+            'page_number': getattr(self.paginator, 'page_number', None) or getattr(self.paginator.page, 'number', 1),
+            'last_modified': CompanyDirectory.token_timestamp(version),
+        }
+        cache.set(cache_key, organic_page, self.ORGANIC_PAGE_TIMEOUT)
+        return organic_page
+    
+    def organic_link(self, url):
+        """A pagination link without the query parameters the organic page key ignores."""
+        parts = urlsplit(url)
+        query = [
+            (name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True)
+            if name in self.ORGANIC_PAGE_PARAMS
+        ]
+        return parts._replace(query=urlencode(query)).geturl()
+    
+    @action(detail=False, methods=['get'])
+    def filters(self, request):
+        """
+        Get available filter options.
+        Returns unique values for countries, states, cities, functions, and work environments,
+        plus per-value company counts under the filters applied in the query string.
+        """
+        snapshot = CompanyDirectory.get_snapshot()
+        facets = CompanyDirectory.facets(request.query_params)
         
+        # Option lists cover the whole directory, independent of applied filters
         return Response({
-            'countries': list(countries),
-            'states': list(states),
-            'cities': list(cities),
-            'functions': list(functions),
-            'work_environments': sorted(list(all_work_envs)),
+            'countries': sorted(snapshot.postings['countries']),
+            'states': sorted(snapshot.postings['states']),
+            'cities': sorted(snapshot.postings['cities']),
+            'functions': snapshot.functions,
+            'work_environments': sorted(snapshot.postings['work_environments']),
+            'facets': facets,
         })
     
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get statistics about companies."""
-        total_companies = Company.objects.count()
-        active_companies = Company.objects.filter(status='Active').count()
-        engineering_positions = Company.objects.filter(engineering_positions=True).count()
-        countries_count = Company.objects.values('country').distinct().count()
-        
-        return Response({
-            'total_companies': total_companies,
-            'active_companies': active_companies,
-            'engineering_positions': engineering_positions,
-            'countries_count': countries_count,
-        })
+        return Response(DirectoryStats.get())
     
     @action(detail=False, methods=['post'], url_path='sponsored/impression')
     def record_sponsored_impression(self, request):
@@ -253,10 +478,9 @@ class CompanyViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Get campaign
-            try:
-                campaign = SponsorCampaign.objects.get(id=campaign_id, status='active')
-            except SponsorCampaign.DoesNotExist:
+            # Get campaign (from the in-memory campaign table)
+            campaign = SponsorCampaignTable.get(campaign_id)
+            if campaign is None:
                 return Response(
                     {'error': 'Invalid campaign_id'}, 
                     status=status.HTTP_404_NOT_FOUND
@@ -275,7 +499,8 @@ class CompanyViewSet(viewsets.ModelViewSet):
                 page_key=page_key,
                 user_agent=request.META.get('HTTP_USER_AGENT', ''),
                 ip_address=SponsorSelector._get_client_ip(request),
-                referrer=request.META.get('HTTP_REFERER', '')
+                referrer=request.META.get('HTTP_REFERER', ''),
+                page_url=page_url
             )
             
             return Response({'success': True})
@@ -299,10 +524,9 @@ class CompanyViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Get campaign
-            try:
-                campaign = SponsorCampaign.objects.get(id=campaign_id, status='active')
-            except SponsorCampaign.DoesNotExist:
+            # Get campaign (from the in-memory campaign table)
+            campaign = SponsorCampaignTable.get(campaign_id)
+            if campaign is None:
                 return Response(
                     {'error': 'Invalid campaign_id'}, 
                     status=status.HTTP_404_NOT_FOUND
@@ -321,7 +545,8 @@ class CompanyViewSet(viewsets.ModelViewSet):
                 page_key=page_key,
                 user_agent=request.META.get('HTTP_USER_AGENT', ''),
                 ip_address=SponsorSelector._get_client_ip(request),
-                referrer=request.META.get('HTTP_REFERER', '')
+                referrer=request.META.get('HTTP_REFERER', ''),
+                page_url=page_url
             )
             
             return Response({'success': True})
@@ -344,40 +569,21 @@ class CompanyViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Get company
-            try:
-                company = Company.objects.get(id=company_id)
-            except Company.DoesNotExist:
+            # Companies are looked up in the directory to keep beacons off the database
+            if int(company_id) not in CompanyDirectory.get_snapshot().by_id:
                 return Response(
                     {'error': 'Company not found'}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Get or create today's statistics
-            today = timezone.now().date()
-            stats, created = CampaignStatistics.objects.get_or_create(
-                company=company,
-                date=today,
-                defaults={
-                    'page_views': 0,
-                    'unique_visitors': 0,
-                    'job_page_clicks': 0,
-                    'profile_views': 0,
-                    'application_clicks': 0,
-                    'contact_clicks': 0,
-                    'click_through_rate': 0.00,
-                    'engagement_rate': 0.00,
-                }
+            # Buffered; today's statistics row is updated on the next flush
+            CounterBuffer.add(
+                CampaignStatistics,
+                {'company_id': int(company_id), 'date': timezone.now().date()},
+                job_page_clicks=1
             )
             
-            # Increment job page clicks
-            stats.job_page_clicks += 1
-            stats.save()
-            
-            return Response({
-                'success': True, 
-                'job_page_clicks': stats.job_page_clicks
-            })
+            return Response({'success': True})
             
         except Exception:
             return Response(
@@ -397,44 +603,87 @@ class CompanyViewSet(viewsets.ModelViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
             
-            # Get company
-            try:
-                company = Company.objects.get(id=company_id)
-            except Company.DoesNotExist:
+            # Companies are looked up in the directory to keep beacons off the database
+            if int(company_id) not in CompanyDirectory.get_snapshot().by_id:
                 return Response(
                     {'error': 'Company not found'}, 
                     status=status.HTTP_404_NOT_FOUND
                 )
             
-            # Get or create today's statistics
+            # Buffered; today's statistics row and visitor sketch are written
+            # on the next flush
             today = timezone.now().date()
-            stats, created = CampaignStatistics.objects.get_or_create(
-                company=company,
-                date=today,
-                defaults={
-                    'page_views': 0,
-                    'unique_visitors': 0,
-                    'job_page_clicks': 0,
-                    'profile_views': 0,
-                    'application_clicks': 0,
-                    'contact_clicks': 0,
-                    'click_through_rate': 0.00,
-                    'engagement_rate': 0.00,
-                }
+            ReachSketches.add_company_users(int(company_id), today, [SponsorSelector.get_user_hash(request)])
+            CounterBuffer.add(
+                CampaignStatistics,
+                {'company_id': int(company_id), 'date': today},
+                page_views=1
+            )
+            
+            return Response({'success': True})
+            
+        except Exception:
+            return Response(
+                {'error': 'Failed to track page view'}, 
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    @action(detail=False, methods=['post'], url_path='track-events')
+    def track_events(self, request):
+        """
+        Track a batch of company analytics events (one request per page load).
+        
+        Body: {"events": [{"type": "page_view", "company_id": 1}, ...]} with
+        types from EVENT_COUNTERS. Unknown types and companies are skipped.
+        """
+        events = request.data.get('events') if isinstance(request.data, dict) else None
+        if not isinstance(events, list) or not events:
+            return Response(
+                {'error': 'events must be a non-empty list'}, 
+                status=status.HTTP_400_BAD_REQUEST
             )
+        if len(events) > self.MAX_BEACON_EVENTS:
+            return Response(
+                {'error': f'At most {self.MAX_BEACON_EVENTS} events per request'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            # Companies are looked up in the directory to keep beacons off the database
+            directory = CompanyDirectory.get_snapshot().by_id
+            increments = {}
+            rejected = 0
+            for event in events:
+                try:
+                    field = self.EVENT_COUNTERS[event['type']]
+                    company_id = int(event['company_id'])
+                except (KeyError, TypeError, ValueError):
+                    rejected += 1
+                    continue
+                if company_id not in directory:
+                    rejected += 1
+                    continue
+                counts = increments.setdefault(company_id, {})
+                counts[field] = counts.get(field, 0) + 1
             
-            # Increment page views
-            stats.page_views += 1
-            stats.save()
+            today = timezone.now().date()
+            viewed = [company_id for company_id, counts in increments.items() if 'page_views' in counts]
+            if viewed:
+                ReachSketches.add_companies_users(viewed, today, [SponsorSelector.get_user_hash(request)])
+            # Buffered with this worker's other beacons (sketch registers included)
+            # and written on the next flush
+            for company_id, counts in increments.items():
+                CounterBuffer.add(CampaignStatistics, {'company_id': company_id, 'date': today}, **counts)
             
             return Response({
-                'success': True, 
-                'page_views': stats.page_views
+                'success': True,
+                'accepted': len(events) - rejected,
+                'rejected': rejected
             })
             
         except Exception:
             return Response(
-                {'error': 'Failed to track page view'}, 
+                {'error': 'Failed to track events'}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
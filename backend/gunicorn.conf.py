@@ -0,0 +1,15 @@
+"""
+Gunicorn hooks, picked up from the working directory alongside the
+command-line options in whit.service / the Dockerfiles.
+"""
+import sys
+
+
+def worker_exit(server, worker):
+    # Write analytics counters still buffered in this worker (max-requests
+    # recycling, graceful restarts); atexit covers the same ground as a fallback
+    counter_service = sys.modules.get('companies.services.counter_service')
+    if counter_service is not None:
+        flushed = counter_service.CounterBuffer.flush()
+        if flushed:
+            server.log.info('Flushed %d buffered counter events from worker %s', flushed, worker.pid)
@@ -9,7 +9,7 @@ from django.contrib import messages
 from django.http import HttpResponseRedirect
 from .models import (
     RecruiterPackage, Recruiter, RecruiterUsage,
-    JobOpening, JobApplication, CandidateSearch, RecruiterMessage
+    JobOpening, JobApplication, CandidateSearch, RecruiterMessage, ExportJob
 )
 
 
@@ -310,3 +310,18 @@ class RecruiterMessageAdmin(admin.ModelAdmin):
             return obj.recipient_recruiter.company_name
         return obj.recipient_user.get_full_name()
     get_recipient.short_description = 'To'
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = [
+        'id', 'requested_by', 'export_format', 'gzip', 'start_date',
+        'end_date', 'status', 'rows', 'size', 'created_at', 'finished_at'
+    ]
+    list_filter = ['status', 'export_format', 'gzip']
+    search_fields = ['requested_by__company_name', 'fingerprint']
+    readonly_fields = [
+        'requested_by', 'fingerprint', 'company_ids', 'start_date', 'end_date',
+        'export_format', 'gzip', 'file', 'rows', 'size', 'error',
+        'created_at', 'started_at', 'finished_at'
+    ]
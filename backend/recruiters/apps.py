@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class RecruitersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recruiters'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from companies.models import CampaignStatistics
+        from companies.services.counter_service import CounterBuffer
+        from .dashboard import DashboardCache
+
+        # Flushed beacon counters bypass the model signals
+        CounterBuffer.register_flush_hook(CampaignStatistics, DashboardCache.statistics_flushed)
@@ -0,0 +1,99 @@
+import time
+from datetime import date as date_type
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+
+class DashboardCache:
+    """
+    Recruiter dashboard payloads, cached per recruiter.
+
+    Every payload a recruiter has loaded lives under one cache key, so a
+    repeat load is a single cache read. Entries are keyed by view, request
+    parameters and day, and are served for at most
+    RECRUITER_DASHBOARD_STALE_SECONDS; that bounds how far today's counters,
+    which the analytics beacons update continuously, lag behind. Changes to
+    a recruiter's company access, and statistics written for earlier days,
+    drop the affected recruiters' payloads straight away.
+
+    A payload computed while an invalidation commits can be stored after
+    it; it is still dropped once the staleness window passes.
+    """
+
+    PREFIX = 'recruiters:dashboard:'
+
+    @classmethod
+    def key(cls, recruiter_id: int) -> str:
+        return f'{cls.PREFIX}{recruiter_id}'
+
+    @staticmethod
+    def _entry_key(view: str, params: Dict[str, Any]) -> Tuple:
+        return (view, timezone.now().date(), tuple(sorted(params.items())))
+
+    @classmethod
+    def get(cls, recruiter_id: int, view: str, **params) -> Optional[Any]:
+        """The cached payload of ``view`` for these parameters, or None."""
+        entry = (cache.get(cls.key(recruiter_id)) or {}).get(cls._entry_key(view, params))
+        if entry is None:
+            return None
+        stored_at, payload = entry
+        if time.time() - stored_at >= settings.RECRUITER_DASHBOARD_STALE_SECONDS:
+            return None
+        return payload
+
+    @classmethod
+    def set(cls, recruiter_id: int, view: str, payload: Any, **params) -> None:
+        timeout = settings.RECRUITER_DASHBOARD_STALE_SECONDS
+        if timeout <= 0:
+            return
+        key = cls.key(recruiter_id)
+        now = time.time()
+        entries = {
+            entry_key: entry
+            for entry_key, entry in (cache.get(key) or {}).items()
+            if now - entry[0] < timeout
+        }
+        entries[cls._entry_key(view, params)] = (now, payload)
+        cache.set(key, entries, timeout)
+
+    @classmethod
+    def invalidate(cls, recruiter_ids: Iterable[int]) -> None:
+        """Drop the recruiters' payloads once the current transaction commits."""
+        keys = [cls.key(recruiter_id) for recruiter_id in set(recruiter_ids)]
+        if keys:
+            transaction.on_commit(lambda: cache.delete_many(keys))
+
+    @classmethod
+    def invalidate_companies(cls, company_ids: Iterable[int]) -> None:
+        """Drop the payloads of every recruiter with access to ``company_ids``."""
+        from companies.models import CompanyRecruiterAccess
+
+        company_ids = set(company_ids)
+        if not company_ids:
+            return
+
+        def drop():
+            recruiter_ids = set(CompanyRecruiterAccess.objects.filter(
+                company_id__in=company_ids
+            ).values_list('recruiter_id', flat=True))
+            cache.delete_many([cls.key(recruiter_id) for recruiter_id in recruiter_ids])
+        transaction.on_commit(drop)
+
+    @classmethod
+    def statistics_written(cls, keys: Iterable[Tuple[int, date_type]]) -> None:
+        """
+        Invalidate for (company id, date) CampaignStatistics writes. Writes
+        for today are left to the staleness window, since beacon flushes
+        update today's rows every few seconds.
+        """
+        today = timezone.now().date()
+        cls.invalidate_companies(company_id for company_id, date in keys if date != today)
+
+    @classmethod
+    def statistics_flushed(cls, rows: List[Tuple[Dict[str, Any], Dict[str, int]]]) -> None:
+        """CounterBuffer flush hook for buffered CampaignStatistics counters."""
+        cls.statistics_written((lookup['company_id'], lookup['date']) for lookup, _ in rows)
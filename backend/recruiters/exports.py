@@ -0,0 +1,172 @@
+import hashlib
+import json
+import logging
+import tempfile
+from datetime import date as date_type, timedelta
+from typing import Iterable, List, Optional, Set, Tuple
+
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+
+from companies.services.export_service import StatisticsExport
+from .models import ExportJob, Recruiter
+
+logger = logging.getLogger(__name__)
+
+
+class ExportJobs:
+    """
+    Background campaign data exports.
+
+    ``request`` deduplicates by fingerprint: a pending or running job with
+    the same company set, range and format is handed back as is, and so is
+    a finished artifact that is still current (its range ended before today,
+    or it finished less than FRESH_FOR ago). Jobs are shared by every
+    recruiter who may export all of their companies (``can_access``), so the
+    export list (``accessible``) shows the jobs another recruiter's request
+    was deduplicated onto. ``process_export_jobs`` claims pending jobs and
+    writes each artifact through StatisticsExport, one chunk at a time, into
+    MEDIA_ROOT.
+    """
+
+    FRESH_FOR = timedelta(minutes=15)
+    # A running job that has not finished by then is assumed lost with its worker
+    STALE_AFTER = timedelta(hours=1)
+
+    @staticmethod
+    def fingerprint(company_ids: Iterable[int], start: date_type, end: date_type,
+                    export_format: str, gzip: bool) -> str:
+        key = json.dumps([
+            sorted({int(company_id) for company_id in company_ids}),
+            start.isoformat(), end.isoformat(), export_format, bool(gzip)
+        ])
+        return hashlib.blake2b(key.encode('utf-8'), digest_size=20).hexdigest()
+
+    @classmethod
+    def request(cls, recruiter: Recruiter, company_ids: Iterable[int], start: date_type, end: date_type,
+                export_format: str = 'csv', gzip: bool = False) -> Tuple[ExportJob, bool]:
+        """Return (job, created): an existing job for the same export, or a new pending one."""
+        if export_format not in StatisticsExport.FORMATS:
+            raise ValueError(f'Unknown export format: {export_format}')
+        company_ids = sorted({int(company_id) for company_id in company_ids})
+        fingerprint = cls.fingerprint(company_ids, start, end, export_format, gzip)
+
+        now = timezone.now()
+        current = Q(status__in=('pending', 'running')) | Q(
+            Q(end_date__lt=now.date()) | Q(finished_at__gte=now - cls.FRESH_FOR),
+            status='done'
+        )
+        job = ExportJob.objects.filter(current, fingerprint=fingerprint).order_by('-created_at').first()
+        if job is not None and cls.can_access(recruiter, job):
+            return job, False
+
+        return ExportJob.objects.create(
+            requested_by=recruiter,
+            fingerprint=fingerprint,
+            company_ids=company_ids,
+            start_date=start,
+            end_date=end,
+            export_format=export_format,
+            gzip=gzip
+        ), True
+
+    @classmethod
+    def claim(cls) -> Optional[ExportJob]:
+        """Mark the oldest pending job running and return it; None when there is none."""
+        candidates = ExportJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)
+        for pk in candidates[:10]:
+            # Conditional update, so two workers never claim the same job
+            if ExportJob.objects.filter(pk=pk, status='pending').update(status='running', started_at=timezone.now()):
+                return ExportJob.objects.get(pk=pk)
+        return None
+
+    @classmethod
+    def run(cls, job: ExportJob) -> ExportJob:
+        """Write the artifact of a claimed job and record the outcome."""
+        export = StatisticsExport(
+            job.company_ids, job.start_date, job.end_date,
+            export_format=job.export_format,
+            gzip=job.gzip,
+            include_company=len(job.company_ids) != 1
+        )
+        try:
+            with tempfile.TemporaryFile() as artifact:
+                for data in export:
+                    artifact.write(data)
+                artifact.seek(0)
+                job.file.save(
+                    export.filename(f'campaign_data_{job.pk}_{job.start_date}_to_{job.end_date}'),
+                    File(artifact),
+                    save=False
+                )
+        except Exception as exc:
+            logger.exception('Export job %s failed', job.pk)
+            job.status = 'failed'
+            job.error = str(exc)
+        else:
+            job.status = 'done'
+            job.rows = export.row_count
+            job.size = job.file.size
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'file', 'rows', 'size', 'error', 'finished_at'])
+        return job
+
+    @classmethod
+    def requeue_stale(cls) -> int:
+        return ExportJob.objects.filter(
+            status='running', started_at__lt=timezone.now() - cls.STALE_AFTER
+        ).update(status='pending', started_at=None)
+
+    @classmethod
+    def purge(cls, older_than: timedelta) -> int:
+        """Delete finished and failed jobs, and their artifacts, older than ``older_than``."""
+        jobs = ExportJob.objects.filter(
+            status__in=('done', 'failed'), finished_at__lt=timezone.now() - older_than
+        )
+        purged = 0
+        for job in jobs.iterator():
+            if job.file:
+                job.file.delete(save=False)
+            job.delete()
+            purged += 1
+        return purged
+
+    @staticmethod
+    def exportable(recruiter: Recruiter) -> Set[int]:
+        """Ids of the companies ``recruiter`` may export."""
+        from companies.models import CompanyRecruiterAccess
+
+        return set(CompanyRecruiterAccess.objects.filter(
+            recruiter=recruiter,
+            can_export_data=True
+        ).values_list('company_id', flat=True))
+
+    @classmethod
+    def accessible(cls, recruiter: Recruiter, limit: int = 20) -> List[ExportJob]:
+        """
+        The newest ``limit`` jobs ``recruiter`` may access, whoever requested
+        them. Scans jobs newest first; ``purge`` keeps the table short.
+        """
+        exportable = cls.exportable(recruiter)
+        jobs = []
+        if not exportable:
+            return jobs
+        for job in ExportJob.objects.order_by('-created_at').iterator(chunk_size=200):
+            if job.company_ids and set(job.company_ids) <= exportable:
+                jobs.append(job)
+                if len(jobs) >= limit:
+                    break
+        return jobs
+
+    @staticmethod
+    def can_access(recruiter: Recruiter, job: ExportJob) -> bool:
+        """Whether ``recruiter`` may currently export every company in ``job``."""
+        from companies.models import CompanyRecruiterAccess
+
+        allowed = CompanyRecruiterAccess.objects.filter(
+            recruiter=recruiter,
+            company_id__in=job.company_ids,
+            can_export_data=True
+        ).count()
+        return allowed == len(job.company_ids)
@@ -0,0 +1,55 @@
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from recruiters.exports import ExportJobs
+
+
+class Command(BaseCommand):
+    help = 'Generate the files of pending campaign data export jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help='Keep running, polling for new jobs every --interval seconds',
+        )
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when no job is pending')
+        parser.add_argument(
+            '--keep-hours',
+            type=int,
+            default=24,
+            help='Delete finished jobs and their files older than this many hours (default: 24)',
+        )
+
+    def handle(self, *args, **options):
+        keep = timedelta(hours=options['keep_hours'])
+        last_purge = 0
+
+        while True:
+            requeued = ExportJobs.requeue_stale()
+            if requeued:
+                self.stdout.write(f'Requeued {requeued} stalled jobs')
+
+            while True:
+                job = ExportJobs.claim()
+                if job is None:
+                    break
+                started = time.perf_counter()
+                ExportJobs.run(job)
+                elapsed = time.perf_counter() - started
+                if job.status == 'done':
+                    self.stdout.write(self.style.SUCCESS(
+                        f'Export {job.pk}: {job.rows} rows, {job.size} bytes in {elapsed:.2f}s'
+                    ))
+                else:
+                    self.stdout.write(self.style.ERROR(f'Export {job.pk} failed: {job.error}'))
+
+            if time.time() - last_purge >= 3600:
+                purged = ExportJobs.purge(keep)
+                last_purge = time.time()
+                if purged:
+                    self.stdout.write(f'Purged {purged} old exports')
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -374,3 +374,51 @@ class RecruiterMessage(models.Model):
         sender = self.sender_recruiter or self.sender_user
         recipient = self.recipient_recruiter or self.recipient_user
         return f"{sender} to {recipient}: {self.subject}"
+
+
+class ExportJob(models.Model):
+    """
+    A campaign data export produced in the background (process_export_jobs).
+
+    Jobs with the same fingerprint (company set, date range, format, gzip)
+    share one artifact, so a repeated request returns the existing job.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    
+    requested_by = models.ForeignKey(
+        Recruiter,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='export_jobs'
+    )
+    fingerprint = models.CharField(max_length=40, db_index=True, help_text="BLAKE2b digest of the export parameters")
+    
+    # Export parameters
+    company_ids = models.JSONField(default=list)
+    start_date = models.DateField()
+    end_date = models.DateField()
+    export_format = models.CharField(max_length=20, default='csv')
+    gzip = models.BooleanField(default=False)
+    
+    # Progress and result
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', db_index=True)
+    file = models.FileField(upload_to='exports/', blank=True)
+    rows = models.PositiveIntegerField(default=0)
+    size = models.PositiveBigIntegerField(default=0, help_text="Artifact size in bytes")
+    error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+    
+    def __str__(self):
+        return f"Export {self.pk} ({self.export_format}, {self.start_date} to {self.end_date}): {self.status}"
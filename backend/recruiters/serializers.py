@@ -3,7 +3,7 @@ from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from .models import (
     Recruiter, RecruiterPackage, JobOpening, JobApplication,
-    CandidateSearch, RecruiterUsage, RecruiterMessage
+    CandidateSearch, RecruiterUsage, RecruiterMessage, ExportJob
 )
 
 
@@ -534,3 +534,26 @@ class RecruiterMessageSerializer(serializers.ModelSerializer):
         elif obj.recipient_user:
             return obj.recipient_user.get_full_name()
         return "Unknown"
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    """Serializer for background export jobs"""
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'status', 'company_ids', 'start_date', 'end_date',
+            'export_format', 'gzip', 'rows', 'size', 'error',
+            'created_at', 'started_at', 'finished_at', 'download_url'
+        ]
+        read_only_fields = fields
+    
+    def get_download_url(self, obj):
+        """Return authenticated API URL for a finished export."""
+        if obj.status != 'done':
+            return None
+        request = self.context.get('request')
+        if request:
+            return request.build_absolute_uri(f'/api/recruiters/dashboard/exports/{obj.id}/download/')
+        return f'/api/recruiters/dashboard/exports/{obj.id}/download/'
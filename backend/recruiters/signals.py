@@ -0,0 +1,40 @@
+"""
+Signal handlers dropping cached recruiter dashboards when the data behind
+them changes: company access grants and daily campaign statistics.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from companies.models import CampaignStatistics, Company, CompanyRecruiterAccess
+from .dashboard import DashboardCache
+from .models import Recruiter
+
+
+@receiver(post_save, sender=CompanyRecruiterAccess)
+@receiver(post_delete, sender=CompanyRecruiterAccess)
+def invalidate_dashboard_on_access_change(sender, instance, **kwargs):
+    DashboardCache.invalidate([instance.recruiter_id])
+
+
+@receiver(post_save, sender=Recruiter)
+def invalidate_dashboard_on_recruiter_save(sender, instance, **kwargs):
+    # The overview shows the recruiter's company name and package
+    DashboardCache.invalidate([instance.pk])
+
+
+@receiver(post_save, sender=CampaignStatistics)
+def invalidate_dashboard_on_statistics_save(sender, instance, **kwargs):
+    keys = [(instance.company_id, instance.date)]
+    # Set by companies.signals before the save, when the row moved
+    previous = getattr(instance, '_rollup_previous_key', None)
+    if previous:
+        keys.append(previous)
+    DashboardCache.statistics_written(keys)
+
+
+@receiver(post_delete, sender=CampaignStatistics)
+def invalidate_dashboard_on_statistics_delete(sender, instance, origin=None, **kwargs):
+    # Deleting the company cascades to its access rows, which invalidate on their own
+    if isinstance(origin, Company):
+        return
+    DashboardCache.statistics_written([(instance.company_id, instance.date)])
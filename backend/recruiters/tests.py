@@ -1,3 +1,175 @@
-from django.test import TestCase
+import gzip
+import io
+import json
+import shutil
+import tempfile
+from datetime import timedelta
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from companies.models import CampaignStatistics, Company, CompanyRecruiterAccess
+from .exports import ExportJobs
+from .models import ExportJob, Recruiter, RecruiterPackage
+
+
+def make_recruiter(username, companies=(), can_export_data=True):
+    package, _ = RecruiterPackage.objects.get_or_create(
+        name='Exports', defaults={'price': 0, 'monthly_job_openings': 0, 'monthly_candidate_searches': 0}
+    )
+    user = User.objects.create_user(username=username, password='unused')
+    recruiter = Recruiter.objects.create(
+        user=user, package=package, company_name=username, contact_email=f'{username}@example.com'
+    )
+    for company in companies:
+        CompanyRecruiterAccess.objects.create(company=company, recruiter=recruiter, can_export_data=can_export_data)
+    return recruiter
+
+
+class ExportJobsTests(TestCase):
+    """Export jobs are deduplicated across recruiters and shared by access."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.companies = [
+            Company.objects.create(
+                name=name, jobs_page_url='https://example.com/jobs', country='USA', work_environment='Remote'
+            )
+            for name in ('North', 'South', 'West')
+        ]
+        today = timezone.now().date()
+        CampaignStatistics.objects.bulk_create([
+            CampaignStatistics(company=company, date=today - timedelta(days=offset), page_views=offset)
+            for company in cls.companies
+            for offset in range(10)
+        ])
+        cls.first = make_recruiter('first', cls.companies[:2])
+        cls.second = make_recruiter('second', cls.companies[:2])
+        cls.outsider = make_recruiter('outsider', cls.companies[1:])
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def client_for(self, recruiter):
+        client = APIClient()
+        client.force_authenticate(recruiter.user)
+        return client
+
+    def request_export(self, recruiter, **data):
+        data = {'days': 7, 'export_format': 'csv', 'company_ids': [c.pk for c in self.companies[:2]], **data}
+        return self.client_for(recruiter).post('/api/recruiters/dashboard/exports/', data, format='json')
+
+    def listed(self, recruiter):
+        response = self.client_for(recruiter).get('/api/recruiters/dashboard/exports/')
+        self.assertEqual(response.status_code, 200)
+        return [job['id'] for job in response.json()]
+
+    def status_code(self, recruiter, job_id):
+        return self.client_for(recruiter).get(f'/api/recruiters/dashboard/exports/{job_id}/').status_code
+
+    def test_identical_requests_share_a_job_across_recruiters(self):
+        first = self.request_export(self.first)
+        self.assertEqual(first.status_code, 202)
+        job_id = first.json()['id']
+
+        second = self.request_export(self.second, company_ids=[c.pk for c in reversed(self.companies[:2])])
+        self.assertEqual(second.json()['id'], job_id)
+        self.assertEqual(ExportJob.objects.count(), 1)
+
+        # Listed and served to both, though only the first requested it
+        for recruiter in (self.first, self.second):
+            self.assertEqual(self.listed(recruiter), [job_id])
+            self.assertEqual(self.status_code(recruiter, job_id), 200)
+
+    def test_other_parameters_get_their_own_job(self):
+        job_id = self.request_export(self.first).json()['id']
+        for changes in ({'days': 8}, {'export_format': 'ndjson'}, {'gzip': True},
+                        {'company_ids': [self.companies[1].pk]}):
+            with self.subTest(changes=changes):
+                self.assertNotEqual(self.request_export(self.first, **changes).json()['id'], job_id)
+
+    def test_jobs_follow_company_access(self):
+        job_id = self.request_export(self.first).json()['id']
+
+        self.assertEqual(self.listed(self.outsider), [])
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.status_code(self.outsider, job_id), 404)
+            self.assertEqual(self.request_export(self.outsider).status_code, 403)
+
+        CompanyRecruiterAccess.objects.filter(recruiter=self.second, company=self.companies[1]).update(
+            can_export_data=False
+        )
+        self.assertEqual(self.listed(self.second), [])
+        with self.assertLogs('django.request', 'WARNING'):
+            self.assertEqual(self.status_code(self.second, job_id), 404)
+
+    def test_service_reuses_only_accessible_jobs(self):
+        start = timezone.now().date() - timedelta(days=7)
+        end = timezone.now().date()
+        job, created = ExportJobs.request(self.first, [c.pk for c in self.companies[:2]], start, end)
+        self.assertTrue(created)
+        self.assertEqual(ExportJobs.request(self.second, [c.pk for c in self.companies[:2]], start, end),
+                         (job, False))
+        other, created = ExportJobs.request(self.outsider, [c.pk for c in self.companies[:2]], start, end)
+        self.assertTrue(created)
+        self.assertNotEqual(other, job)
+        self.assertEqual(len(job.fingerprint), 40)
+        with self.assertRaises(ValueError):
+            ExportJobs.request(self.first, [self.companies[0].pk], start, end, export_format='xml')
+
+    def test_finished_exports_are_downloaded_and_reused_while_current(self):
+        job_id = self.request_export(self.first, gzip=True, export_format='ndjson').json()['id']
+        call_command('process_export_jobs', stdout=io.StringIO())
+
+        job = ExportJob.objects.get(pk=job_id)
+        self.assertEqual((job.status, job.rows), ('done', 16))
+        repeat = self.request_export(self.second, gzip=True, export_format='ndjson')
+        self.assertEqual((repeat.status_code, repeat.json()['id']), (200, job_id))
+        self.assertTrue(repeat.json()['download_url'])
+
+        download = self.client_for(self.second).get(f'/api/recruiters/dashboard/exports/{job_id}/download/')
+        self.assertEqual(download.status_code, 200)
+        rows = [json.loads(line) for line in gzip.decompress(b''.join(download.streaming_content)).splitlines()]
+        self.assertEqual(len(rows), 16)
+        self.assertEqual({row['company_name'] for row in rows}, {'North', 'South'})
+
+        # A range that includes today is regenerated once FRESH_FOR has passed
+        ExportJob.objects.filter(pk=job_id).update(finished_at=timezone.now() - ExportJobs.FRESH_FOR)
+        self.assertNotEqual(self.request_export(self.first, gzip=True, export_format='ndjson').json()['id'], job_id)
+
+    def test_purge_deletes_old_jobs_and_files(self):
+        job_id = self.request_export(self.first).json()['id']
+        call_command('process_export_jobs', stdout=io.StringIO())
+        job = ExportJob.objects.get(pk=job_id)
+        storage, name = job.file.storage, job.file.name
+        self.assertTrue(storage.exists(name))
+
+        self.assertEqual(ExportJobs.purge(timedelta(hours=1)), 0)
+        ExportJob.objects.filter(pk=job_id).update(finished_at=timezone.now() - timedelta(hours=2))
+        self.assertEqual(ExportJobs.purge(timedelta(hours=1)), 1)
+        self.assertFalse(storage.exists(name))
+        self.assertFalse(ExportJob.objects.exists())
+
+    def test_streamed_export(self):
+        client = self.client_for(self.first)
+        response = client.get(
+            f'/api/recruiters/export/{self.companies[0].pk}/', {'days': 3, 'export_format': 'csv', 'gzip': '1'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        lines = gzip.decompress(b''.join(response.streaming_content)).decode('utf-8').splitlines()
+        self.assertEqual(lines[0].split(',')[0], 'Date')
+        self.assertEqual(len(lines), 1 + 4)
+
+        with self.assertLogs('django.request', 'WARNING'):
+            bad_format = client.get(f'/api/recruiters/export/{self.companies[0].pk}/', {'export_format': 'xml'})
+            self.assertEqual(bad_format.status_code, 400)
+            self.assertEqual(client.get(f'/api/recruiters/export/{self.companies[2].pk}/').status_code, 403)
@@ -5,7 +5,7 @@ from .views import (
     RecruiterPackageViewSet, RecruiterProfileViewSet,
     JobOpeningViewSet, PublicJobOpeningViewSet, JobApplicationViewSet,
     CandidateSearchViewSet, RecruiterMessageViewSet,
-    RecruiterDashboardViewSet, export_company_data
+    RecruiterDashboardViewSet, export_company_data, export_companies_data
 )
 
 router = DefaultRouter()
@@ -21,6 +21,7 @@ router.register(r'dashboard', RecruiterDashboardViewSet, basename='recruiter-das
 urlpatterns = [
     path('register/', recruiter_register, name='recruiter-register'),
     path('login/', recruiter_login, name='recruiter-login'),
+    path('export/', export_companies_data, name='export-companies-data'),
     path('export/<int:company_id>/', export_company_data, name='export-company-data'),
     path('', include(router.urls)),
 ]
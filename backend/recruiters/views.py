@@ -11,13 +11,14 @@ from django.db.models import Q, Count, Sum, F
 from django.views.decorators.csrf import csrf_exempt
 from .models import (
     Recruiter, RecruiterPackage, JobOpening, JobApplication,
-    CandidateSearch, RecruiterUsage, RecruiterMessage
+    CandidateSearch, RecruiterUsage, RecruiterMessage, ExportJob
 )
 from .serializers import (
     RecruiterPackageSerializer, RecruiterRegistrationSerializer,
     RecruiterSerializer, RecruiterUsageSerializer, JobOpeningSerializer,
     PublicJobOpeningSerializer,
-    JobApplicationSerializer, CandidateSearchSerializer, RecruiterMessageSerializer
+    JobApplicationSerializer, CandidateSearchSerializer, RecruiterMessageSerializer,
+    ExportJobSerializer
 )
 from accounts.models import UserProfile
 from accounts.emailing import frontend_url, send_account_email
@@ -871,9 +872,11 @@ class RecruiterDashboardViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
     def company_statistics(self, request):
         """Get statistics for companies the recruiter has access to"""
-        from companies.models import CompanyRecruiterAccess, CampaignStatistics
-        from django.db.models import Sum, Avg
-        from datetime import datetime, timedelta
+        from companies.models import CompanyRecruiterAccess
+        from companies.services.reach_service import ReachSketches
+        from companies.services.rollup_service import StatisticsRollups
+        from datetime import timedelta
+        from .dashboard import DashboardCache
         
         recruiter = request.user.recruiter_profile
         company_id = request.query_params.get('company_id')
@@ -882,6 +885,11 @@ class RecruiterDashboardViewSet(viewsets.ViewSet):
         except (ValueError, TypeError):
             days = 30
         
+        # Access changes invalidate the cached payload, so a hit needs no access check
+        data = DashboardCache.get(recruiter.pk, 'company_statistics', company_id=company_id, days=days)
+        if data is not None:
+            return Response(data)
+        
         # Check access
         if company_id:
             access = CompanyRecruiterAccess.objects.filter(
@@ -900,43 +908,23 @@ class RecruiterDashboardViewSet(viewsets.ViewSet):
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=days)
         
-        # Build query
-        stats_query = CampaignStatistics.objects.filter(
-            date__gte=start_date,
-            date__lte=end_date
-        )
-        
         if company_id:
-            stats_query = stats_query.filter(company_id=company_id)
+            company_ids = [company_id]
         else:
             # Get all companies the recruiter has stats access to
-            accessible_company_ids = CompanyRecruiterAccess.objects.filter(
+            company_ids = list(CompanyRecruiterAccess.objects.filter(
                 recruiter=recruiter,
                 can_see_sponsored_stats=True
-            ).values_list('company_id', flat=True)
-            
-            stats_query = stats_query.filter(company_id__in=accessible_company_ids)
-        
-        # Get aggregated statistics
-        totals = stats_query.aggregate(
-            total_page_views=Sum('page_views'),
-            total_unique_visitors=Sum('unique_visitors'),
-            total_job_page_clicks=Sum('job_page_clicks'),
-            total_profile_views=Sum('profile_views'),
-            total_application_clicks=Sum('application_clicks'),
-            total_contact_clicks=Sum('contact_clicks'),
-            avg_click_through_rate=Avg('click_through_rate'),
-            avg_engagement_rate=Avg('engagement_rate')
-        )
+            ).values_list('company_id', flat=True))
         
-        # Get daily statistics
-        daily_stats = list(stats_query.values(
-            'date', 'company__name', 'page_views', 'unique_visitors',
-            'job_page_clicks', 'profile_views', 'application_clicks',
-            'contact_clicks', 'click_through_rate', 'engagement_rate'
-        ).order_by('-date'))
+        # Whole months and weeks come from the rollup tables, the rest from daily rows
+        totals, daily_stats = StatisticsRollups.report(company_ids, start_date, end_date)
+        # Daily unique counts cannot be summed; merge the day sketches instead,
+        # falling back to the stored daily counts for days without one
+        totals['total_unique_visitors'] = ReachSketches.company_visitors(company_ids, start_date, end_date)
+        totals['unique_visitors_error'] = ReachSketches.RELATIVE_ERROR
         
-        return Response({
+        data = {
             'totals': totals,
             'daily_stats': daily_stats,
             'date_range': {
@@ -944,65 +932,202 @@ class RecruiterDashboardViewSet(viewsets.ViewSet):
                 'end_date': end_date,
                 'days': days
             }
-        })
+        }
+        DashboardCache.set(recruiter.pk, 'company_statistics', data, company_id=company_id, days=days)
+        return Response(data)
     
     @action(detail=False, methods=['get'])
     def dashboard_overview(self, request):
         """Get overview data for recruiter dashboard"""
-        from companies.models import CompanyRecruiterAccess, CampaignStatistics
-        from django.db.models import Sum, Count
-        from datetime import datetime, timedelta
+        from companies.models import CompanyRecruiterAccess
+        from companies.services.rollup_service import StatisticsRollups
+        from collections import Counter
+        from datetime import timedelta
+        from .dashboard import DashboardCache
         
         recruiter = request.user.recruiter_profile
         
-        # Get accessible companies count
-        accessible_companies = CompanyRecruiterAccess.objects.filter(
-            recruiter=recruiter
-        ).count()
+        data = DashboardCache.get(recruiter.pk, 'dashboard_overview')
+        if data is not None:
+            return Response(data)
         
-        # Get companies with different access levels
-        access_levels = CompanyRecruiterAccess.objects.filter(
+        # One pass over the recruiter's accesses for the count, levels and stats companies
+        accesses = list(CompanyRecruiterAccess.objects.filter(
             recruiter=recruiter
-        ).values('access_level').annotate(count=Count('id'))
+        ).values_list('company_id', 'access_level', 'can_see_sponsored_stats'))
+        access_levels = Counter(access_level for _, access_level, _ in accesses)
+        accessible_company_ids = [company_id for company_id, _, can_see in accesses if can_see]
         
         # Get recent statistics (last 7 days)
         end_date = timezone.now().date()
         start_date = end_date - timedelta(days=7)
         
-        accessible_company_ids = CompanyRecruiterAccess.objects.filter(
-            recruiter=recruiter,
-            can_see_sponsored_stats=True
-        ).values_list('company_id', flat=True)
-        
-        recent_stats = CampaignStatistics.objects.filter(
-            company_id__in=accessible_company_ids,
-            date__gte=start_date
-        ).aggregate(
-            total_views=Sum('page_views'),
-            total_clicks=Sum('job_page_clicks'),
-            total_applications=Sum('application_clicks')
-        )
+        totals, _ = StatisticsRollups.report(accessible_company_ids, start_date, end_date)
+        recent_stats = {
+            'total_views': totals['total_page_views'],
+            'total_clicks': totals['total_job_page_clicks'],
+            'total_applications': totals['total_application_clicks']
+        }
         
-        return Response({
-            'accessible_companies': accessible_companies,
-            'access_levels': list(access_levels),
+        data = {
+            'accessible_companies': len(accesses),
+            'access_levels': [
+                {'access_level': access_level, 'count': count}
+                for access_level, count in sorted(access_levels.items())
+            ],
             'recent_stats': recent_stats,
             'recruiter_info': {
                 'company_name': recruiter.company_name,
                 'package': recruiter.package.name,
                 'analytics_level': recruiter.package.analytics_level
             }
-        })
+        }
+        DashboardCache.set(recruiter.pk, 'dashboard_overview', data)
+        return Response(data)
+    
+    @action(detail=False, methods=['get', 'post'])
+    def exports(self, request):
+        """
+        List the recent export jobs the recruiter can access, or request one
+        (POST: days, export_format, gzip, optional company_ids). Identical
+        requests share one job, so a repeat returns the existing job or
+        finished artifact.
+        """
+        from companies.services.export_service import StatisticsExport
+        from datetime import timedelta
+        from .exports import ExportJobs
+        
+        recruiter = request.user.recruiter_profile
+        
+        if request.method == 'GET':
+            jobs = ExportJobs.accessible(recruiter)
+            return Response(ExportJobSerializer(jobs, many=True, context={'request': request}).data)
+        
+        exportable = ExportJobs.exportable(recruiter)
+        
+        requested = request.data.get('company_ids')
+        if requested:
+            try:
+                company_ids = {int(company_id) for company_id in requested}
+            except (ValueError, TypeError):
+                return Response({'error': 'company_ids must be a list of ids'}, status=status.HTTP_400_BAD_REQUEST)
+            if not company_ids <= exportable:
+                return Response(
+                    {'error': 'No export access to some of these companies'},
+                    status=status.HTTP_403_FORBIDDEN
+                )
+        else:
+            company_ids = exportable
+        
+        if not company_ids:
+            return Response(
+                {'error': 'No export access to any company data'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        try:
+            days = min(365, max(1, int(request.data.get('days', 30))))
+        except (ValueError, TypeError):
+            days = 30
+        end_date = timezone.now().date()
+        start_date = end_date - timedelta(days=days)
+        
+        gzip = request.data.get('gzip', False)
+        if isinstance(gzip, str):
+            gzip = gzip.lower() in ('1', 'true', 'yes')
+        
+        try:
+            job, created = ExportJobs.request(
+                recruiter, company_ids, start_date, end_date,
+                export_format=request.data.get('export_format', 'csv'),
+                gzip=bool(gzip)
+            )
+        except ValueError:
+            return Response(
+                {'error': f'export_format must be one of: {", ".join(StatisticsExport.FORMATS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        data = ExportJobSerializer(job, context={'request': request}).data
+        if job.status == 'done':
+            return Response(data, status=status.HTTP_200_OK)
+        return Response(data, status=status.HTTP_202_ACCEPTED)
+    
+    def _export_job(self, request, job_id):
+        from .exports import ExportJobs
+        
+        job = ExportJob.objects.filter(pk=job_id).first()
+        if job is None or not ExportJobs.can_access(request.user.recruiter_profile, job):
+            raise Http404('Export not found')
+        return job
+    
+    @action(detail=False, methods=['get'], url_path=r'exports/(?P<job_id>\d+)')
+    def export_status(self, request, job_id=None):
+        """Poll an export job"""
+        job = self._export_job(request, job_id)
+        return Response(ExportJobSerializer(job, context={'request': request}).data)
+    
+    @action(detail=False, methods=['get'], url_path=r'exports/(?P<job_id>\d+)/download')
+    def export_download(self, request, job_id=None):
+        """Download a finished export"""
+        job = self._export_job(request, job_id)
+        if job.status != 'done' or not job.file:
+            return Response(
+                {'error': 'Export is not ready', 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+        
+        try:
+            artifact = job.file.open('rb')
+        except FileNotFoundError:
+            raise Http404('Export file not found')
+        
+        return FileResponse(
+            artifact,
+            as_attachment=True,
+            filename=job.file.name.split('/')[-1],
+        )
+
+
+def _export_response(request, company_ids, stem, include_company):
+    """Stream the requested days of CampaignStatistics for ``company_ids``."""
+    from companies.services.export_service import StatisticsExport
+    from django.http import StreamingHttpResponse
+    from datetime import timedelta
+    
+    # Get date range from parameters
+    try:
+        days = min(365, max(1, int(request.GET.get('days', 30))))
+    except (ValueError, TypeError):
+        days = 30
+    end_date = timezone.now().date()
+    start_date = end_date - timedelta(days=days)
+    
+    try:
+        export = StatisticsExport(
+            company_ids, start_date, end_date,
+            # Not ?format=, which DRF reserves for renderer selection
+            export_format=request.GET.get('export_format', 'csv'),
+            gzip=request.GET.get('gzip', '').lower() in ('1', 'true', 'yes'),
+            include_company=include_company
+        )
+    except ValueError:
+        return Response(
+            {'error': f'export_format must be one of: {", ".join(StatisticsExport.FORMATS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    response = StreamingHttpResponse(export, content_type=export.content_type)
+    filename = export.filename(f'{stem}_{start_date}_to_{end_date}')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
 
 
 @api_view(['GET'])
 @permission_classes([IsRecruiter])
 def export_company_data(request, company_id):
-    """Export company campaign data"""
-    from companies.models import CompanyRecruiterAccess, CampaignStatistics
-    from django.http import HttpResponse
-    import csv
-    from datetime import datetime, timedelta
+    """Export company campaign data (?export_format=csv|ndjson|columnar, ?gzip=1)"""
+    from companies.models import CompanyRecruiterAccess
     
     recruiter = request.user.recruiter_profile
     
@@ -1011,7 +1136,7 @@ def export_company_data(request, company_id):
         recruiter=recruiter,
         company_id=company_id,
         can_export_data=True
-    ).first()
+    ).select_related('company').first()
     
     if not access:
         return Response(
@@ -1019,43 +1144,25 @@ def export_company_data(request, company_id):
             status=status.HTTP_403_FORBIDDEN
         )
     
-    # Get date range from parameters
-    try:
-        days = min(365, max(1, int(request.GET.get('days', 30))))
-    except (ValueError, TypeError):
-        days = 30
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=days)
-    
-    # Get statistics
-    stats = CampaignStatistics.objects.filter(
-        company_id=company_id,
-        date__gte=start_date,
-        date__lte=end_date
-    ).order_by('-date')
-    
-    # Create CSV response
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = f'attachment; filename="campaign_data_{access.company.name}_{start_date}_to_{end_date}.csv"'
+    return _export_response(request, [company_id], f'campaign_data_{access.company.name}', include_company=False)
+
+
+@api_view(['GET'])
+@permission_classes([IsRecruiter])
+def export_companies_data(request):
+    """Export campaign data for every company the recruiter may export, one stream"""
+    from companies.models import CompanyRecruiterAccess
     
-    writer = csv.writer(response)
-    writer.writerow([
-        'Date', 'Page Views', 'Unique Visitors', 'Job Page Clicks',
-        'Profile Views', 'Application Clicks', 'Contact Clicks',
-        'Click Through Rate (%)', 'Engagement Rate (%)'
-    ])
+    recruiter = request.user.recruiter_profile
+    company_ids = list(CompanyRecruiterAccess.objects.filter(
+        recruiter=recruiter,
+        can_export_data=True
+    ).values_list('company_id', flat=True))
     
-    for stat in stats:
-        writer.writerow([
-            stat.date,
-            stat.page_views,
-            stat.unique_visitors,
-            stat.job_page_clicks,
-            stat.profile_views,
-            stat.application_clicks,
-            stat.contact_clicks,
-            stat.click_through_rate,
-            stat.engagement_rate
-        ])
+    if not company_ids:
+        return Response(
+            {'error': 'No export access to any company data'},
+            status=status.HTTP_403_FORBIDDEN
+        )
     
-    return response
+    return _export_response(request, company_ids, 'campaign_data_all_companies', include_company=True)
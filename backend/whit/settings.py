@@ -92,6 +92,44 @@ else:
         }
     }
 
+# Cache
+# Shared state between gunicorn workers (directory versions, counters) lives in
+# the default cache. Configure REDIS_URL in production; without it each worker
+# falls back to its own local-memory cache.
+REDIS_URL = setting('REDIS_URL', default='', secret=True)
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'whit-default',
+        }
+    }
+
+# Raw sponsor delivery logs older than this are rolled up and purged
+# (see prune_sponsor_delivery_logs)
+SPONSOR_LOG_RETENTION_DAYS = setting('SPONSOR_LOG_RETENTION_DAYS', default=30, cast=int)
+
+# Analytics beacon counters are buffered in each worker and written in bulk
+# every COUNTER_BUFFER_FLUSH_SECONDS, or sooner once COUNTER_BUFFER_MAX_EVENTS
+# are pending. 0 seconds writes every event straight through. A row that fails
+# COUNTER_BUFFER_MAX_ATTEMPTS flushes is logged and dropped.
+COUNTER_BUFFER_FLUSH_SECONDS = setting('COUNTER_BUFFER_FLUSH_SECONDS', default=5.0, cast=float)
+COUNTER_BUFFER_MAX_EVENTS = setting('COUNTER_BUFFER_MAX_EVENTS', default=1000, cast=int)
+COUNTER_BUFFER_MAX_ATTEMPTS = setting('COUNTER_BUFFER_MAX_ATTEMPTS', default=3, cast=int)
+
+# Recruiter dashboard payloads are cached per recruiter for up to this many
+# seconds, which bounds how far today's statistics lag. Access changes and
+# writes to earlier days invalidate them immediately. 0 disables the cache.
+RECRUITER_DASHBOARD_STALE_SECONDS = setting('RECRUITER_DASHBOARD_STALE_SECONDS', default=60, cast=int)
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
@@ -1,8 +1,8 @@
 import { useState, useEffect, useRef } from 'react';
 import './CompanyTable.css';
 import { getMediaUrl } from '../services/api';
-import apiClient from '../services/api';
 import sponsoredTracking from '../services/sponsoredTracking';
+import analyticsBeacon from '../services/analyticsBeacon';
 
 // Helper function to parse tags - moved outside components to be accessible
 const parseTags = (text) => {
@@ -60,24 +60,14 @@ function CompanyTable({ companies, buttonStyles = { padding: '6px 12px', fontSiz
     }
   }, [resizing]);
 
-  const handleCareerClick = async (e, company) => {
-    try {
-      // Don't prevent default - we want the link to open
-      // Track the click in the background
-      await apiClient.post('companies/track-job-click/', {
-        company_id: company.id
-      });
-    } catch (error) {
-      console.error('Error tracking job click:', error);
-      // Don't prevent the link from working if tracking fails
-    }
+  const handleCareerClick = (e, company) => {
+    // Don't prevent default - we want the link to open
+    // The click is queued and sent in the background
+    analyticsBeacon.trackJobClick(company.id);
   };
 
-  const trackPageView = async (company) => {
+  const trackPageView = (company) => {
     try {
-      // Create a unique key for this tracking call
-      const trackingKey = `pageview_${company.id}_${Date.now()}`;
-      
       // Check if we recently tracked this company (within last 5 seconds)
       const lastTracked = localStorage.getItem(`last_tracked_${company.id}`);
       const now = Date.now();
@@ -87,9 +77,8 @@ function CompanyTable({ companies, buttonStyles = { padding: '6px 12px', fontSiz
         return;
       }
       
-      await apiClient.post('companies/track-page-view/', {
-        company_id: company.id
-      });
+      // Batched with the other cards' views into one track-events request
+      analyticsBeacon.trackPageView(company.id);
       
       // Store the timestamp to prevent duplicates
       localStorage.setItem(`last_tracked_${company.id}`, now.toString());
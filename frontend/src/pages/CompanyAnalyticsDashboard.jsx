@@ -105,6 +105,18 @@ function CompanyAnalyticsDashboard() {
     return `${parseFloat(num).toFixed(2)}%`;
   };
 
+  // Long ranges are broken down by month and week, the remainder by day
+  const formatPeriod = (stat) => {
+    const start = new Date(stat.date).toLocaleDateString();
+    if (stat.granularity === 'month') {
+      return new Date(stat.date).toLocaleDateString(undefined, { month: 'long', year: 'numeric', timeZone: 'UTC' });
+    }
+    if (stat.granularity === 'week') {
+      return `Week of ${start}`;
+    }
+    return start;
+  };
+
   if (loading) {
     return (
       <div className="dashboard-loading">
@@ -282,7 +294,7 @@ function CompanyAnalyticsDashboard() {
                   {/* Daily Stats Table */}
                   {statistics.daily_stats && statistics.daily_stats.length > 0 && (
                     <div className="daily-stats">
-                      <h3>Daily Breakdown</h3>
+                      <h3>Breakdown</h3>
                       <div className="table-container">
                         <table className="stats-table">
                           <thead>
@@ -300,9 +312,9 @@ function CompanyAnalyticsDashboard() {
                           <tbody>
                             {statistics.daily_stats.map((stat, index) => (
                               <tr key={index}>
-                                <td>{new Date(stat.date).toLocaleDateString()}</td>
+                                <td>{formatPeriod(stat)}</td>
                                 <td>{formatNumber(stat.page_views)}</td>
-                                <td>{formatNumber(stat.unique_visitors)}</td>
+                                <td>{stat.unique_visitors === null ? '—' : formatNumber(stat.unique_visitors)}</td>
                                 <td>{formatNumber(stat.job_page_clicks)}</td>
                                 <td>{formatNumber(stat.profile_views)}</td>
                                 <td>{formatNumber(stat.application_clicks)}</td>
@@ -0,0 +1,73 @@
+// Service for batching company analytics events (page views, job clicks)
+// into one request to the track-events beacon
+const FLUSH_DELAY_MS = 2000;
+const MAX_BATCH_SIZE = 200; // Matches the server's per-request limit
+
+class AnalyticsBeaconService {
+  constructor() {
+    this.queue = [];
+    this.flushTimer = null;
+    this.endpoint = `${import.meta.env.VITE_API_URL || '/api'}/companies/track-events/`;
+
+    // Send whatever is queued when the page is hidden or unloaded
+    window.addEventListener('pagehide', () => this.flush(true));
+    document.addEventListener('visibilitychange', () => {
+      if (document.visibilityState === 'hidden') {
+        this.flush(true);
+      }
+    });
+  }
+
+  track(type, companyId) {
+    this.queue.push({ type, company_id: companyId });
+
+    if (this.queue.length >= MAX_BATCH_SIZE) {
+      this.flush();
+    } else if (!this.flushTimer) {
+      this.flushTimer = setTimeout(() => this.flush(), FLUSH_DELAY_MS);
+    }
+  }
+
+  trackPageView(companyId) {
+    this.track('page_view', companyId);
+  }
+
+  trackJobClick(companyId) {
+    // The career link opens a new page, so don't wait for the timer
+    this.track('job_click', companyId);
+    this.flush(true);
+  }
+
+  flush(useBeacon = false) {
+    if (this.flushTimer) {
+      clearTimeout(this.flushTimer);
+      this.flushTimer = null;
+    }
+    while (this.queue.length) {
+      const body = JSON.stringify({ events: this.queue.splice(0, MAX_BATCH_SIZE) });
+
+      // sendBeacon survives navigation; fall back to fetch when it is unavailable or refused
+      if (useBeacon && navigator.sendBeacon &&
+          navigator.sendBeacon(this.endpoint, new Blob([body], { type: 'application/json' }))) {
+        continue;
+      }
+      fetch(this.endpoint, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body,
+        keepalive: true
+      }).then((response) => {
+        if (!response.ok) {
+          console.warn('Failed to record analytics events:', response.status);
+        }
+      }).catch((error) => {
+        console.warn('Error recording analytics events:', error);
+      });
+    }
+  }
+}
+
+// Create global instance
+const analyticsBeacon = new AnalyticsBeaconService();
+
+export default analyticsBeacon;
@@ -227,20 +227,15 @@ export const getDashboardOverview = async () => {
   return response.data;
 };
 
-export const exportCompanyData = async (companyId, days = 30) => {
-  const response = await axios.get(`${API_URL}/export/${companyId}/?days=${days}`, {
-    headers: getAuthHeader(),
-    responseType: 'blob'
-  });
-  
-  // Create download link
+// Save a blob response under the server's filename (or the fallback)
+const saveDownload = (response, fallbackFilename) => {
   const url = window.URL.createObjectURL(new Blob([response.data]));
   const link = document.createElement('a');
   link.href = url;
   
-  // Get filename from response headers or create default
+  // Get filename from response headers or use the fallback
   const contentDisposition = response.headers['content-disposition'];
-  let filename = `campaign_data_${companyId}.csv`;
+  let filename = fallbackFilename;
   if (contentDisposition) {
     const filenameMatch = contentDisposition.match(/filename="(.+)"/);
     if (filenameMatch) {
@@ -254,5 +249,61 @@ export const exportCompanyData = async (companyId, days = 30) => {
   document.body.removeChild(link);
   window.URL.revokeObjectURL(url);
   
+  return filename;
+};
+
+// companyId null exports every company the recruiter can export, in one file.
+// exportFormat: 'csv', 'ndjson' or 'columnar'; gzip compresses the download.
+export const exportCompanyData = async (companyId, days = 30, { exportFormat = 'csv', gzip = false } = {}) => {
+  const params = new URLSearchParams({ days, export_format: exportFormat });
+  if (gzip) params.append('gzip', '1');
+  
+  const path = companyId ? `export/${companyId}/` : 'export/';
+  const response = await axios.get(`${API_URL}/${path}?${params}`, {
+    headers: getAuthHeader(),
+    responseType: 'blob'
+  });
+  
+  const filename = saveDownload(
+    response,
+    `campaign_data_${companyId || 'all_companies'}.${exportFormat === 'csv' ? 'csv' : 'ndjson'}${gzip ? '.gz' : ''}`
+  );
+  return { success: true, filename };
+};
+
+// Background exports for long ranges or many companies. Requesting returns the
+// job (an identical earlier request's job when there is one); poll getExportJob
+// until status is 'done', then downloadExportJob.
+export const requestExportJob = async ({ companyIds = null, days = 30, exportFormat = 'csv', gzip = false } = {}) => {
+  const payload = { days, export_format: exportFormat, gzip };
+  if (companyIds) payload.company_ids = companyIds;
+  
+  const response = await axios.post(`${API_URL}/dashboard/exports/`, payload, {
+    headers: getAuthHeader()
+  });
+  return response.data;
+};
+
+export const getExportJobs = async () => {
+  const response = await axios.get(`${API_URL}/dashboard/exports/`, {
+    headers: getAuthHeader()
+  });
+  return response.data;
+};
+
+export const getExportJob = async (jobId) => {
+  const response = await axios.get(`${API_URL}/dashboard/exports/${jobId}/`, {
+    headers: getAuthHeader()
+  });
+  return response.data;
+};
+
+export const downloadExportJob = async (jobId) => {
+  const response = await axios.get(`${API_URL}/dashboard/exports/${jobId}/download/`, {
+    headers: getAuthHeader(),
+    responseType: 'blob'
+  });
+  
+  const filename = saveDownload(response, `campaign_data_${jobId}`);
   return { success: true, filename };
 };